@@ -0,0 +1,45 @@
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+from velvet_parser import VelvetParser
+from velvet_ir_gen import VelvetIRGen
+from velvet_ast import Node
+
+# Usage: python bench/bench_ast.py [units]
+# Reports AST bytes per node (tracemalloc, includes expression lists/strings) and IR gen time
+
+UNIT = '~x{i}: int = {i} + 2 * y;\n!f{i}(~a,~b){{ ~t = a*b; ^t+a }};\n?x{i}{{ *j=0..x{i}{{ f{i}(j, 1); }}; }};\nlet (p{i}, q{i}) = z;\n'
+
+def count_nodes(root):
+    n, stack = 0, [root]
+    while stack:
+        x = stack.pop()
+        if isinstance(x, Node):
+            n += 1
+            stack.extend(getattr(x, f) for f in x.__dataclass_fields__)
+        elif isinstance(x, (list, tuple)):
+            stack.extend(x)
+        elif isinstance(x, dict):
+            stack.extend(x.values())
+    return n
+
+def main():
+    units = int(sys.argv[1]) if sys.argv[1:] else 5000
+    code = ''.join(UNIT.format(i=i) for i in range(units))
+    tracemalloc.start()
+    ast = VelvetParser().parse(code)
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    n = count_nodes(ast.nodes)
+    print(f"{n} nodes, {size / n:.0f} bytes/node")
+    start = time.perf_counter()
+    for _ in range(5):
+        VelvetIRGen(ast).generate()
+    print(f"IR gen: {(time.perf_counter() - start) / 5 * 1000:.1f} ms")
+
+if __name__ == '__main__':
+    main()
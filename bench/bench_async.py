@@ -0,0 +1,44 @@
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+from velvet_parser import VelvetParser
+from velvet_ir_gen import VelvetIRGen
+from velvet_interp import VelvetInterpreter
+from velvet_async import MemoryIO
+
+# Usage: python bench/bench_async.py [concurrent awaits] [latency ms]
+# concurrent: start n calls, then await each; serial: await each call as it starts
+
+def program(n, serial):
+    head = 'async !get(~u){ ~res = await fetch(u); ^res };\n~t = 0;\n'
+    if serial:
+        return head + f'*i=0..{n}{{ ~t = t + len(await get("a")); }};'
+    return head + f'*i=0..{n}{{ get("a"); }};'
+
+def run(n, latency, serial):
+    io = MemoryIO({'a': 'x'}, latency_ms=latency)
+    interp = VelvetInterpreter(io=io)
+    ir = VelvetIRGen(VelvetParser().parse(program(n, serial))).generate()
+    start = time.perf_counter()
+    interp.run(ir)  # run() waits for every started task
+    elapsed = time.perf_counter() - start
+    interp.close()
+    assert io.requests == n
+    return elapsed
+
+def main():
+    n = int(sys.argv[1]) if sys.argv[1:] else 10000
+    latency = int(sys.argv[2]) if sys.argv[2:] else 10
+    conc = run(n, latency, False)
+    print(f"concurrent: {n} awaits in {conc:.2f}s ({n / conc:,.0f}/s)")
+    serial_n = min(n, 200)  # Serial time is n * latency; sample it
+    ser = run(serial_n, latency, True)
+    print(f"    serial: {serial_n} awaits in {ser:.2f}s ({serial_n / ser:,.0f}/s), "
+          f"{n} would take ~{ser * n / serial_n:.1f}s")
+    print(f"   speedup: {ser * n / serial_n / conc:.0f}x")
+
+if __name__ == '__main__':
+    main()
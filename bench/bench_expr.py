@@ -0,0 +1,33 @@
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+from velvet_parser import VelvetParser
+
+# Usage: python bench/bench_expr.py [statements]
+# Parse throughput (lex + macro pass + parse) on expression-heavy corpora
+
+CORPORA = {
+    'arith': "~v{i} = (a + {i}) * (b - 2) / (c + d * {i}) - e * f + g;\n",
+    'calls': "~v{i} = f(g(a, {i}), h(b + 1, k(c)), m()) + n(d * 2);\n",
+    'compare': "?x{i} >= {i} {{ ~r = -a * b != c + 1; }};\n",
+    'deep': "~v{i} = ((((((a + 1) * 2) - 3) / 4) + 5) * ((b - {i}) + (c * (d - (e + f)))));\n",
+}
+
+def main():
+    n = int(sys.argv[1]) if sys.argv[1:] else 20000
+    for name, unit in CORPORA.items():
+        code = ''.join(unit.format(i=i) for i in range(n))
+        best = float('inf')
+        for _ in range(5):
+            parser = VelvetParser()
+            start = time.perf_counter()
+            parser.parse(code)
+            best = min(best, time.perf_counter() - start)
+        tokens = len(parser.tokens)
+        print(f"{name:>8}: {best * 1000:8.1f} ms, {tokens / best:12,.0f} tokens/s ({len(code) / 1024:.0f} KiB)")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,33 @@
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+from velvet_parser import VelvetParser
+
+# Usage: python bench/bench_incremental.py [statements]
+
+def gen_module(n):
+    return ''.join(f'~x{i} = {i} + 2 * y;\n!f{i}(~a,~b){{^a+b}};\n' for i in range(n // 2))
+
+def timed(fn, *args):
+    start = time.perf_counter()
+    fn(*args)
+    return time.perf_counter() - start
+
+def main():
+    n = int(sys.argv[1]) if sys.argv[1:] else 5000
+    code = gen_module(n)
+    edited = code.replace('~x10 = 10', '~x10 = 11', 1)
+    parser = VelvetParser()
+    full = timed(VelvetParser().parse, edited)
+    cold = timed(parser.parse_incremental, code)
+    warm = timed(parser.parse_incremental, edited)
+    print(f"{n} statements")
+    print(f"full parse:        {full * 1000:8.1f} ms")
+    print(f"incremental cold:  {cold * 1000:8.1f} ms")
+    print(f"incremental edit:  {warm * 1000:8.1f} ms ({parser.reparsed} span reparsed)")
+
+if __name__ == '__main__':
+    main()
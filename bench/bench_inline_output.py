@@ -0,0 +1,38 @@
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+import utils.inline_exec as inline_exec
+from utils.inline_exec import InlineExecutor
+
+# Usage: python bench/bench_inline_output.py [MB printed by the block]
+# buffered = capture_output (previous behaviour); stream = incremental pipe
+# reads keeping a 64 KiB tail per stream
+
+def run(mb, stream):
+    executor = InlineExecutor()
+    executor.allow_langs = {'python'}
+    executor.stream_output = stream
+    executor.on_output = lambda *args: None
+    executor.output_tail = 64 * 1024
+    code = f'import sys\nline = "x" * 99 + "\\n"\nfor _ in range({mb} * 10486): sys.stdout.write(line)'
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = executor.execute([("python", code)], "bench.vel")[0]
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed, peak, len(result['stdout'])
+
+def main():
+    mb = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+    inline_exec.console.print = lambda *args, **kwargs: None  # Time capture, not rendering a panel of the whole output
+    for name, stream in (('buffered', False), ('stream', True)):
+        elapsed, peak, kept = run(mb, stream)
+        print(f"{name:>8}: {mb} MB of output in {elapsed:.2f}s, peak {peak / 1e6:.1f} MB traced, {kept} bytes kept")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,41 @@
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+from velvet_parser import VelvetParser
+from velvet_ir_gen import VelvetIRGen
+from velvet_interp import VelvetInterpreter
+from velvet_opt import PassManager
+
+# Usage: python bench/bench_interp.py [scale] [--release]
+# ops = statements executed by the workload, so ops/s is comparable across runs
+
+def cases(n):
+    return {
+        'fib': (f"!fib(~n){{ ~a=0; ~b=1; *i=0..n{{ ~t=a+b; ~a=b; ~b=t; }}; ^a }};\n*j=0..{n // 100}{{ fib(90); }};",
+                (n // 100) * (90 * 3 + 3)),
+        'loop': (f"~s = 0;\n*i=0..{n}{{ ~s = s + i * 2; }};", n),
+        'calls': (f"!inc(~x){{^x+1}};\n~s = 0;\n*i=0..{n}{{ ~s = inc(s); }};", n * 2),
+        'strings': (f"~s = \"\";\n*i=0..{n}{{ ~s = s + \"x\"; }};", n),
+    }
+
+def main():
+    args = [a for a in sys.argv[1:] if not a.startswith('--')]
+    n = int(args[0]) if args else 200000
+    for name, (code, ops) in cases(n).items():
+        ir = VelvetIRGen(VelvetParser().parse(code)).generate()
+        if '--release' in sys.argv:
+            ir = PassManager(entry=True).run(ir)
+        interp = VelvetInterpreter()
+        start = time.perf_counter()
+        prog = interp.compile(ir['nodes'])
+        compiled = time.perf_counter()
+        prog(interp.globals)
+        done = time.perf_counter()
+        print(f"{name:>8}: compile {(compiled - start) * 1000:6.2f} ms, "
+              f"run {(done - compiled) * 1000:8.1f} ms, {ops / (done - compiled):,.0f} ops/s")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,80 @@
+import os
+import sys
+import json
+import time
+import random
+import subprocess
+import tempfile
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+from velvet_parser import VelvetParser
+from velvet_ir_gen import VelvetIRGen, write_ir
+
+# Usage: python bench/bench_ir_bin.py [target MB]
+# Each load runs in a fresh interpreter; rss = VmRSS growth across the load
+
+def program(i):
+    return (f"~v{i}: int = {i} + 2 * x{i};\n"
+            f"!f{i}(~a, ~b){{ ~t = a * b; ^t + {i} }};\n"
+            f"?v{i} {{ print(f{i}(v{i}, \"s{i}\")); }};\n"
+            f"match v{i} {{ 1 => ~r{i} = 1, _ => ~r{i} = 0 }};\n")
+
+def make_ir(target_bytes):
+    parser, nodes, size, i = VelvetParser(), [], 0, 0
+    while size < target_bytes:
+        chunk = VelvetIRGen(parser.parse(''.join(program(i + k) for k in range(200)))).generate()['nodes']
+        size += len(json.dumps(chunk))
+        nodes.extend(chunk)
+        i += 200
+    return {'deps': [], 'imports': [], 'nodes': nodes, 'inline': []}
+
+def rss():
+    with open('/proc/self/status') as f:
+        for line in f:
+            if line.startswith('VmRSS:'):
+                return int(line.split()[1]) * 1024
+    return 0
+
+def child(mode, path):
+    before = rss()
+    start = time.perf_counter()
+    if mode == 'json':
+        with open(path) as f:
+            ir = json.load(f)
+        nodes = ir['nodes']
+        sample = [nodes[random.randrange(len(nodes))] for _ in range(1000)]
+    else:
+        from velvet_ir_bin import load
+        ir = load(path)
+        nodes = ir['nodes']
+        sample = [nodes[random.randrange(len(nodes))] for _ in range(1000)]
+        if mode == 'bin-full':
+            nodes = list(nodes)
+    elapsed = time.perf_counter() - start
+    print(json.dumps({'s': elapsed, 'rss': rss() - before, 'nodes': len(nodes)}))
+
+def main():
+    if sys.argv[1:2] == ['--child']:
+        return child(sys.argv[2], sys.argv[3])
+    target = float(sys.argv[1]) if sys.argv[1:] else 50
+    ir = make_ir(int(target * 1024 * 1024))
+    with tempfile.TemporaryDirectory() as tmp:
+        base = os.path.join(tmp, 'big.ir')
+        start = time.perf_counter()
+        write_ir(ir, base, 'json')
+        json_write = time.perf_counter() - start
+        start = time.perf_counter()
+        write_ir(ir, base, 'bin')
+        bin_write = time.perf_counter() - start
+        del ir
+        print(f"json {os.path.getsize(base + '.json') / 2**20:6.1f} MB (write {json_write:.2f}s), "
+              f"bin {os.path.getsize(base + '.bin') / 2**20:6.1f} MB (write {bin_write:.2f}s)")
+        for mode, path in (('json', base + '.json'), ('bin', base + '.bin'), ('bin-full', base + '.bin')):
+            out = subprocess.run([sys.executable, __file__, '--child', mode, path], capture_output=True, text=True)
+            r = json.loads(out.stdout)
+            label = {'json': 'json.load', 'bin': 'mmap + 1000 nodes', 'bin-full': 'mmap + all nodes'}[mode]
+            print(f"{label:>18}: {r['s'] * 1000:9.1f} ms, rss +{r['rss'] / 2**20:7.1f} MB ({r['nodes']} nodes)")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,66 @@
+import os
+import re
+import sys
+import time
+import tracemalloc
+from array import array
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+from velvet_lexer import VelvetLexer
+
+# Usage: python bench/bench_lexer.py [size_mb] [--inline]
+# --inline: mostly-inline source; `regex` is the previous scheme (every inline
+# body tokenized as Velvet, then a second DOTALL regex pass for the blocks)
+
+UNIT = '~x{i}: int = {i} + 2 * y;\n!f{i}(~a,~b){{^a+b}};\n?x{i}>0{{*j=0..x{i}{{f{i}(j,1)}}}};\n'
+INLINE_UNIT = ('~r{i} = {i};\n#c{{\n#include <stdio.h>\nint main(void) {{\n  for (int k = 0; k < {i}; k++) {{\n'
+               '    printf("%d {{}}\\n", k * 2 + 1);\n  }}\n  return 0;\n}}\n}};\n'
+               '#python{{\nfor k in range({i}):\n    print({{"k": k, "sq": k * k}})\n}};\n')
+
+def old_scan(lexer, code):
+    spans = array('I')
+    for mo in lexer.token_re.finditer(code):
+        spans.append(mo.lastindex)
+        spans.append(mo.start())
+        spans.append(mo.end())
+    blocks = re.findall(r'#(\w+)\s*\{(.*?)\}', code, re.DOTALL)
+    return range(len(spans) // 3 + len(blocks))
+
+def gen_source(size_mb, unit=UNIT):
+    target = int(size_mb * 1024 * 1024)
+    parts, size, i = [], 0, 0
+    while size < target:
+        chunk = unit.format(i=i)
+        parts.append(chunk)
+        size += len(chunk)
+        i += 1
+    return ''.join(parts)
+
+def measure(fn, code):
+    start = time.perf_counter()
+    tokens = fn(code)
+    elapsed = time.perf_counter() - start
+    del tokens
+    tracemalloc.start()
+    tokens = fn(code)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return len(tokens), elapsed, peak
+
+def main():
+    args = [a for a in sys.argv[1:] if not a.startswith('--')]
+    size_mb = float(args[0]) if args else 10
+    inline = '--inline' in sys.argv
+    code = gen_source(size_mb, INLINE_UNIT if inline else UNIT)
+    lexer = VelvetLexer()
+    print(f"source: {len(code) / 1e6:.1f} MB")
+    fns = [('list', lexer.lex), ('stream', lexer.lex_stream)]
+    if inline:
+        fns.append(('regex', lambda c: old_scan(lexer, c)))
+    for name, fn in fns:
+        n, elapsed, peak = measure(fn, code)
+        print(f"{name:>6}: {n} tokens in {elapsed:.2f}s ({len(code) / elapsed / 1e6:.1f} MB/s, {n / elapsed:,.0f} tokens/s), "
+              f"peak {peak / 1e6:.1f} MB")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,57 @@
+import os
+import sys
+import time
+import tempfile
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+from velvet_interp import VelvetInterpreter
+from weave.loader import ModuleLoader
+
+# Usage: python bench/bench_loader.py [modules] [statements per module]
+# A layered import graph (each module imports two from the layer below).
+# full = load everything in a fresh session (what a reload cost before);
+# edit = reload after changing one bottom module: it and its dependents only
+
+def make_graph(root, count, stmts):
+    paths = []
+    for i in range(count):
+        imports = ''.join(f'import "m{j}.vel";\n' for j in (i // 2 - 1, i // 2) if 0 <= j < i)
+        body = ''.join(f"~v{i}_{k} = {k} * 2 + 1;\n" for k in range(stmts))
+        path = os.path.join(root, f"m{i}.vel")
+        with open(path, 'w') as f:
+            f.write(imports + body)
+        paths.append(path)
+    with open(os.path.join(root, "top.vel"), 'w') as f:
+        f.write(''.join(f'import "m{i}.vel";\n' for i in range(count)) + "~t = 0;\n")
+    return os.path.join(root, "top.vel"), paths
+
+def timed(fn):
+    start = time.perf_counter()
+    out = fn()
+    return time.perf_counter() - start, out
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 64
+    stmts = int(sys.argv[2]) if len(sys.argv) > 2 else 200
+    with tempfile.TemporaryDirectory() as root:
+        top, paths = make_graph(root, count, stmts)
+        for jobs in sorted({1, os.cpu_count() or 1}):
+            interp = VelvetInterpreter()
+            loader = ModuleLoader(interp.run, root=root, jobs=jobs)
+            secs, ran = timed(lambda: loader.load(top))
+            print(f"full load jobs={jobs:<3} {len(ran)} modules  {secs * 1e3:8.1f} ms")
+        leaf = paths[-1]
+        with open(leaf, 'a') as f:
+            f.write("~extra = 1;\n")
+        secs, ran = timed(lambda: loader.reload([leaf]))
+        print(f"edit {os.path.basename(leaf):<12} {len(ran)} modules  {secs * 1e3:8.1f} ms  (parsed {loader.parsed - count - 1} + re-run {len(ran)})")
+        base = paths[0]
+        with open(base, 'a') as f:
+            f.write("~extra = 1;\n")
+        secs, ran = timed(lambda: loader.reload([base]))
+        print(f"edit {os.path.basename(base):<12} {len(ran)} modules  {secs * 1e3:8.1f} ms  (root of the graph)")
+        interp.close()
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,41 @@
+import os
+import re
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+from velvet_lexer import VelvetLexer
+from velvet_macros import MacroExpander
+
+# Usage: python bench/bench_macros.py [calls]
+# Expansion time as the number of defined macros grows, vs. the old per-macro re.sub pass
+
+def legacy_expand(code, macros):
+    for name, (_, body) in macros.items():
+        code = re.sub(rf'{name}\((.*?)\)', lambda m: body.replace('~x', m.group(1)), code)
+    return code
+
+def gen(macro_count, calls):
+    defs = ''.join(f'!macro m{i}(~x){{ ^x * {i} }};\n' for i in range(macro_count))
+    uses = ''.join(f'~v{j} = m{j % macro_count}(m{(j + 1) % macro_count}(j)) + 1;\n' for j in range(calls))
+    return defs + uses
+
+def timed(fn):
+    start = time.perf_counter()
+    fn()
+    return time.perf_counter() - start
+
+def main():
+    calls = int(sys.argv[1]) if sys.argv[1:] else 20000
+    lexer = VelvetLexer()
+    for count in (10, 100, 500, 1000):
+        code = gen(count, calls)
+        stream = lexer.lex_stream(code)
+        macros = {}
+        token_time = timed(lambda: MacroExpander(lexer, macros).expand(stream))
+        legacy_time = timed(lambda: legacy_expand(code, macros))
+        print(f"{count:5} macros: token pass {token_time * 1000:7.1f} ms, legacy regex {legacy_time * 1000:8.1f} ms")
+
+if __name__ == '__main__':
+    main()
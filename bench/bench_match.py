@@ -0,0 +1,58 @@
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+from velvet_parser import VelvetParser
+from velvet_ir_gen import VelvetIRGen
+from velvet_interp import VelvetInterpreter
+
+# Usage: python bench/bench_match.py [dispatches per size]
+# linear = try each compiled pattern in order (the previous match compiler)
+
+def cases(kind, n):
+    if kind == 'str':
+        arms = [f'"state{i}" => ~r={i}' for i in range(n)]
+    elif kind == 'int':
+        arms = [f'{i} => ~r={i}' for i in range(n)]
+    else:
+        arms = [f'({i % 10}, {i // 10}, x) => ~r=x' for i in range(n)]
+    code = f"match v {{ {', '.join(arms + ['_ => ~r=-1'])} }};"
+    return VelvetIRGen(VelvetParser().parse(code)).generate()['nodes'][0]['cases']
+
+def values(kind, n):
+    if kind == 'str':
+        return [f'state{i}' for i in range(n)]
+    if kind == 'int':
+        return list(range(n))
+    return [(i % 10, i // 10, i) for i in range(n)]
+
+def timed(select, vals, reps):
+    env = {}
+    start = time.perf_counter()
+    for _ in range(reps // len(vals) + 1):
+        for v in vals:
+            select(v, env)
+    return (time.perf_counter() - start) / ((reps // len(vals) + 1) * len(vals)) * 1e9
+
+def main():
+    reps = int(sys.argv[1]) if sys.argv[1:] else 200000
+    interp = VelvetInterpreter()
+    for kind in ('str', 'int', 'tuple'):
+        for n in (10, 100, 1000):
+            cs = cases(kind, n)
+            pats = [interp.compile_pat(c['pat']) for c in cs]
+            def linear(value, env):
+                for i, bind in enumerate(pats):
+                    if bind(value, env):
+                        return i
+                return -1
+            tree = interp.compile_select(cs)
+            vals = values(kind, n)
+            assert [linear(v, {}) for v in vals] == [tree(v, {}) for v in vals]
+            lin, dt = timed(linear, vals, reps if n < 1000 else reps // 10), timed(tree, vals, reps)
+            print(f"{kind:>5} x{n:<5} linear {lin:9.0f} ns/match   tree {dt:6.0f} ns/match   {lin / dt:6.1f}x")
+
+if __name__ == '__main__':
+    main()
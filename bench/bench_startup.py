@@ -0,0 +1,41 @@
+import os
+import sys
+import json
+import time
+import subprocess
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+
+# Usage: python bench/bench_startup.py [runs] [--json]
+# Cold process latency of the vel CLI, each sample a fresh interpreter; compare
+# against the bare `python -c pass` floor
+
+CASES = [
+    ('python -c pass', ['-c', 'pass']),
+    ('vel --help', ['-m', 'vel.main', '--help']),
+    ('vel run hello.vel', ['-m', 'vel.main', 'run', 'example/hello.vel']),
+    ('vel run --no-cache', ['-m', 'vel.main', 'run', '--no-cache', 'example/hello.vel']),
+]
+
+def sample(args, env):
+    start = time.perf_counter()
+    out = subprocess.run([sys.executable] + args, cwd=ROOT, env=env, capture_output=True)
+    elapsed = time.perf_counter() - start
+    if out.returncode:
+        raise RuntimeError(out.stderr.decode())
+    return elapsed
+
+def main():
+    runs = int(next((a for a in sys.argv[1:] if a.isdigit()), 15))
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join([os.path.join(ROOT, 'src'), ROOT]))
+    results = {}
+    for name, args in CASES:
+        sample(args, env)  # Warm the OS file cache and .pyc files; the process itself stays cold
+        times = sorted(sample(args, env) for _ in range(runs))
+        results[name] = {'median_ms': times[len(times) // 2] * 1e3, 'p95_ms': times[min(len(times) - 1, int(len(times) * 0.95))] * 1e3}
+        print(f"{name:>20}: median {results[name]['median_ms']:7.1f} ms   p95 {results[name]['p95_ms']:7.1f} ms")
+    if '--json' in sys.argv:
+        print(json.dumps(results))
+
+if __name__ == '__main__':
+    main()
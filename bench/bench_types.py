@@ -0,0 +1,33 @@
+import os
+import sys
+import json
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+from velvet_parser import VelvetParser
+from velvet_ir_gen import VelvetIRGen
+
+# Usage: python bench/bench_types.py [vars] [targets, e.g. rust,zig]
+# IR generation time and JSON size for a module of typed ~vars
+
+TYPES = ['int', 'str', 'list<int>', 'map<str, list<int>>', 'set<str>', 'tuple<int, str>', 'list<map<int, str>>']
+
+def main():
+    n = int(sys.argv[1]) if sys.argv[1:] else 20000
+    targets = sys.argv[2].split(',') if sys.argv[2:] else ['rust']
+    code = ''.join(f"~v{i}: {TYPES[i % len(TYPES)]} = {i};\n" for i in range(n))
+    ast = VelvetParser().parse(code)
+    for label, langs in (('all targets', None), (','.join(targets), targets)):
+        best = float('inf')
+        for _ in range(5):
+            start = time.perf_counter()
+            gen = VelvetIRGen(ast, langs)
+            ir = gen.generate()
+            best = min(best, time.perf_counter() - start)
+        size = len(json.dumps(ir))
+        print(f"{label:>12}: gen {best * 1000:7.1f} ms, json {size / 1024:8.1f} KiB, "
+              f"type memo {gen.types.hits} hits / {gen.types.misses} misses")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,40 @@
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+from velvet_parser import VelvetParser
+from velvet_ir_gen import VelvetIRGen
+from velvet_interp import VelvetInterpreter
+import velvet_vec
+
+# Usage: python bench/bench_vec.py [iterations]
+# generic = one closure call per statement per iteration (vectorize=False)
+
+def program(n):
+    return (f"~k = 3;\n~s = 0;\n~c = 0;\n"
+            f"*i=0..{n}{{ ~t = i * k - 7; ~s = s + t * t; ~c = c + i - t; }};")
+
+def timed(interp, ir):
+    start = time.perf_counter()
+    interp.run(ir)
+    return time.perf_counter() - start, interp.globals['s'], interp.globals['c']
+
+def main():
+    n = int(sys.argv[1]) if sys.argv[1:] else 10 ** 7
+    ir = VelvetIRGen(VelvetParser().parse(program(n))).generate()
+    has_numpy = velvet_vec.numpy() is not None
+    if has_numpy:
+        vec, s, c = timed(VelvetInterpreter(), ir)
+        print(f"  numpy: {vec:8.3f}s ({n / vec / 1e6:8.1f} M iter/s)")
+    velvet_vec._np = None
+    py, s2, c2 = timed(VelvetInterpreter(), ir)
+    print(f" python: {py:8.3f}s ({n / py / 1e6:8.1f} M iter/s)")
+    gen, s3, c3 = timed(VelvetInterpreter(vectorize=False), ir)
+    print(f"generic: {gen:8.3f}s ({n / gen / 1e6:8.1f} M iter/s)")
+    assert (s2, c2) == (s3, c3) and (not has_numpy or (s, c) == (s3, c3))
+    print(f"speedup: python {gen / py:.1f}x" + (f", numpy {gen / vec:.0f}x" if has_numpy else ""))
+
+if __name__ == '__main__':
+    main()
@@ -9,10 +9,19 @@ pub fn main() !void {
         const ir_path = args[2];
         const ir_file = try std.fs.cwd().openFile(ir_path, .{});
         defer ir_file.close();
-        var buf: [4096]u8 = undefined;
-        const ir_content = try ir_file.readAll(&buf);
-        // Parse JSON (stub)
-        std.debug.print("IR: {s}\n", .{ir_content});
+        const ir_content = try ir_file.readToEndAlloc(allocator, std.math.maxInt(usize));
+        defer allocator.free(ir_content);
+        if (ir_content.len >= 68 and std.mem.eql(u8, ir_content[0..4], "VLIR")) {
+            // Binary IR (see src/velvet_ir_bin.py): fixed-width little-endian header
+            const version = std.mem.readInt(u16, ir_content[4..6], .little);
+            const n_strings = std.mem.readInt(u32, ir_content[8..12], .little);
+            const n_values = std.mem.readInt(u32, ir_content[12..16], .little);
+            const n_nodes = std.mem.readInt(u32, ir_content[20..24], .little);
+            std.debug.print("IR v{d}: {d} nodes, {d} values, {d} strings\n", .{ version, n_nodes, n_values, n_strings });
+        } else {
+            // Parse JSON (stub)
+            std.debug.print("IR: {s}\n", .{ir_content});
+        }
 
         // Gen code: Types, async (threads), match (switch), inline (embed as string)
         var code = std.ArrayList(u8).init(allocator);
@@ -29,6 +29,9 @@ enum Commands {
         release: bool,
         #[arg(short, long)]
         deb: bool,
+        /// Keep watching .vel files and rebuild only affected modules (weave/main.py build --watch)
+        #[arg(short, long)]
+        watch: bool,
         project: Option<String>,
     },
     /// Run tests
@@ -39,8 +42,13 @@ enum Commands {
     Update,
     /// Generate docs
     Doc { project: Option<String> },
-    /// Benchmark project
-    Bench { project: Option<String> },
+    /// Benchmark the pipeline on synthetic corpora (plus the project's .vel files)
+    Bench {
+        project: Option<String>,
+        /// Passed to weave/bench.py: --shapes= --size= --runs= --warmup= --out= --baseline= --threshold=
+        #[arg(trailing_var_arg = true, allow_hyphen_values = true)]
+        flags: Vec<String>,
+    },
     /// Run all tests
     TestAll,
 }
@@ -80,7 +88,7 @@ fn main() {
             Command::new("python").arg("src/utils/inline_exec.py").arg("--allow-inline").status().unwrap();
             println!("{} Check passed", "success".green());
         }
-        Commands::Build { release, deb, project } => {
+        Commands::Build { release, deb, watch, project } => {
             let proj = project.unwrap_or_else(|| "app".to_string());
             let mut cmd = Command::new("python");
             cmd.arg("src/velvet_parser.py").arg(&proj).arg("--output-ir").arg("ir.json");
@@ -95,6 +103,12 @@ fn main() {
             // Stub packaging
             if deb { println!("{} Future .deb build", "warning".yellow()); }
             println!("{} Built {}", if release { "release".green() } else { "debug".blue() }, proj);
+            if watch {
+                let mut cmd = Command::new("python");
+                cmd.arg("weave/main.py").arg("build").arg(&proj).arg("--watch");
+                if release { cmd.arg("--release"); }
+                cmd.status().unwrap();
+            }
         }
         Commands::Test { project } => {
             // Stub: run unit tests from .vel
@@ -117,12 +131,18 @@ fn main() {
             println!("{} Generating docs for {}", "info".cyan(), proj);
             Command::new("python").arg("src/velvet_parser.py").arg("--gen-doc").arg(&proj).status().unwrap();
         }
-        Commands::Bench { project } => {
-            let proj = project.unwrap_or_else(|| "main".to_string());
-            // Stub: Build release + time exec
-            println!("{} Benchmarking {}", "info".cyan(), proj);
-            Command::new("./weave").arg("build").arg("--release").arg(&proj).status().unwrap();
-            // Time run
+        Commands::Bench { project, flags } => {
+            println!("{} Benchmarking {}", "info".cyan(), project.as_deref().unwrap_or("synthetic corpora"));
+            let mut cmd = Command::new("python");
+            cmd.arg("weave/main.py").arg("bench");
+            if let Some(proj) = &project {
+                cmd.arg(proj);
+            }
+            let status = cmd.args(&flags).status().unwrap();
+            if !status.success() {
+                println!("{} Benchmark regression (see table above)", "error".red().bold());
+                std::process::exit(status.code().unwrap_or(1));
+            }
         }
         Commands::TestAll => {
             // Run pytest for Python, zig test for Zig
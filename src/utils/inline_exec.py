@@ -1,15 +1,31 @@
 import ast
+import json
 import subprocess
 import sys
 import os
 import uuid
+import hashlib
 import shutil
+import time
+import signal
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from rich.console import Console
 from rich.panel import Panel
 from rich.theme import Theme
-from typing import List, Tuple, Dict
+from typing import Any, List, Tuple, Dict
+try:
+    from utils.inline_workers import WorkerPool, WORKER_CMDS
+    from utils.inline_stream import run_streaming
+    from utils.inline_limits import load_limits, limits_for, shimmed, rlimits
+except ImportError:  # Run as a script from src/utils
+    from inline_workers import WorkerPool, WORKER_CMDS
+    from inline_stream import run_streaming
+    from inline_limits import load_limits, limits_for, shimmed, rlimits
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from velvet_profile import phase
 
-cyber_theme = Theme({"info": "cyan blink", "error": "red bold", "success": "green"})
+cyber_theme = Theme({"info": "cyan blink", "warning": "magenta", "error": "red bold", "success": "green"})
 console = Console(theme=cyber_theme)
 
 class InlineExecutor:
@@ -19,47 +35,296 @@ class InlineExecutor:
             "c", "cpp", "csharp", "julia", "zig", "lua", "java", "javascript"
         }
         self.allow_langs = set()
+        self.concurrency = 1  # Blocks run at once; >1 runs independent blocks in a worker pool
+        self.timeout = None  # Global deadline (seconds) for one execute() call
+        self.lang_timeouts = {}  # lang: per-block timeout (seconds)
+        self.compiled_langs = {"c", "cpp", "rust", "go", "java", "csharp", "zig"}
+        self.version_cmds = {
+            "c": ["gcc", "--version"], "cpp": ["g++", "--version"], "rust": ["rustc", "--version"],
+            "go": ["go", "version"], "java": ["javac", "-version"], "csharp": ["csc", "-version"],
+            "zig": ["zig", "version"],
+        }
+        self.compile_flags = {}  # lang: extra compiler flags (part of the artifact key)
+        self.use_artifact_cache = True
+        self.artifact_dir = os.path.join(os.environ.get('VELVET_CACHE_DIR', '.velvet_cache'), 'inline')
+        self.compiler_versions = {}
+        self.probe_timeout = 10  # Seconds for `<compiler> --version`
+        self.artifact_hits = 0
+        self.artifact_misses = 0
+        self.warm_pool_size = 0  # Warm workers per interpreted lang (python/ruby/lua/javascript); 0 = fresh process per block
+        self.worker_max_tasks = 100
+        self.worker_max_rss = 256 * 1024 * 1024
+        self.pools = {}
+        self.pools_lock = threading.Lock()
+        self.stream_output = False  # Forward block output line by line as it arrives
+        self.on_output = None  # fn(block index, 'stdout'|'stderr', line); default prints to the console
+        self.output_tail = 1 << 20  # Bytes of each stream kept in results when streaming or limited
+        self.output_limit = None  # Kill a block past this many bytes on either stream
+        self.limits_file = '.velvet.toml'  # Project config with [inline.limits] (see inline_limits)
+        self.limits = None  # '*' or lang: {cpu, memory, files, procs, wall}; None = read limits_file
 
     def parse_flags(self):
         for arg in sys.argv[1:]:
-            if arg.startswith('--allow-'):
+            if arg == '--allow-all':
+                self.allow_langs |= self.supported_langs
+            elif arg.startswith('--allow-'):
                 lang = arg.split('-')[-1]
                 self.allow_langs.add(lang)
+            elif arg.startswith('--jobs='):
+                self.concurrency = int(arg.split('=', 1)[1])
+            elif arg.startswith('--timeout='):
+                self.timeout = float(arg.split('=', 1)[1])
+            elif arg == '--no-cache':
+                self.use_artifact_cache = False
+            elif arg.startswith('--warm='):
+                self.warm_pool_size = int(arg.split('=', 1)[1])
+            elif arg == '--stream':
+                self.stream_output = True
+            elif arg.startswith('--output-tail='):
+                self.output_tail = int(arg.split('=', 1)[1])
+            elif arg.startswith('--output-limit='):
+                self.output_limit = int(arg.split('=', 1)[1])
+            elif arg.startswith('--limits='):
+                path = arg.split('=', 1)[1]
+                if path != self.limits_file:
+                    self.limits_file, self.limits = path, None
 
     def execute(self, blocks: List[Tuple[str, str]], file_path: str) -> Dict[int, Dict[str, Any]]:
+        with phase('inline_exec'):
+            return self.execute_blocks(blocks, file_path)
+
+    def execute_blocks(self, blocks: List[Tuple[str, str]], file_path: str) -> Dict[int, Dict[str, Any]]:
         self.parse_flags()
+        if self.limits is None:
+            self.limits = load_limits(self.limits_file)
         results = {}
         tmp_dir = f"tmp_inline_{uuid.uuid4()}"
-        os.makedirs(tmp_dir, exist_ok=True)
+        deadline = time.monotonic() + self.timeout if self.timeout is not None else None
+        runnable = []
+        for i, (lang, code) in enumerate(blocks):
+            if lang not in self.supported_langs:
+                console.print(Panel(f"[{file_path}] Unsupported: {lang}", style="error"))
+                continue
+            if lang not in self.allow_langs:
+                console.print(Panel(f"[{file_path}] Blocked {lang} (use --allow-{lang})", style="warning"))
+                continue
+            runnable.append((i, lang, code))
+        if any(not self.uses_worker(lang) for _, lang, _ in runnable):
+            os.makedirs(tmp_dir, exist_ok=True)  # Warm workers need no files
         try:
-            for i, (lang, code) in enumerate(blocks):
-                if lang not in self.supported_langs:
-                    console.print(Panel(f"[{file_path}] Unsupported: {lang}", style="error"))
-                    continue
-                if lang not in self.allow_langs:
-                    console.print(Panel(f"[{file_path}] Blocked {lang} (use --allow-{lang})", style="warning"))
-                    continue
-
-                console.print(Panel(f"[{file_path}] Exec {lang}...", style="info"))
-                tmp_file = os.path.join(tmp_dir, f"inline_{i}.{self.get_ext(lang)}")
-                with open(tmp_file, "w") as f:
-                    f.write(self.wrap_code(lang, code))
-                cmd = self.get_cmd(lang, tmp_file)
-                env = os.environ.copy()
-                env['PATH'] = '/usr/bin:/bin'  # Limited for security
-                env['NO_NETWORK'] = '1'  # Stub sandbox
-                proc_result = subprocess.run(cmd, capture_output=True, text=True, env=env, shell=False if lang not in {'shell', 'powershell'} else True)
-                if os.path.exists("tmp"):
-                    os.remove("tmp")
-                results[i] = {'stdout': proc_result.stdout.strip(), 'stderr': proc_result.stderr.strip(), 'code': proc_result.returncode}
-                if proc_result.returncode != 0:
-                    console.print(Panel(f"[{file_path}] {lang} error: {proc_result.stderr}", style="error"))
-                else:
-                    console.print(Panel(proc_result.stdout, style="success"))
+            if self.concurrency > 1 and len(runnable) > 1:
+                with ThreadPoolExecutor(max_workers=self.concurrency) as pool:
+                    futures = {i: pool.submit(self.run_block, i, lang, code, tmp_dir, file_path, deadline) for i, lang, code in runnable}
+                    for i in sorted(futures):  # Results keep block order
+                        results[i] = futures[i].result()
+            else:
+                for i, lang, code in runnable:
+                    results[i] = self.run_block(i, lang, code, tmp_dir, file_path, deadline)
         finally:
             shutil.rmtree(tmp_dir, ignore_errors=True)
         return results
 
+    def uses_worker(self, lang):
+        # Warm workers are shared processes that buffer a block's whole output:
+        # blocks with rlimits or an output limit get a fresh one
+        return bool(self.warm_pool_size and lang in WORKER_CMDS and self.output_limit is None
+                    and not rlimits(self.block_limits(lang)))
+
+    def block_limits(self, lang):
+        return limits_for(self.limits or {}, lang)
+
+    def block_timeout(self, lang, deadline):
+        timeout = self.lang_timeouts.get(lang)
+        wall = self.block_limits(lang).get('wall')
+        if wall is not None:
+            timeout = wall if timeout is None else min(timeout, wall)
+        if deadline is not None:
+            remaining = max(deadline - time.monotonic(), 0)
+            timeout = remaining if timeout is None else min(timeout, remaining)
+        return timeout
+
+    def run_block(self, i, lang, code, tmp_dir, file_path, deadline=None) -> Dict[str, Any]:
+        start = time.perf_counter()
+        timeout = self.block_timeout(lang, deadline)
+        if timeout == 0:
+            return {'stdout': '', 'stderr': 'timed out before start', 'code': -1, 'timeout': True, 'wall': 0.0}
+        console.print(Panel(f"[{file_path}] Exec {lang}...", style="info"))
+        env = os.environ.copy()
+        env['PATH'] = '/usr/bin:/bin'  # Limited for security
+        env['NO_NETWORK'] = '1'  # Stub sandbox
+        if self.stream_output:
+            env['PYTHONUNBUFFERED'] = '1'  # Block-buffered pipes would hold lines until exit
+        sink = self.sink(i, file_path) if self.stream_output else None
+        limits = self.block_limits(lang)
+        if self.uses_worker(lang):
+            # Workers answer with the whole output at once: clipped, not streamed
+            try:
+                result = self.clip(self.get_pool(lang, env).run(self.wrap_code(lang, code), timeout))
+            except FileNotFoundError:  # Same result as a fresh process; the rest of the batch still runs
+                result = {'stdout': '', 'stderr': f"{WORKER_CMDS[lang][0]}: not found", 'code': 127}
+            sink = None
+        elif lang in self.compiled_langs:
+            slot, result = self.build_artifact(lang, self.wrap_code(lang, code), env, timeout, os.path.join(tmp_dir, f"inline_{i}"))
+            if result is None:
+                remaining = None if timeout is None else max(timeout - (time.perf_counter() - start), 0.01)
+                result = self.run_cmd(self.get_run_cmd(lang, slot), env, remaining, sink, limits)
+        else:
+            tmp_file = os.path.join(tmp_dir, f"inline_{i}.{self.get_ext(lang)}")
+            with open(tmp_file, "w") as f:
+                f.write(self.wrap_code(lang, code))
+            result = self.run_cmd(self.get_cmd(lang, tmp_file), env, timeout, sink, limits)
+        if result.get('code') == -signal.SIGXCPU or (result.get('code') == -signal.SIGKILL and 'cpu' in limits
+                                                    and (result.get('cpu') or 0) >= limits['cpu']):
+            result.update(cpu_limit=True, stderr=f"{result['stderr']}\nCPU limit exceeded ({limits['cpu']}s)".strip())
+        result['wall'] = time.perf_counter() - start
+        if result['code'] != 0:
+            console.print(Panel(f"[{file_path}] {lang} error: {result['stderr']}", style="error"))
+        elif sink is None:  # Streamed output was already shown
+            console.print(Panel(result['stdout'], style="success"))
+        return result
+
+    def sink(self, i, file_path):
+        # Live line forwarding for block i
+        if self.on_output is not None:
+            return lambda stream, line: self.on_output(i, stream, line)
+        def show(stream, line):
+            console.print(f"{file_path}:{i} {line}", markup=False, highlight=False,
+                          style="error" if stream == 'stderr' else None)
+        return show
+
+    def clip(self, result):
+        # Same tail view for worker outputs, which arrive in one piece
+        result['stdout'], result['stderr'] = result['stdout'].strip(), result['stderr'].strip()
+        if not self.stream_output:
+            return result
+        for stream in ('stdout', 'stderr'):
+            data = result[stream].encode()
+            result[f"{stream}_bytes"] = len(data)
+            if len(data) > self.output_tail:
+                data = data[-self.output_tail:] if self.output_tail > 0 else b''
+                result['truncated'] = True
+            result[stream] = data.decode(errors='replace')
+        return result
+
+    def get_pool(self, lang, env) -> WorkerPool:
+        with self.pools_lock:
+            if lang not in self.pools:
+                cmd = WORKER_CMDS[lang]
+                cmd = [shutil.which(cmd[0]) or cmd[0]] + cmd[1:]
+                self.pools[lang] = WorkerPool(cmd, env, self.warm_pool_size, self.worker_max_tasks, self.worker_max_rss)
+            return self.pools[lang]
+
+    def close(self):
+        # Stop warm workers (REPL exit)
+        with self.pools_lock:
+            pools, self.pools = self.pools, {}
+        for pool in pools.values():
+            pool.close()
+
+    def run_cmd(self, cmd, env, timeout=None, sink=None, limits=None) -> Dict[str, Any]:
+        # Block/compiler process under the inline_limits shim: rlimits from `limits`, usage report
+        cmd = [shutil.which(cmd[0]) or cmd[0]] + cmd[1:]  # Resolve with our PATH before trimming the child's
+        if os.name != 'posix':
+            return self.run_plain(cmd, env, timeout)
+        # Without streaming or a limit the whole output is kept, like capture_output
+        tail = self.output_tail if self.stream_output or self.output_limit is not None else sys.maxsize
+        report = os.pipe()  # The shim's usage line for the block (peak RSS, CPU)
+        return run_streaming(shimmed(cmd, limits or {}, report[1]), env, timeout, sink, tail, self.output_limit, report)
+
+    def run_plain(self, cmd, env, timeout=None) -> Dict[str, Any]:
+        # No select on pipes, wait4 or killpg: whole output, wall clock only
+        try:
+            proc_result = subprocess.run(cmd, capture_output=True, text=True, env=env, timeout=timeout)
+            return {'stdout': proc_result.stdout.strip(), 'stderr': proc_result.stderr.strip(), 'code': proc_result.returncode}
+        except subprocess.TimeoutExpired as e:
+            stdout = e.stdout.decode(errors='replace') if isinstance(e.stdout, bytes) else (e.stdout or '')
+            return {'stdout': stdout.strip(), 'stderr': f"timed out after {timeout:.1f}s", 'code': -1, 'timeout': True}
+        except FileNotFoundError:
+            return {'stdout': '', 'stderr': f"{cmd[0]}: not found", 'code': 127}
+
+    def compiler_version(self, lang):
+        # First line of `<compiler> --version`, probed once per compiler binary
+        if lang not in self.compiler_versions:
+            cmd = self.version_cmds[lang]
+            exe = shutil.which(cmd[0])
+            version = 'missing'
+            if exe:
+                st = os.stat(exe)
+                stamp = f"{os.path.realpath(exe)}:{st.st_size}:{st.st_mtime_ns}"
+                probes = self.read_probes()
+                version = probes.get(stamp)
+                if version is None:
+                    try:
+                        proc = subprocess.run([exe] + cmd[1:], capture_output=True, text=True, timeout=self.probe_timeout)
+                        version = (proc.stdout or proc.stderr).strip().split('\n')[0]
+                        probes[stamp] = version
+                        self.write_probes(probes)
+                    except subprocess.TimeoutExpired:
+                        version = f"unknown {stamp}"  # Not recorded; probed again next process
+            self.compiler_versions[lang] = version
+        return self.compiler_versions[lang]
+
+    def read_probes(self):
+        # {binary path:size:mtime: version line} kept next to the artifacts
+        try:
+            with open(os.path.join(self.artifact_dir, 'compilers.json')) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def write_probes(self, probes):
+        path = os.path.join(self.artifact_dir, 'compilers.json')
+        os.makedirs(self.artifact_dir, exist_ok=True)
+        tmp = f"{path}.{uuid.uuid4().hex}.tmp"
+        with open(tmp, 'w') as f:
+            json.dump(probes, f)
+        os.replace(tmp, path)
+
+    def artifact_key(self, lang, source):
+        h = hashlib.sha256()
+        for part in (lang, self.compiler_version(lang), ' '.join(self.compile_flags.get(lang, [])), source):
+            h.update(part.encode())
+            h.update(b"\0")
+        return h.hexdigest()
+
+    def build_artifact(self, lang, source, env, timeout, scratch):
+        # Returns (slot dir, None) or (None, failed compile result)
+        slot = None
+        if self.use_artifact_cache:
+            key = self.artifact_key(lang, source)
+            slot = os.path.join(self.artifact_dir, key[:2], key)
+            if os.path.exists(os.path.join(slot, 'ok')):
+                self.artifact_hits += 1
+                return slot, None
+            self.artifact_misses += 1
+        build_dir = f"{slot}.{uuid.uuid4().hex}.tmp" if slot else scratch
+        os.makedirs(build_dir, exist_ok=True)
+        src = os.path.join(build_dir, "Tmp.java" if lang == "java" else f"main.{self.get_ext(lang)}")
+        with open(src, "w") as f:
+            f.write(source)
+        cmd = self.get_cmd(lang, src, os.path.join(build_dir, "main"))
+        at = 2 if lang in ("go", "zig") else 1  # After the build/build-exe subcommand
+        cmd[at:at] = self.compile_flags.get(lang, [])
+        result = self.run_cmd(cmd, env, timeout)
+        if result['code'] != 0:
+            if slot:
+                shutil.rmtree(build_dir, ignore_errors=True)
+            return None, result
+        if not slot:
+            return build_dir, None
+        open(os.path.join(build_dir, 'ok'), 'w').close()
+        try:
+            os.rename(build_dir, slot)  # Atomic publish; a concurrent build may win
+        except OSError:
+            shutil.rmtree(build_dir, ignore_errors=True)
+        return slot, None
+
+    def get_run_cmd(self, lang, slot):
+        binary = os.path.join(slot, "main")
+        if lang == "java": return ["java", "-cp", slot, "Tmp"]
+        if lang == "csharp": return ["mono", binary + ".exe"]
+        return [binary]
+
     def get_ext(self, lang):
         return {
             "python": "py", "shell": "sh", "rust": "rs", "powershell": "ps1",
@@ -88,21 +353,22 @@ class InlineExecutor:
         # Others no wrap needed
         return code
 
-    def get_cmd(self, lang, file):
+    def get_cmd(self, lang, file, out="main"):
         if lang == "python": return ["python", file]
         if lang == "shell": return ["bash", file]
         if lang == "powershell": return ["powershell", "-File", file]
-        if lang == "rust": return ["rustc", file, "-o", "tmp"]
-        if lang == "go": return ["go", "run", file]
+        # Compiled langs: compile-only; build_artifact runs get_run_cmd on the output
+        if lang == "rust": return ["rustc", file, "-o", out]
+        if lang == "go": return ["go", "build", "-o", out, file]
         if lang == "crystal": return ["crystal", "run", file]
         if lang == "ruby": return ["ruby", file]
-        if lang == "c": return ["gcc", file, "-o", "tmp"]
-        if lang == "cpp": return ["g++", file, "-o", "tmp"]
-        if lang == "csharp": return ["csc", file, "&&", "mono", "tmp.exe"]
+        if lang == "c": return ["gcc", file, "-o", out]
+        if lang == "cpp": return ["g++", file, "-o", out]
+        if lang == "csharp": return ["csc", f"-out:{out}.exe", file]
         if lang == "julia": return ["julia", file]
-        if lang == "zig": return ["zig", "run", file]
+        if lang == "zig": return ["zig", "build-exe", file, f"-femit-bin={out}"]
         if lang == "lua": return ["lua", file]
-        if lang == "java": return ["javac", file, "&&", "java", "Tmp"]
+        if lang == "java": return ["javac", "-d", os.path.dirname(out), file]
         if lang == "javascript": return ["node", file]
         return []
 
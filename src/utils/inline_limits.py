@@ -0,0 +1,114 @@
+import os
+import sys
+from typing import Any, Dict, List, Tuple
+try:
+    import resource
+except ImportError:  # Not POSIX: rlimits are not enforced, wall still is
+    resource = None
+
+# Per-block resource limits for inline execution, set per project in
+# .velvet.toml:
+#   [inline.limits]        defaults for every language
+#   cpu = 10               CPU seconds (RLIMIT_CPU: SIGXCPU, SIGKILL a second later)
+#   memory = "512M"        address space (RLIMIT_AS); bytes or a K/M/G suffix
+#   files = 64             open descriptors (RLIMIT_NOFILE)
+#   procs = 256            processes of the user, not just the block (RLIMIT_NPROC)
+#   wall = 30              wall-clock seconds before the block's process group is killed
+#   [inline.limits.c]      overrides for one language
+#   memory = "1G"
+# rlimits are set by SHIM in the block's process before exec, so they cover
+# the block and what it spawns; compilers only get the wall clock. Runtimes that reserve
+# address space up front (JVM, Go, node) need a generous memory limit.
+
+RLIMITS = {'cpu': 'RLIMIT_CPU', 'memory': 'RLIMIT_AS', 'files': 'RLIMIT_NOFILE', 'procs': 'RLIMIT_NPROC'}
+KEYS = set(RLIMITS) | {'wall'}
+UNITS = {'K': 1 << 10, 'M': 1 << 20, 'G': 1 << 30}
+
+def parse_size(value) -> int:
+    # 1048576, "1048576", "512K", "64M", "2G"
+    if isinstance(value, (int, float)):
+        return int(value)
+    text = str(value).strip().upper().rstrip('B')
+    if text and text[-1] in UNITS:
+        return int(float(text[:-1]) * UNITS[text[-1]])
+    return int(text)
+
+def read_toml(path: str) -> Dict[str, Any]:
+    try:
+        import tomllib
+    except ImportError:  # Python < 3.11
+        try:
+            import tomli as tomllib
+        except ImportError:
+            raise ValueError(f"Reading {path} needs Python 3.11+ or the tomli package")
+    with open(path, 'rb') as f:
+        return tomllib.load(f)
+
+def load_limits(path: str) -> Dict[str, Dict[str, float]]:
+    # -> {'*': defaults, lang: overrides}; {} when the project has no config
+    if not os.path.exists(path):
+        return {}
+    table = read_toml(path).get('inline', {}).get('limits', {})
+    limits = {}
+    for name, value in table.items():
+        lang, values = (name, value) if isinstance(value, dict) else ('*', {name: value})
+        for key, v in values.items():
+            if key not in KEYS:
+                raise ValueError(f"Unknown inline limit '{key}' in {path} (use {', '.join(sorted(KEYS))})")
+            limits.setdefault(lang, {})[key] = float(v) if key == 'wall' else parse_size(v)
+    return limits
+
+def limits_for(limits: Dict[str, Dict[str, float]], lang: str) -> Dict[str, float]:
+    return {**limits.get('*', {}), **limits.get(lang, {})}
+
+# Every block runs under this shim (POSIX). It forks, sets the rlimits in the
+# child and execs the block there, then writes "<peak RSS bytes> <cpu s> <code>"
+# for that child to the report fd. Measuring from a small intermediate keeps
+# the executor's own footprint out of ru_maxrss, which Linux carries across
+# fork and exec. Used instead of preexec_fn, which can deadlock a child forked
+# while other threads run (--jobs).
+SHIM = r"""
+import os, sys
+specs, report, argv = sys.argv[1], int(sys.argv[2]), sys.argv[3:]
+pid = os.fork()
+if pid == 0:
+    os.close(report)
+    try:
+        if specs:
+            import resource
+            for spec in specs.split(','):
+                which, soft, hard = map(int, spec.split(':'))
+                resource.setrlimit(which, (soft, hard))
+        os.execv(argv[0], argv)
+    except OSError as e:
+        os.write(2, f"{argv[0]}: {'not found' if e.errno == 2 else e.strerror}\n".encode())
+    os._exit(127)
+_, status, ru = os.wait4(pid, 0)
+code = -os.WTERMSIG(status) if os.WIFSIGNALED(status) else os.WEXITSTATUS(status)
+scale = 1 if sys.platform == 'darwin' else 1024  # ru_maxrss is KiB on Linux
+os.write(report, f"{ru.ru_maxrss * scale} {ru.ru_utime + ru.ru_stime} {code}".encode())
+os._exit(code if code >= 0 else 128 - code)
+"""
+
+def rlimits(limits: Dict[str, float]) -> List[Tuple[int, int, int]]:
+    # -> [(RLIMIT_*, soft, hard)] within the hard limits we (and so the child) have
+    if resource is None:
+        return []
+    out = []
+    for key, value in limits.items():
+        if key not in RLIMITS:
+            continue
+        which = getattr(resource, RLIMITS[key])
+        _, hard = resource.getrlimit(which)
+        soft = int(value) if hard == resource.RLIM_INFINITY else min(int(value), hard)
+        if key == 'cpu':
+            hard = soft + 1 if hard == resource.RLIM_INFINITY else min(soft + 1, hard)  # SIGXCPU first
+        else:
+            hard = soft
+        out.append((which, soft, hard))
+    return out
+
+def shimmed(cmd: List[str], limits: Dict[str, float], report: int) -> List[str]:
+    # cmd run through SHIM, which reports the block's usage on fd `report`
+    specs = ','.join(f"{w}:{s}:{h}" for w, s, h in rlimits(limits))
+    return [sys.executable, '-S', '-c', SHIM, specs, str(report)] + cmd
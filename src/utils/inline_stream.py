@@ -0,0 +1,155 @@
+import os
+import time
+import select
+import signal
+import subprocess
+from collections import deque
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+# Streaming capture for inline block processes. Both pipes are read as data
+# arrives (select + os.read, like the warm workers); complete lines go to a
+# sink immediately, and each stream keeps only its last `tail` bytes for the
+# result dict. Once either stream passes `limit` bytes the process is killed.
+# The block runs in its own session so a kill reaches everything it spawned.
+# POSIX only.
+
+CHUNK = 65536
+MAX_LINE = 65536  # A longer run without a newline is forwarded in pieces
+
+class Tail:
+    # Ring buffer holding the last `size` bytes written
+    def __init__(self, size: int):
+        self.size = size
+        self.chunks = deque()
+        self.held = 0
+        self.total = 0
+
+    def write(self, data: bytes):
+        self.total += len(data)
+        self.chunks.append(data)
+        self.held += len(data)
+        while self.chunks and self.held - len(self.chunks[0]) >= self.size:
+            self.held -= len(self.chunks.popleft())  # Whole chunks still leave >= size bytes
+
+    def value(self) -> bytes:
+        if self.size <= 0:
+            return b''
+        return b''.join(self.chunks)[-self.size:]
+
+    @property
+    def dropped(self) -> int:
+        return self.total - min(self.held, max(self.size, 0))
+
+class Lines:
+    # Splits a byte stream into decoded lines for the sink
+    def __init__(self, name: str, sink: Optional[Callable[[str, str], Any]]):
+        self.name = name
+        self.sink = sink
+        self.pending = b''
+
+    def feed(self, data: bytes):
+        if self.sink is None:
+            return
+        self.pending += data
+        *lines, self.pending = self.pending.split(b'\n')
+        for line in lines:
+            self.sink(self.name, line.decode(errors='replace'))
+        if len(self.pending) > MAX_LINE:
+            self.flush()
+
+    def flush(self):
+        if self.sink is not None and self.pending:
+            self.sink(self.name, self.pending.decode(errors='replace'))
+        self.pending = b''
+
+def read_report(fd: int) -> Optional[Tuple[int, float, int]]:
+    # "<max_rss> <cpu> <code>" once the reporter exited; None if it never wrote
+    try:
+        data = b''
+        while True:
+            chunk = os.read(fd, 256)
+            if not chunk:
+                break
+            data += chunk
+    finally:
+        os.close(fd)
+    try:
+        rss, cpu, code = data.split()
+        return int(rss), float(cpu), int(code)
+    except ValueError:
+        return None
+
+def run_streaming(cmd: List[str], env: Dict[str, str], timeout: Optional[float] = None,
+                  sink: Optional[Callable[[str, str], Any]] = None, tail: int = 1 << 20,
+                  limit: Optional[int] = None, report: Optional[Tuple[int, int]] = None) -> Dict[str, Any]:
+    # -> {stdout, stderr, code, stdout_bytes, stderr_bytes, max_rss, cpu[, truncated, timeout, output_limit]}
+    # report: (read, write) pipe; the command writes "<max_rss> <cpu> <code>" of
+    # the block to the write end (inline_limits.SHIM). Without one, or when the
+    # process is killed before reporting, max_rss and cpu are None.
+    try:
+        proc = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, env=env, bufsize=0,
+                                start_new_session=True, pass_fds=report[1:] if report else ())
+    except BaseException:
+        if report:
+            os.close(report[0])
+        raise
+    finally:
+        if report:
+            os.close(report[1])  # The child holds the only write end
+    streams = {proc.stdout.fileno(): ('stdout', Tail(tail), Lines('stdout', sink)),
+               proc.stderr.fileno(): ('stderr', Tail(tail), Lines('stderr', sink))}
+    buffers = {name: (buf, lines) for name, buf, lines in streams.values()}
+    deadline = None if timeout is None else time.monotonic() + timeout
+    open_fds = list(streams)
+    stopped = None  # 'timeout' or the stream that hit the limit
+    try:
+        while open_fds and stopped is None:
+            remaining = None if deadline is None else deadline - time.monotonic()
+            if remaining is not None and remaining <= 0:
+                stopped = 'timeout'
+                break
+            ready, _, _ = select.select(open_fds, [], [], remaining)
+            for fd in ready:
+                chunk = os.read(fd, CHUNK)
+                if not chunk:
+                    open_fds.remove(fd)
+                    continue
+                name, buf, lines = streams[fd]
+                buf.write(chunk)
+                lines.feed(chunk)
+                if limit is not None and buf.total > limit:
+                    stopped = name
+                    break
+        if stopped is None:
+            try:
+                remaining = None if deadline is None else max(deadline - time.monotonic(), 0)
+                proc.wait(remaining)  # Pipes closed; the process may still be running
+            except subprocess.TimeoutExpired:
+                stopped = 'timeout'
+    finally:
+        if proc.poll() is None:
+            try:
+                os.killpg(proc.pid, signal.SIGKILL)
+            except OSError:
+                pass
+        proc.wait()
+        proc.stdout.close()
+        proc.stderr.close()
+        usage = read_report(report[0]) if report else None
+    for _, lines in buffers.values():
+        lines.flush()
+    out, err = buffers['stdout'][0], buffers['stderr'][0]
+    result = {'stdout': out.value().decode(errors='replace').strip(),
+              'stderr': err.value().decode(errors='replace').strip(),
+              'code': proc.returncode, 'stdout_bytes': out.total, 'stderr_bytes': err.total,
+              'max_rss': None, 'cpu': None}
+    if usage is not None:
+        result.update(max_rss=usage[0], cpu=usage[1], code=usage[2])
+    if out.dropped or err.dropped:
+        result['truncated'] = True  # Only the last `tail` bytes of a stream were kept
+    if stopped == 'timeout':
+        result.update(code=-1, timeout=True, stderr=f"{result['stderr']}\ntimed out after {timeout:.1f}s".strip())
+    elif stopped is not None:
+        result.update(code=-1, output_limit=True,
+                      stderr=f"{result['stderr']}\n{stopped} exceeded the output limit ({limit} bytes)".strip())
+    return result
@@ -0,0 +1,290 @@
+import os
+import json
+import time
+import queue
+import select
+import subprocess
+import threading
+from typing import Any, Dict, List
+
+# Long-lived interpreter workers for inline blocks. Protocol (both directions):
+#   <byte length>\n<payload>
+# Requests carry the block's source; responses carry JSON {stdout, stderr, code}.
+# Each request runs in a fresh namespace; the worker's own stdout is reserved
+# for frames, so user output is captured in-process. The Python worker also
+# restores cwd, the environment and sys attributes after each request.
+
+PYTHON_WORKER = r'''
+import io, os, sys, json, traceback
+proto = os.fdopen(os.dup(1), 'wb')
+os.dup2(2, 1)  # Stray fd-level writes must not corrupt frames
+stdin = sys.stdin.buffer
+devnull = open(os.devnull)
+# Bound before any block runs: a block rebinding json.dumps etc. can't reach the protocol
+dumps, StringIO, print_exc = json.dumps, io.StringIO, traceback.print_exc
+read_line, read, write, flush = stdin.readline, stdin.read, proto.write, proto.flush
+chdir, environ, sys_vars = os.chdir, os.environ, vars(sys)
+cwd, env, path, saved = os.getcwd(), dict(environ), list(sys.path), dict(sys_vars)
+while True:
+    header = read_line()
+    if not header:
+        break
+    code = read(int(header)).decode()
+    out, err = StringIO(), StringIO()
+    sys.stdout, sys.stderr, sys.stdin = out, err, devnull  # input() must not read request frames
+    status = 0
+    try:
+        exec(compile(code, '<inline>', 'exec'), {'__name__': '__main__', '__builtins__': __builtins__})
+    except SystemExit as e:
+        status = e.code if isinstance(e.code, int) else (0 if e.code is None else 1)
+    except BaseException:
+        print_exc()
+        status = 1
+    finally:
+        # Process state a block may have changed: cwd, environment, sys attributes
+        for name in set(sys_vars) - set(saved):
+            del sys_vars[name]
+        sys_vars.update(saved)
+        sys.path[:] = path
+        os.environ = environ
+        environ.clear()
+        environ.update(env)
+        try:
+            chdir(cwd)
+        except OSError:
+            pass
+    data = dumps({'stdout': out.getvalue(), 'stderr': err.getvalue(), 'code': status}).encode()
+    write(b'%d\n' % len(data) + data)
+    flush()
+'''
+
+RUBY_WORKER = r'''
+require 'json'
+require 'stringio'
+def fresh_binding; binding; end
+proto = $stdout.dup
+proto.binmode
+$stdout.reopen($stderr)
+$stdin.binmode
+loop do
+  header = $stdin.gets or break
+  code = $stdin.read(header.to_i).force_encoding('UTF-8')
+  out, err = StringIO.new, StringIO.new
+  $stdout, $stderr = out, err
+  status = 0
+  begin
+    Object.new.__send__(:fresh_binding).eval(code, '<inline>')
+  rescue SystemExit => e
+    status = e.status
+  rescue Exception => e
+    err.puts "#{e.class}: #{e.message}"
+    status = 1
+  ensure
+    $stdout, $stderr = STDOUT, STDERR
+  end
+  data = JSON.generate({stdout: out.string, stderr: err.string, code: status})
+  proto.write("#{data.bytesize}\n", data)
+  proto.flush
+end
+'''
+
+JAVASCRIPT_WORKER = r'''
+const vm = require('vm');
+const util = require('util');
+let buf = Buffer.alloc(0);
+function run(code) {
+  const out = [], err = [];
+  const line = (sink) => (...args) => sink.push(util.format(...args) + '\n');
+  const sandbox = { console: { log: line(out), info: line(out), error: line(err), warn: line(err) }, require };
+  let status = 0;
+  try {
+    vm.runInNewContext(code, sandbox, { filename: 'inline.js' });
+  } catch (e) {
+    err.push(String((e && e.stack) || e) + '\n');
+    status = 1;
+  }
+  const data = Buffer.from(JSON.stringify({ stdout: out.join(''), stderr: err.join(''), code: status }));
+  process.stdout.write(data.length + '\n');
+  process.stdout.write(data);
+}
+process.stdin.on('data', (chunk) => {
+  buf = Buffer.concat([buf, chunk]);
+  for (;;) {
+    const nl = buf.indexOf(10);
+    if (nl < 0) return;
+    const len = parseInt(buf.subarray(0, nl).toString(), 10);
+    if (buf.length < nl + 1 + len) return;
+    const code = buf.subarray(nl + 1, nl + 1 + len).toString('utf8');
+    buf = buf.subarray(nl + 1 + len);
+    run(code);
+  }
+});
+'''
+
+LUA_WORKER = r'''
+local function compile(code, env)
+  if setfenv then  -- Lua 5.1 / LuaJIT: load() takes no env
+    local fn, err = loadstring(code, "=inline")
+    if fn then setfenv(fn, env) end
+    return fn, err
+  end
+  return load(code, "=inline", "t", env)
+end
+local function esc(s)
+  return (s:gsub('[%c"\\]', function(c)
+    if c == '"' then return '\\"' elseif c == '\\' then return '\\\\' end
+    return string.format('\\u%04x', c:byte())
+  end))
+end
+while true do
+  local header = io.read("*l")
+  if not header then break end
+  local code = io.read(tonumber(header))
+  local out, err = {}, {}
+  local env = setmetatable({}, {__index = _G})
+  env.print = function(...)
+    local parts = {}
+    for i = 1, select('#', ...) do parts[#parts + 1] = tostring((select(i, ...))) end
+    out[#out + 1] = table.concat(parts, "\t") .. "\n"
+  end
+  env.io = setmetatable({write = function(...)
+    for i = 1, select('#', ...) do out[#out + 1] = tostring((select(i, ...))) end
+  end}, {__index = io})
+  local status = 0
+  local fn, cerr = compile(code, env)
+  if not fn then
+    err[#err + 1] = cerr .. "\n"
+    status = 1
+  else
+    local ok, rerr = pcall(fn)
+    if not ok then err[#err + 1] = tostring(rerr) .. "\n"; status = 1 end
+  end
+  local data = string.format('{"stdout":"%s","stderr":"%s","code":%d}', esc(table.concat(out)), esc(table.concat(err)), status)
+  io.stdout:write(#data, "\n", data)
+  io.stdout:flush()
+end
+'''
+
+WORKER_CMDS = {
+    'python': ['python', '-c', PYTHON_WORKER],
+    'ruby': ['ruby', '-e', RUBY_WORKER],
+    'javascript': ['node', '-e', JAVASCRIPT_WORKER],
+    'lua': ['lua', '-e', LUA_WORKER],
+}
+
+class WorkerCrashed(Exception):
+    pass
+
+class Worker:
+    def __init__(self, cmd: List[str], env: Dict[str, str]):
+        self.proc = subprocess.Popen(cmd, stdin=subprocess.PIPE, stdout=subprocess.PIPE,
+                                     stderr=subprocess.DEVNULL, env=env, bufsize=0)
+        self.buf = b''
+        self.tasks = 0
+
+    def request(self, code: str, timeout=None) -> Dict[str, Any]:
+        data = code.encode()
+        try:
+            self.proc.stdin.write(b'%d\n' % len(data) + data)
+        except (BrokenPipeError, OSError):
+            raise WorkerCrashed()
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while b'\n' not in self.buf:
+            self.fill(deadline, timeout)
+        header, self.buf = self.buf.split(b'\n', 1)
+        try:
+            size = int(header)
+        except ValueError:
+            raise WorkerCrashed("malformed frame header") from None
+        while len(self.buf) < size:
+            self.fill(deadline, timeout)
+        body, self.buf = self.buf[:size], self.buf[size:]
+        try:
+            result = json.loads(body)
+        except ValueError:
+            raise WorkerCrashed("malformed reply") from None
+        if not isinstance(result, dict) or not {'stdout', 'stderr', 'code'} <= set(result):
+            raise WorkerCrashed("malformed reply")
+        self.tasks += 1
+        return result
+
+    def fill(self, deadline, timeout):
+        fd = self.proc.stdout.fileno()
+        remaining = None if deadline is None else max(deadline - time.monotonic(), 0)
+        ready, _, _ = select.select([fd], [], [], remaining)
+        if not ready:
+            raise subprocess.TimeoutExpired(self.proc.args[0], timeout)
+        chunk = os.read(fd, 65536)
+        if not chunk:
+            raise WorkerCrashed()
+        self.buf += chunk
+
+    def rss(self) -> int:
+        # Resident set size in bytes (Linux /proc); 0 where unavailable
+        try:
+            with open(f"/proc/{self.proc.pid}/status") as f:
+                for line in f:
+                    if line.startswith('VmRSS:'):
+                        return int(line.split()[1]) * 1024
+        except OSError:
+            pass
+        return 0
+
+    def kill(self):
+        if self.proc.poll() is None:
+            self.proc.kill()
+        self.proc.wait()
+
+class WorkerPool:
+    # Fixed-size pool of warm workers for one language
+    def __init__(self, cmd: List[str], env: Dict[str, str], size=1, max_tasks=100, max_rss=256 * 1024 * 1024):
+        self.cmd = cmd
+        self.env = env
+        self.max_tasks = max_tasks  # Recycle after this many runs (slow leaks)
+        self.max_rss = max_rss  # Recycle once resident memory passes this
+        self.idle = queue.Queue()
+        self.workers = []
+        self.lock = threading.Lock()
+        self.restarts = 0
+        for _ in range(size):
+            self.idle.put(self.spawn())
+
+    def spawn(self) -> Worker:
+        worker = Worker(self.cmd, self.env)
+        with self.lock:
+            self.workers.append(worker)
+        return worker
+
+    def replace(self, worker: Worker) -> Worker:
+        worker.kill()
+        with self.lock:
+            self.workers.remove(worker)
+            self.restarts += 1
+        return self.spawn()
+
+    def run(self, code: str, timeout=None) -> Dict[str, Any]:
+        worker = self.idle.get()
+        try:
+            result = worker.request(code, timeout)
+            if worker.tasks >= self.max_tasks or (self.max_rss and worker.rss() > self.max_rss):
+                worker = self.replace(worker)
+        except subprocess.TimeoutExpired:
+            worker = self.replace(worker)
+            result = {'stdout': '', 'stderr': f"timed out after {timeout:.1f}s", 'code': -1, 'timeout': True}
+        except WorkerCrashed as e:
+            if e.args:  # Still running but talking garbage (a block rebound its output path)
+                worker = self.replace(worker)
+                result = {'stdout': '', 'stderr': f"worker sent a {e.args[0]}; restarted", 'code': -1}
+            else:
+                code = worker.proc.wait()
+                worker = self.replace(worker)
+                result = {'stdout': '', 'stderr': f"worker crashed (exit {code})", 'code': code or -1}
+        finally:
+            self.idle.put(worker)
+        return result
+
+    def close(self):
+        with self.lock:
+            workers, self.workers = self.workers, []
+        for worker in workers:
+            worker.kill()
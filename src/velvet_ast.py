@@ -1,34 +1,53 @@
-from dataclasses import dataclass, field
+from dataclasses import dataclass, field, fields
 from typing import List, Dict, Any, Optional
 
+def slotted(cls):
+    # dataclass(slots=True) for Python < 3.10: rebuild the class with __slots__
+    # so nodes carry no per-instance __dict__. Apply above @dataclass.
+    inherited = {name for base in cls.__mro__[1:] for name in getattr(base, '__slots__', ())}
+    names = tuple(f.name for f in fields(cls))
+    ns = {k: v for k, v in cls.__dict__.items() if k not in names and k not in ('__dict__', '__weakref__')}
+    ns['__slots__'] = tuple(n for n in names if n not in inherited)
+    return type(cls)(cls.__name__, cls.__bases__, ns)
+
+@slotted
 @dataclass
 class Node:
     pass
 
+@slotted
 @dataclass
 class TypeNode(Node):
     base: str
     params: List['TypeNode'] = field(default_factory=list)  # For generics
 
+@slotted
 @dataclass
 class MapType(TypeNode):
-    key: TypeNode
-    val: TypeNode
+    base: str = 'map'
+    key: Optional[TypeNode] = None
+    val: Optional[TypeNode] = None
 
+@slotted
 @dataclass
 class SetType(TypeNode):
-    elem: TypeNode
+    base: str = 'set'
+    elem: Optional[TypeNode] = None
 
+@slotted
 @dataclass
 class TupleType(TypeNode):
-    elems: List[TypeNode]
+    base: str = 'tuple'
+    elems: List[TypeNode] = field(default_factory=list)
 
+@slotted
 @dataclass
 class VarNode(Node):
     name: str
     type: Optional[TypeNode] = None
     expr: Any = None
 
+@slotted
 @dataclass
 class FuncNode(Node):
     name: str
@@ -37,40 +56,55 @@ class FuncNode(Node):
     return_expr: Optional[Any] = None
     async_flag: bool = False
 
+@slotted
 @dataclass
 class MacroNode(Node):
     name: str
     body: str  # Expansion code
+    params: List[str] = field(default_factory=list)
 
+@slotted
 @dataclass
 class MatchNode(Node):
     expr: Any
     cases: List[Dict[str, Any]]  # pat => stmt
 
+@slotted
 @dataclass
 class PatternNode(Node):
-    kind: str  # 'var', 'tuple', 'list', 'dict'
+    kind: str  # 'var', 'lit', 'tuple', 'list', 'dict'
     parts: List[Any]  # Sub-patterns/values
+    expr: Any = None  # Destructured value (let)
 
+@slotted
 @dataclass
 class ImportNode(Node):
     path: str
 
+@slotted
 @dataclass
 class DecoratorNode(Node):
     name: str
     target: Node
 
+@slotted
 @dataclass
 class InlineNode(Node):
     lang: str
     code: str
 
+@slotted
+@dataclass
+class ExprNode(Node):
+    expr: Any  # Bare expression statement, e.g. a call
+
+@slotted
 @dataclass
 class IfNode(Node):
     cond: Any
     body: List[Node]
 
+@slotted
 @dataclass
 class LoopNode(Node):
     var: str
@@ -78,6 +112,29 @@ class LoopNode(Node):
     end: Any
     body: List[Node]
 
+# Expressions: literal/name tokens stay plain (interned) strings; operators
+# and calls are these nodes
+
+@slotted
+@dataclass
+class BinOpNode(Node):
+    op: str
+    left: Any
+    right: Any
+
+@slotted
+@dataclass
+class UnaryNode(Node):
+    op: str
+    operand: Any
+
+@slotted
+@dataclass
+class CallNode(Node):
+    func: str
+    args: List[Any] = field(default_factory=list)
+
+@slotted
 @dataclass
 class AST:
     deps: List[str]
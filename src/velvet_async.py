@@ -0,0 +1,99 @@
+import abc
+import asyncio
+import inspect
+import urllib.parse
+from typing import Any, Dict, Optional
+from velvet_interp import VelvetError
+
+# One asyncio event loop per interpreter. Calling an async Velvet function (or
+# an I/O builtin) starts a task right away and returns it; `await` suspends
+# until it finishes, so independent calls overlap. run() drains whatever is
+# still pending before returning, like a program waiting on its tasks.
+
+class VelvetIO(abc.ABC):
+    # I/O primitives awaited by Velvet code (fetch, sleep). Swap the
+    # implementation to point async code at fakes or local servers; a backend
+    # missing fetch fails when it's created, not mid-program.
+    @abc.abstractmethod
+    async def fetch(self, url: str) -> str:
+        ...
+
+    async def sleep(self, ms: int):
+        await asyncio.sleep(ms / 1000)
+
+class NetIO(VelvetIO):
+    # HTTP GET over asyncio streams; HTTP/1.0 so bodies are never chunked
+    def __init__(self, timeout: float = 30.0):
+        self.timeout = timeout
+
+    async def fetch(self, url: str) -> str:
+        parts = urllib.parse.urlsplit(url)
+        tls = parts.scheme == 'https'
+        port = parts.port or (443 if tls else 80)
+        path = (parts.path or '/') + (f"?{parts.query}" if parts.query else '')
+        reader, writer = await asyncio.wait_for(
+            asyncio.open_connection(parts.hostname, port, ssl=tls or None), self.timeout)
+        try:
+            writer.write(f"GET {path} HTTP/1.0\r\nHost: {parts.netloc}\r\nUser-Agent: velvet\r\n\r\n".encode())
+            await writer.drain()
+            data = await asyncio.wait_for(reader.read(), self.timeout)
+        finally:
+            writer.close()
+        head, _, body = data.partition(b'\r\n\r\n')
+        status = int(head.split(None, 2)[1]) if head else 0
+        if status >= 400 or not status:
+            raise ConnectionError(f"fetch {url}: HTTP {status or 'no response'}")
+        return body.decode(errors='replace')
+
+class MemoryIO(VelvetIO):
+    # In-process stand-in: canned bodies by URL, with simulated latency
+    def __init__(self, responses: Optional[Dict[str, str]] = None, latency_ms: int = 0):
+        self.responses = responses or {}
+        self.latency_ms = latency_ms
+        self.requests = 0
+
+    async def fetch(self, url: str) -> str:
+        self.requests += 1
+        if self.latency_ms:
+            await asyncio.sleep(self.latency_ms / 1000)
+        if url not in self.responses:
+            raise ConnectionError(f"fetch {url}: HTTP 404")
+        return self.responses[url]
+
+class VelvetRuntime:
+    def __init__(self, io: Optional[VelvetIO] = None):
+        self.loop = asyncio.new_event_loop()
+        self.io = io or NetIO()
+        self.pending = set()
+
+    def spawn(self, coro) -> asyncio.Task:
+        task = self.loop.create_task(coro)
+        self.pending.add(task)
+        task.add_done_callback(self.pending.discard)
+        return task
+
+    def block_on(self, value):
+        # `await` outside an async function: run the loop until value settles
+        if not inspect.isawaitable(value):
+            return value
+        if self.loop.is_running():
+            raise VelvetError("await in a non-async function called from async code; mark it async")
+        return self.loop.run_until_complete(value)
+
+    def drain(self):
+        while self.pending:
+            self.loop.run_until_complete(asyncio.gather(*self.pending))
+
+    def settle(self, result: Any) -> Any:
+        # End of a run: wait for started tasks; a task result is unwrapped
+        self.drain()
+        if isinstance(result, asyncio.Future):
+            return result.result()
+        return result
+
+    def close(self):
+        for task in list(self.pending):
+            task.cancel()
+        if self.pending:
+            self.loop.run_until_complete(asyncio.gather(*self.pending, return_exceptions=True))
+        self.loop.close()
@@ -0,0 +1,180 @@
+import os
+import json
+import time
+import pickle
+import threading
+import hashlib
+from contextlib import contextmanager
+from typing import Dict, Optional, Sequence, Tuple
+from velvet_ast import AST
+try:
+    import fcntl
+except ImportError:  # Windows: stats.json and the size estimate are updated unlocked
+    fcntl = None
+
+PARSER_VERSION = 6  # Bump when the AST/IR shape changes to invalidate old entries
+
+class VelvetCache:
+    # Content-addressed store of (AST, IR) keyed by source, macro table, IR targets and parser version
+    def __init__(self, root: Optional[str] = None, max_bytes: int = 256 * 1024 * 1024, enabled: bool = True):
+        self.root = root or os.environ.get('VELVET_CACHE_DIR', '.velvet_cache')
+        self.max_bytes = max_bytes
+        self.enabled = enabled and os.environ.get('VELVET_NO_CACHE') != '1'
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.saved = 0.0  # Seconds of lex/parse/IR work skipped by hits
+
+    def key(self, code: str, macros: Dict[str, str], targets: Optional[Sequence[str]] = None) -> str:
+        h = hashlib.sha256()
+        h.update(f"v{PARSER_VERSION}\0".encode())
+        h.update(json.dumps(sorted(macros.items())).encode())
+        if targets:
+            h.update(f"\0{','.join(targets)}".encode())
+        h.update(b"\0")
+        h.update(code.encode())
+        return h.hexdigest()
+
+    def path(self, key: str) -> str:
+        return os.path.join(self.root, key[:2], key + '.pkl')
+
+    def get(self, key: str) -> Optional[Tuple[AST, Dict]]:
+        if not self.enabled:
+            return None
+        path = self.path(key)
+        try:
+            with open(path, 'rb') as f:
+                entry = pickle.load(f)
+        except (OSError, EOFError, pickle.UnpicklingError, AttributeError, ImportError):
+            self.misses += 1
+            return None
+        os.utime(path)  # Keep recently used entries on eviction
+        self.hits += 1
+        self.saved += entry['cost']
+        return entry['ast'], entry['ir']
+
+    def put(self, key: str, ast: AST, ir: Dict, cost: float = 0.0):
+        if not self.enabled:
+            return
+        path = self.path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp, 'wb') as f:
+            pickle.dump({'ast': ast, 'ir': ir, 'cost': cost}, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp, path)  # Atomic for concurrent builds
+        size = os.path.getsize(path)
+        with self.locked():
+            # Running total in <root>/size; the full walk only happens past max_bytes
+            total = self.read_size()
+            total = sum(size for _, size, _ in self.entries()) if total is None else total + size
+            if total > self.max_bytes:
+                total = self.evict()
+            self.write_size(total)
+
+    def compile(self, code: str, parser, ir_gen=None, targets: Optional[Sequence[str]] = None) -> Tuple[AST, Dict]:
+        # Cached parse + IR generation; parser.macros and targets feed the key
+        key = self.key(code, parser.macros, targets)
+        cached = self.get(key)
+        if cached is not None:
+            from velvet_ast import MacroNode
+            for node in cached[0].nodes:  # Register its macros, as parser.parse() would have
+                if isinstance(node, MacroNode):
+                    parser.macros[node.name] = (node.params, node.body)
+            return cached
+        if ir_gen is None:
+            from velvet_ir_gen import VelvetIRGen as ir_gen
+        start = time.perf_counter()
+        ast = parser.parse(code)
+        ir = ir_gen(ast, targets).generate()
+        self.put(key, ast, ir, time.perf_counter() - start)
+        return ast, ir
+
+    def entries(self):
+        if not os.path.isdir(self.root):
+            return []
+        found = []
+        for sub in os.listdir(self.root):
+            subdir = os.path.join(self.root, sub)
+            if not os.path.isdir(subdir):
+                continue
+            for name in os.listdir(subdir):
+                if name.endswith('.pkl'):
+                    path = os.path.join(subdir, name)
+                    st = os.stat(path)
+                    found.append((st.st_mtime, st.st_size, path))
+        return found
+
+    @contextmanager
+    def locked(self):
+        # Cross-process lock (build workers) for stats.json and the size estimate
+        os.makedirs(self.root, exist_ok=True)
+        with open(os.path.join(self.root, '.lock'), 'a') as f:
+            if fcntl is not None:
+                fcntl.flock(f, fcntl.LOCK_EX)
+            yield  # Released when the file closes
+
+    def read_size(self) -> Optional[int]:
+        try:
+            with open(os.path.join(self.root, 'size')) as f:
+                return int(f.read())
+        except (OSError, ValueError):
+            return None
+
+    def write_size(self, total: int):
+        with open(os.path.join(self.root, 'size'), 'w') as f:
+            f.write(str(total))
+
+    def evict(self) -> int:
+        # Drop least recently used entries until under max_bytes; -> bytes left
+        entries = self.entries()
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            total -= size
+            self.evictions += 1
+        return total
+
+    def clear(self):
+        for _, _, path in self.entries():
+            os.remove(path)
+        try:
+            os.remove(os.path.join(self.root, 'size'))
+        except OSError:
+            pass
+
+    def stats(self) -> Dict:
+        entries = self.entries()
+        return {
+            'hits': self.hits, 'misses': self.misses, 'evictions': self.evictions,
+            'saved_seconds': round(self.saved, 4),
+            'entries': len(entries), 'bytes': sum(size for _, size, _ in entries),
+        }
+
+    def record(self):
+        # Accumulate this process's counters into <root>/stats.json (CI dashboards)
+        if not self.enabled:
+            return
+        path = os.path.join(self.root, 'stats.json')
+        totals = {'hits': 0, 'misses': 0, 'evictions': 0, 'saved_seconds': 0.0}
+        with self.locked():  # Concurrent build workers would otherwise drop each other's counts
+            try:
+                with open(path) as f:
+                    totals.update(json.load(f))
+            except (OSError, ValueError):
+                pass
+            totals['hits'] += self.hits
+            totals['misses'] += self.misses
+            totals['evictions'] += self.evictions
+            totals['saved_seconds'] = round(totals['saved_seconds'] + self.saved, 4)
+            tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(tmp, 'w') as f:
+                json.dump(totals, f)
+            os.replace(tmp, path)
+        self.hits = self.misses = self.evictions = 0
+        self.saved = 0.0
+        return totals
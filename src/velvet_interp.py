@@ -0,0 +1,399 @@
+import json
+import operator
+from typing import Any, Callable, Dict, List
+from velvet_match import build, compile_tree
+from velvet_vec import specialize
+import velvet_profile
+
+# IR is compiled once into nested closures taking the current frame (a dict);
+# execution never re-inspects IR dicts or expression trees.
+
+def _div(a, b):
+    return a // b if isinstance(a, int) and isinstance(b, int) else a / b
+
+BINOPS = {
+    '+': operator.add, '-': operator.sub, '*': operator.mul, '/': _div,
+    '<': operator.lt, '>': operator.gt, '<=': operator.le, '>=': operator.ge,
+    '==': operator.eq, '!=': operator.ne,
+}
+
+UNOPS = {'-': operator.neg, '+': operator.pos, '!': operator.not_}
+
+class VelvetError(Exception):
+    pass
+
+class Function:
+    __slots__ = ('name', 'params', 'body', 'ret', 'is_async')
+
+    def __init__(self, name, params, body, ret, is_async=False):
+        self.name = name
+        self.params = params
+        self.body = body
+        self.ret = ret
+        self.is_async = is_async
+
+    def __repr__(self):
+        return f"<func {self.name}/{len(self.params)}>"
+
+class VelvetInterpreter:
+    def __init__(self, builtins: Dict[str, Callable] = None, io=None, vectorize: bool = True):
+        self.globals = {}
+        self.vectorize = vectorize
+        self.scope = '<module>'  # Function being compiled; labels profiled IR nodes
+        self.node_seq = 0
+        self.io = io  # velvet_async.VelvetIO behind fetch/sleep; NetIO by default
+        self._runtime = None
+        self.builtins = {
+            'print': print, 'len': len, 'str': str, 'int': int,
+            'fetch': lambda url: self.runtime.spawn(self.runtime.io.fetch(url)),
+            'sleep': lambda ms: self.runtime.spawn(self.runtime.io.sleep(ms)),
+        }
+        if builtins:
+            self.builtins.update(builtins)
+
+    @property
+    def runtime(self):
+        # Event loop is created on first async use; sync programs never import asyncio
+        if self._runtime is None:
+            from velvet_async import VelvetRuntime
+            self._runtime = VelvetRuntime(self.io)
+        return self._runtime
+
+    def run(self, ir: Dict) -> Any:
+        phase = velvet_profile.phase
+        with phase('interp_compile'):
+            program = self.compile(ir['nodes'])
+        with phase('interp_run'):
+            result = program(self.globals)
+            if self._runtime is not None:
+                result = self._runtime.settle(result)  # Finish started tasks
+        return result
+
+    def close(self):
+        if self._runtime is not None:
+            self._runtime.close()
+            self._runtime = None
+
+    def compile(self, nodes: List[Dict]) -> Callable:
+        prof = velvet_profile.active
+        if prof is None:
+            stmts = [self.compile_stmt(n) for n in nodes]
+        else:
+            stmts = [self.compile_counted(prof, n) for n in nodes]
+        stmts = [s for s in stmts if s is not None]
+        if len(stmts) == 1:
+            return stmts[0]
+        def block(env):
+            result = None
+            for stmt in stmts:
+                result = stmt(env)
+            return result
+        return block
+
+    def compile_counted(self, prof, node: Dict):
+        # Profiling: count evaluations under "<function>:<n> <kind> <name>", n in source order
+        self.node_seq += 1
+        expr = node.get('expr')
+        name = node.get('name') or node.get('var') or (expr['call'] if isinstance(expr, dict) else '')
+        label = f"{self.scope}:{self.node_seq} {node['type']} {name}".rstrip()
+        stmt = self.compile_stmt(node)
+        return None if stmt is None else prof.count_node(label, stmt)
+
+    def compile_stmt(self, node: Dict):
+        kind = node['type']
+        if kind == 'var':
+            name, expr = node['name'], self.compile_expr(node['expr'])
+            def assign(env):
+                env[name] = expr(env)
+            return assign
+        if kind == 'expr':
+            return self.compile_expr(node['expr'])
+        if kind == 'func':
+            fn = self.compile_func(node)
+            name = node['name']
+            def define(env):
+                env[name] = fn
+            return define
+        if kind == 'if':
+            cond, body = self.compile_expr(node['cond']), self.compile(node['body'])
+            def if_(env):
+                if cond(env):
+                    return body(env)
+            return if_
+        if kind == 'loop':
+            return self.compile_loop(node)
+        if kind == 'match':
+            return self.compile_match(node)
+        if kind == 'pattern':
+            bind, expr = self.compile_pat(node), self.compile_expr(node['expr'])
+            def destructure(env):
+                if not bind(expr(env), env):
+                    raise VelvetError(f"let: pattern {node['kind']} did not match")
+            return destructure
+        if kind == 'decorator':
+            return self.compile_decorator(node)
+        return None  # macro: expanded before parse; nothing to run
+
+    def compile_func(self, node: Dict) -> Function:
+        params = [p['name'] for p in node['params']]
+        outer, self.scope = self.scope, node['name']
+        try:
+            if node.get('async'):
+                body = self.compile_async(node['body']) if node['body'] else None
+                ret = self.compile_async_expr(node['ret']) if node['ret'] is not None else None
+                fn = Function(node['name'], params, body, ret, True)
+            else:
+                body = self.compile(node['body']) if node['body'] else None
+                ret = self.compile_expr(node['ret']) if node['ret'] is not None else None
+                fn = Function(node['name'], params, body, ret)
+        finally:
+            self.scope = outer
+        prof = velvet_profile.active
+        if prof is not None and (fn.body is not None or fn.ret is not None):
+            prof.count_func(fn)
+        return fn
+
+    # Async function bodies: statements containing `await` compile to coroutine
+    # functions; everything else keeps the plain closures used by sync code
+
+    def has_await(self, expr) -> bool:
+        if isinstance(expr, list):
+            return (expr[0] == 'await' and len(expr) == 2) or any(self.has_await(a) for a in expr[1:])
+        if isinstance(expr, dict):
+            return any(self.has_await(a) for a in expr['args'])
+        return False
+
+    def node_awaits(self, node: Dict) -> bool:
+        kind = node['type']
+        if kind in {'func', 'decorator', 'macro'}:
+            return False  # Nested function bodies run in their own call
+        if any(self.has_await(node.get(key)) for key in ('expr', 'cond', 'start', 'end')):
+            return True
+        blocks = [c['stmt'] for c in node['cases']] if kind == 'match' else [node.get('body') or []]
+        return any(self.node_awaits(n) for block in blocks for n in block)
+
+    def compile_async(self, nodes: List[Dict]) -> Callable:
+        stmts = [(self.compile_async_stmt(n), True) if self.node_awaits(n) else (self.compile_stmt(n), False)
+                 for n in nodes]
+        stmts = [(stmt, is_async) for stmt, is_async in stmts if stmt is not None]
+        async def block(env):
+            result = None
+            for stmt, is_async in stmts:
+                result = (await stmt(env)) if is_async else stmt(env)
+            return result
+        return block
+
+    def compile_async_stmt(self, node: Dict):
+        kind = node['type']
+        if kind == 'var':
+            name, expr = node['name'], self.compile_async_expr(node['expr'])
+            async def assign(env):
+                env[name] = await expr(env)
+            return assign
+        if kind == 'expr':
+            return self.compile_async_expr(node['expr'])
+        if kind == 'if':
+            cond, body = self.compile_async_expr(node['cond']), self.compile_async(node['body'])
+            async def if_(env):
+                if await cond(env):
+                    return await body(env)
+            return if_
+        if kind == 'loop':
+            var, body = node['var'], self.compile_async(node['body'])
+            start, end = self.compile_async_expr(node['start']), self.compile_async_expr(node['end'])
+            async def loop(env):
+                for i in range(await start(env), await end(env)):
+                    env[var] = i
+                    await body(env)
+            return loop
+        if kind == 'match':
+            expr, select = self.compile_async_expr(node['expr']), self.compile_select(node['cases'])
+            stmts = [self.compile_async(c['stmt']) for c in node['cases']]
+            async def match(env):
+                case = select(await expr(env), env)
+                if case >= 0:
+                    return await stmts[case](env)
+            return match
+        bind, expr = self.compile_pat(node), self.compile_async_expr(node['expr'])  # pattern
+        async def destructure(env):
+            if not bind(await expr(env), env):
+                raise VelvetError(f"let: pattern {node['kind']} did not match")
+        return destructure
+
+    def compile_async_expr(self, expr) -> Callable:
+        if not self.has_await(expr):
+            sync = self.compile_expr(expr)
+            async def value(env):
+                return sync(env)
+            return value
+        if isinstance(expr, dict):
+            fn_load, invoke = self.compile_load(expr['call']), self.invoke
+            args = [self.compile_async_expr(a) for a in expr['args']]
+            async def call(env):
+                fn = fn_load(env)
+                return invoke(fn, [await a(env) for a in args])
+            return call
+        if expr[0] == 'await' and len(expr) == 2:
+            inner = self.compile_async_expr(expr[1])
+            async def await_(env):
+                value = await inner(env)
+                return (await value) if hasattr(value, '__await__') else value
+            return await_
+        if len(expr) == 3:
+            op, left, right = BINOPS[expr[0]], self.compile_async_expr(expr[1]), self.compile_async_expr(expr[2])
+            async def binop(env):
+                return op(await left(env), await right(env))
+            return binop
+        op, operand = UNOPS[expr[0]], self.compile_async_expr(expr[1])
+        async def unary(env):
+            return op(await operand(env))
+        return unary
+
+    def compile_loop(self, node: Dict):
+        var, body = node['var'], self.compile(node['body'])
+        start, end = self.compile_expr(node['start']), self.compile_expr(node['end'])
+        def loop(env):
+            for i in range(start(env), end(env)):
+                env[var] = i
+                body(env)
+        if self.vectorize and velvet_profile.active is None:  # Profiles count the body per iteration
+            return specialize(node, body, start, end, self.compile_load) or loop  # Batched sums (velvet_vec)
+        return loop
+
+    def compile_match(self, node: Dict):
+        expr, select = self.compile_expr(node['expr']), self.compile_select(node['cases'])
+        stmts = [self.compile(c['stmt']) for c in node['cases']]
+        def match(env):
+            case = select(expr(env), env)
+            if case >= 0:
+                return stmts[case](env)
+        return match
+
+    def compile_select(self, cases: List[Dict]) -> Callable:
+        # Decision tree over all arms (velvet_match): literal arms hash-dispatch,
+        # shared destructuring tests run once
+        tree = build([c['pat'] for c in cases], self.literal)
+        return compile_tree(tree, lambda src: self.compile_expr(json.loads(src)))
+
+    def compile_pat(self, pat: Dict):
+        # Returns bind(value, env) -> bool; binds names into env on success
+        kind, parts = pat['kind'], pat['parts']
+        if kind == 'var':
+            name = parts[0]
+            if name == '_':
+                return lambda value, env: True
+            def bind_var(value, env):
+                env[name] = value
+                return True
+            return bind_var
+        if kind == 'lit':
+            lit = self.literal(parts[0])
+            return lambda value, env: value == lit
+        if kind in {'tuple', 'list'}:
+            subs = [self.compile_pat(p) for p in parts]
+            def bind_seq(value, env):
+                if not isinstance(value, (list, tuple)) or len(value) != len(subs):
+                    return False
+                return all(sub(v, env) for sub, v in zip(subs, value))
+            return bind_seq
+        if kind == 'dict':
+            entries = [(self.compile_expr(key), self.compile_pat(val)) for key, val in parts]
+            def bind_dict(value, env):
+                if not isinstance(value, dict):
+                    return False
+                for key, sub in entries:
+                    k = key(env)
+                    if k not in value or not sub(value[k], env):
+                        return False
+                return True
+            return bind_dict
+        raise VelvetError(f"Unknown pattern kind: {kind}")
+
+    def compile_decorator(self, node: Dict):
+        target = self.compile_stmt(node['target'])
+        deco, name = self.compile_load(node['name']), node['target'].get('name')
+        def decorate(env):
+            target(env)
+            try:
+                wrapper = deco(env)
+            except VelvetError:
+                return  # Undefined decorators are annotations only
+            env[name] = self.invoke(wrapper, [env[name]])
+        return decorate
+
+    def compile_expr(self, expr) -> Callable:
+        # Expression trees from the parser: name/literal strings, [op, l, r],
+        # [op, x] and {'call': f, 'args': [...]}
+        if expr is None:
+            return lambda env: None
+        if isinstance(expr, str):
+            return self.compile_atom(expr)
+        if isinstance(expr, dict):
+            return self.compile_call(expr['call'], expr['args'])
+        if len(expr) == 3:
+            return self.compile_binop(BINOPS[expr[0]], self.compile_expr(expr[1]), self.compile_expr(expr[2]))
+        if expr[0] == 'await':
+            operand = self.compile_expr(expr[1])
+            return lambda env: self.runtime.block_on(operand(env))  # Top-level await: run the loop
+        return self.compile_unary(UNOPS[expr[0]], self.compile_expr(expr[1]))
+
+    def compile_binop(self, op, left, right):
+        return lambda env: op(left(env), right(env))
+
+    def compile_unary(self, op, operand):
+        return lambda env: op(operand(env))
+
+    def compile_atom(self, tok: str):
+        if tok[0].isdigit() or tok[0] == '"' or tok == '{}' or (tok[0] == '-' and tok[1:].isdigit()):
+            value = self.literal(tok)
+            if isinstance(value, dict):
+                return lambda env: {}
+            return lambda env: value
+        return self.compile_load(tok)
+
+    def literal(self, tok: str):
+        if tok[0] == '"':
+            return tok[1:-1]
+        if tok == '{}':
+            return {}
+        return int(tok) if tok.lstrip('-').isdigit() else tok  # '-4' comes from constant folding
+
+    def compile_load(self, name: str):
+        g, b = self.globals, self.builtins
+        def load(env):
+            try:
+                return env[name]
+            except KeyError:
+                if name in g:
+                    return g[name]
+                if name in b:
+                    return b[name]
+                raise VelvetError(f"Undefined name: {name}")
+        return load
+
+    def compile_call(self, name: str, args: List) -> Callable:
+        fn_load = self.compile_load(name)
+        arg_fns = [self.compile_expr(a) for a in args]
+        invoke = self.invoke
+        def call(env):
+            return invoke(fn_load(env), [a(env) for a in arg_fns])
+        return call
+
+    def invoke(self, fn, args: List) -> Any:
+        if isinstance(fn, Function):
+            if len(args) != len(fn.params):
+                raise VelvetError(f"{fn.name}() takes {len(fn.params)} args, got {len(args)}")
+            frame = dict(zip(fn.params, args))
+            if fn.is_async:
+                return self.runtime.spawn(self.call_async(fn, frame))  # Starts now; await joins it
+            if fn.body is not None:
+                fn.body(frame)
+            return fn.ret(frame) if fn.ret is not None else None
+        if callable(fn):
+            return fn(*args)
+        raise VelvetError(f"Not callable: {fn!r}")
+
+    async def call_async(self, fn: Function, frame: Dict) -> Any:
+        if fn.body is not None:
+            await fn.body(frame)
+        return (await fn.ret(frame)) if fn.ret is not None else None
@@ -0,0 +1,231 @@
+import os
+import sys
+import mmap
+import array
+import struct
+from dataclasses import fields, is_dataclass
+from typing import Any, Dict, Iterator, List
+
+# Binary IR container (.ir.bin), little-endian:
+#   header                       HEADER below
+#   string index   u32[n_strings + 1]  byte offsets into string data
+#   string data    utf-8, deduplicated (keys, node types and names repeat a lot)
+#   value table    n_values fixed 12-byte records (tag u32, a u32, b u32)
+#   child pool     u32[]       list items / dict (key string, value) pairs
+#   node table     u32[n_nodes]     value index of each top-level IR node
+# Values are hash-consed: equal scalars and equal subtrees (RPN tokens, the
+# per-language type maps on every ~var) are stored once and shared.
+# The root value is the IR dict minus 'nodes'. The reader maps the file and decodes
+# values on access, so opening is O(1) and memory tracks what is touched.
+
+MAGIC = b'VLIR'
+VERSION = 1
+HEADER = struct.Struct('<4sHHIIIII5Q')
+RECORD = struct.Struct('<III')
+
+NULL, TRUE, FALSE, INT, BIGINT, FLOAT, STR, LIST, DICT = range(9)
+
+class IRWriter:
+    def __init__(self):
+        self.strings: Dict[str, int] = {}
+        self.records = bytearray()
+        self.n_values = 0
+        self.children: List[int] = []
+        self.interned: Dict[tuple, int] = {}  # (tag, a, b) or (tag, children): value index
+
+    def string(self, s: str) -> int:
+        idx = self.strings.get(s)
+        if idx is None:
+            idx = self.strings[s] = len(self.strings)
+        return idx
+
+    def record(self, tag, a=0, b=0) -> int:
+        key = (tag, a, b)
+        idx = self.interned.get(key)
+        if idx is None:
+            self.records += RECORD.pack(tag, a, b)
+            idx = self.interned[key] = self.n_values
+            self.n_values += 1
+        return idx
+
+    def compound(self, tag, items: tuple, count: int) -> int:
+        key = (tag, items)
+        idx = self.interned.get(key)
+        if idx is None:
+            start = len(self.children)
+            self.children.extend(items)
+            idx = self.interned[key] = self.record(tag, start, count)
+        return idx
+
+    def value(self, v: Any) -> int:
+        if v is None:
+            return self.record(NULL)
+        if v is True:
+            return self.record(TRUE)
+        if v is False:
+            return self.record(FALSE)
+        if isinstance(v, int):
+            if -2 ** 63 <= v < 2 ** 63:
+                u = v & 0xFFFFFFFFFFFFFFFF
+                return self.record(INT, u & 0xFFFFFFFF, u >> 32)
+            return self.record(BIGINT, self.string(str(v)))
+        if isinstance(v, float):
+            lo, hi = struct.unpack('<II', struct.pack('<d', v))
+            return self.record(FLOAT, lo, hi)
+        if isinstance(v, str):
+            return self.record(STR, self.string(v))
+        if isinstance(v, (list, tuple)):
+            items = tuple(self.value(x) for x in v)  # Children first, then one contiguous run
+            return self.compound(LIST, items, len(items))
+        if isinstance(v, dict):
+            items = tuple(i for k, x in v.items() for i in (self.string(str(k)), self.value(x)))
+            return self.compound(DICT, items, len(v))
+        if is_dataclass(v):
+            return self.value({f.name: getattr(v, f.name) for f in fields(v)})
+        raise TypeError(f"Cannot encode {type(v).__name__} in binary IR")
+
+    def dumps(self, ir: Dict) -> bytes:
+        nodes = [self.value(n) for n in ir.get('nodes', [])]
+        root = self.value({k: v for k, v in ir.items() if k != 'nodes'})  # deps, imports, inline
+
+        data = [s.encode() for s in self.strings]
+        index, pos = [], 0
+        for d in data:
+            index.append(pos)
+            pos += len(d)
+        index.append(pos)
+        str_index = HEADER.size
+        str_data = str_index + 4 * len(index)
+        values = str_data + pos
+        values += -values % 4
+        children = values + len(self.records)
+        node_table = children + 4 * len(self.children)
+        out = bytearray(HEADER.pack(MAGIC, VERSION, 0, len(data), self.n_values, len(self.children),
+                                    len(nodes), root, str_index, str_data, values, children, node_table))
+        out += struct.pack(f'<{len(index)}I', *index)
+        out += b''.join(data)
+        out += bytes(-len(out) % 4)
+        out += self.records
+        out += struct.pack(f'<{len(self.children)}I', *self.children)
+        out += struct.pack(f'<{len(nodes)}I', *nodes)
+        return bytes(out)  # Length stays a multiple of 4: the reader maps it as u32 words
+
+def dumps(ir: Dict) -> bytes:
+    return IRWriter().dumps(ir)
+
+def dump(ir: Dict, path: str):
+    data = dumps(ir)
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, 'wb') as f:
+        f.write(data)
+    os.replace(tmp, path)
+
+class NodeTable:
+    # Sequence view over the top-level IR nodes; each access decodes one node
+    def __init__(self, ir: 'IRFile'):
+        self.ir = ir
+
+    def __len__(self):
+        return self.ir.n_nodes
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self[j] for j in range(*i.indices(len(self)))]
+        if i < 0:
+            i += len(self)
+        if not 0 <= i < len(self):
+            raise IndexError(i)
+        return self.ir.decode(self.ir.words[self.ir.node_table // 4 + i])
+
+    def __iter__(self) -> Iterator[Dict]:
+        for i in range(len(self)):
+            yield self[i]
+
+class IRFile:
+    # Memory-mapped binary IR; ir['nodes'] is a lazy NodeTable, other keys decode on access
+    def __init__(self, path: str):
+        self.file = open(path, 'rb')
+        if os.fstat(self.file.fileno()).st_size < HEADER.size:
+            self.file.close()
+            raise ValueError(f"{path}: not a binary IR file")
+        self.buf = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+        (magic, version, _, self.n_strings, self.n_values, self.n_children, self.n_nodes, root,
+         self.str_index, self.str_data, self.values, self.children, self.node_table) = HEADER.unpack_from(self.buf)
+        if magic != MAGIC or version != VERSION:
+            self.close()
+            raise ValueError(f"{path}: unsupported IR format {magic!r} v{version}")
+        if len(self.buf) % 4:
+            self.close()
+            raise ValueError(f"{path}: truncated binary IR")
+        # u32 view of the whole file (every section is 4-byte aligned)
+        if sys.byteorder == 'little':
+            self.words = memoryview(self.buf).cast('I')
+        else:
+            self.words = array.array('I', self.buf)
+            self.words.byteswap()
+        self.strings: Dict[int, str] = {}
+        self.rest = self.decode(root)
+        self.nodes = NodeTable(self)
+
+    def string(self, i: int) -> str:
+        s = self.strings.get(i)
+        if s is None:
+            w = self.str_index // 4 + i
+            start, end = self.words[w], self.words[w + 1]
+            s = self.strings[i] = self.buf[self.str_data + start:self.str_data + end].decode()
+        return s
+
+    def decode(self, idx: int) -> Any:
+        words = self.words
+        w = self.values // 4 + 3 * idx
+        tag, a, b = words[w], words[w + 1], words[w + 2]
+        if tag == STR:
+            return self.string(a)
+        if tag == LIST:
+            c = self.children // 4 + a
+            return [self.decode(x) for x in words[c:c + b]]
+        if tag == DICT:
+            c = self.children // 4 + a
+            pairs = words[c:c + 2 * b]
+            return {self.string(pairs[i]): self.decode(pairs[i + 1]) for i in range(0, 2 * b, 2)}
+        if tag == INT:
+            v = a | (b << 32)
+            return v - (1 << 64) if v >= 1 << 63 else v
+        if tag == NULL:
+            return None
+        if tag == TRUE:
+            return True
+        if tag == FALSE:
+            return False
+        if tag == BIGINT:
+            return int(self.string(a))
+        if tag == FLOAT:
+            return struct.unpack('<d', struct.pack('<II', a, b))[0]
+        raise ValueError(f"Corrupt binary IR: tag {tag} at value {idx}")
+
+    def __getitem__(self, key: str):
+        return self.nodes if key == 'nodes' else self.rest[key]
+
+    def get(self, key: str, default=None):
+        return self.nodes if key == 'nodes' else self.rest.get(key, default)
+
+    def keys(self):
+        return list(self.rest) + ['nodes']
+
+    def to_dict(self) -> Dict:
+        return {**self.rest, 'nodes': list(self.nodes)}
+
+    def close(self):
+        if isinstance(getattr(self, 'words', None), memoryview):
+            self.words.release()
+        self.buf.close()
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+def load(path: str) -> IRFile:
+    return IRFile(path)
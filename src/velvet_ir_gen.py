@@ -1,73 +1,108 @@
 import json
+from typing import Optional, Sequence
 from velvet_ast import *
+from velvet_types import VelvetTypeResolver
+from velvet_profile import phase
 
 class VelvetIRGen:
-    def __init__(self, ast: AST):
+    def __init__(self, ast: AST, targets: Optional[Sequence[str]] = None):
         self.ast = ast
         self.ir = {}
-        self.type_mappings = {
-            'int': {
-                'rust': 'i32', 'python': 'int', 'go': 'int', 'crystal': 'Int32', 'ruby': 'Integer', 
-                'c': 'int', 'cpp': 'int', 'csharp': 'int', 'julia': 'Int', 'zig': 'i32', 
-                'lua': 'number', 'java': 'int', 'javascript': 'number', 'shell': 'int', 'powershell': 'int'
-            },
-            'str': {
-                'rust': '&str', 'python': 'str', 'go': 'string', 'crystal': 'String', 'ruby': 'String', 
-                'c': 'char*', 'cpp': 'std::string', 'csharp': 'string', 'julia': 'String', 'zig': '[]const u8', 
-                'lua': 'string', 'java': 'String', 'javascript': 'string', 'shell': 'string', 'powershell': 'string'
-            },
-            'list<T>': {
-                'rust': 'Vec<T>', 'python': 'list', 'go': '[]T', 'crystal': 'Array(T)', 'ruby': 'Array', 
-                'c': 'array', 'cpp': 'std::vector<T>', 'csharp': 'List<T>', 'julia': 'Vector{T}', 'zig': '[]T', 
-                'lua': 'table', 'java': 'List<T>', 'javascript': 'array', 'shell': 'array', 'powershell': 'array'
-            },
-            'map<K,V>': {
-                'rust': 'HashMap<K,V>', 'python': 'dict', 'go': 'map[K]V', 'crystal': 'Hash(K,V)', 'ruby': 'Hash', 
-                'c': 'map', 'cpp': 'std::map<K,V>', 'csharp': 'Dictionary<K,V>', 'julia': 'Dict{K,V}', 'zig': 'std.HashMap(K,V)', 
-                'lua': 'table', 'java': 'Map<K,V>', 'javascript': 'object', 'shell': 'assoc', 'powershell': 'hashtable'
-            },
-            'set<T>': {
-                'rust': 'HashSet<T>', 'python': 'set', 'go': 'map[T]struct{}', 'crystal': 'Set(T)', 'ruby': 'Set', 
-                'c': 'set', 'cpp': 'std::set<T>', 'csharp': 'HashSet<T>', 'julia': 'Set{T}', 'zig': 'std.HashSet(T)', 
-                'lua': 'table', 'java': 'Set<T>', 'javascript': 'Set', 'shell': 'set', 'powershell': 'hashset'
-            },
-            'tuple<T1,T2>': {
-                'rust': '(T1,T2)', 'python': 'tuple', 'go': 'struct{T1;T2}', 'crystal': 'Tuple(T1,T2)', 'ruby': 'Array', 
-                'c': 'struct', 'cpp': 'std::tuple<T1,T2>', 'csharp': 'Tuple<T1,T2>', 'julia': 'Tuple{T1,T2}', 'zig': 'struct {T1, T2}', 
-                'lua': 'table', 'java': 'Pair<T1,T2>', 'javascript': 'array', 'shell': 'array', 'powershell': 'array'
-            },
-            # Add more types as needed
-        }
+        self.types = VelvetTypeResolver(targets)  # Emit type maps only for these languages
+        self.type_mappings = self.types.mappings
 
     def generate(self) -> Dict:
-        self.ir['deps'] = self.ast.deps
-        self.ir['imports'] = [i.path for i in self.ast.imports]
-        self.ir['nodes'] = self.gen_nodes(self.ast.nodes)
-        self.ir['inline'] = [{'lang': i.lang, 'code': i.code, 'embed': True} for i in self.ast.inline]
+        with phase('ir_gen'):
+            self.ir['deps'] = self.ast.deps
+            self.ir['imports'] = [i.path for i in self.ast.imports]
+            self.ir['nodes'] = self.gen_nodes(self.ast.nodes)
+            self.ir['inline'] = [{'lang': i.lang, 'code': i.code, 'embed': True} for i in self.ast.inline]
         return self.ir
 
+    def write(self, base: str, fmt: str = 'json') -> List[str]:
+        return write_ir(self.ir or self.generate(), base, fmt)
+
     def gen_nodes(self, nodes: List[Node]):
+        # Exact-type dispatch: one dict lookup per node instead of an isinstance chain
+        dispatch = self.dispatch
         ir_nodes = []
         for node in nodes:
-            if isinstance(node, DecoratorNode):
-                ir_nodes.append({'type': 'decorator', 'name': node.name, 'target': self.gen_nodes([node.target])[0]})
-            elif isinstance(node, VarNode):
-                mapped_type = {lang: self.type_mappings.get(node.type.base, {}).get(lang, node.type.base) for lang in self.type_mappings['int']}
-                ir_nodes.append({'type': 'var', 'name': node.name, 'typ': mapped_type, 'expr': node.expr})
-            elif isinstance(node, FuncNode):
-                ir_nodes.append({'type': 'func', 'name': node.name, 'async': node.async_flag, 'params': self.gen_nodes(node.params), 'body': self.gen_nodes(node.body), 'ret': node.return_expr})
-            elif isinstance(node, MacroNode):
-                ir_nodes.append({'type': 'macro', 'name': node.name, 'body': node.body})
-            elif isinstance(node, MatchNode):
-                ir_nodes.append({'type': 'match', 'expr': node.expr, 'cases': node.cases})
-            elif isinstance(node, PatternNode):
-                ir_nodes.append({'type': 'pattern', 'kind': node.kind, 'parts': node.parts})
-            elif isinstance(node, IfNode):
-                ir_nodes.append({'type': 'if', 'cond': node.cond, 'body': self.gen_nodes(node.body)})
-            elif isinstance(node, LoopNode):
-                ir_nodes.append({'type': 'loop', 'var': node.var, 'start': node.start, 'end': node.end, 'body': self.gen_nodes(node.body)})
+            gen = dispatch.get(type(node))
+            if gen is not None:
+                ir_nodes.append(gen(self, node))
         return ir_nodes
 
+    def gen_decorator(self, node: DecoratorNode):
+        return {'type': 'decorator', 'name': node.name, 'target': self.gen_nodes([node.target])[0]}
+
+    def gen_var(self, node: VarNode):
+        return {'type': 'var', 'name': node.name, 'typ': self.types.resolve(node.type), 'expr': self.gen_tree(node.expr)}
+
+    def gen_func(self, node: FuncNode):
+        return {'type': 'func', 'name': node.name, 'async': node.async_flag, 'params': self.gen_nodes(node.params), 'body': self.gen_nodes(node.body), 'ret': self.gen_tree(node.return_expr)}
+
+    def gen_macro(self, node: MacroNode):
+        return {'type': 'macro', 'name': node.name, 'params': node.params, 'body': node.body}
+
+    def gen_match(self, node: MatchNode):
+        cases = [{'pat': self.gen_pat(c['pat']), 'stmt': self.gen_nodes([c['stmt']])} for c in node.cases]
+        return {'type': 'match', 'expr': self.gen_tree(node.expr), 'cases': cases}
+
+    def gen_pattern(self, node: PatternNode):
+        pat = self.gen_pat(node)
+        return {'type': 'pattern', 'kind': pat['kind'], 'parts': pat['parts'], 'expr': self.gen_tree(node.expr)}
+
+    def gen_if(self, node: IfNode):
+        return {'type': 'if', 'cond': self.gen_tree(node.cond), 'body': self.gen_nodes(node.body)}
+
+    def gen_loop(self, node: LoopNode):
+        return {'type': 'loop', 'var': node.var, 'start': self.gen_tree(node.start), 'end': self.gen_tree(node.end), 'body': self.gen_nodes(node.body)}
+
+    def gen_expr(self, node: ExprNode):
+        return {'type': 'expr', 'expr': self.gen_tree(node.expr)}
+
+    def gen_tree(self, expr):
+        # Expression tree -> IR: names/literals stay strings, [op, left, right],
+        # [op, operand] for unary operators, {'call': f, 'args': [...]}
+        if expr is None or isinstance(expr, str):
+            return expr
+        kind = type(expr)
+        if kind is BinOpNode:
+            return [expr.op, self.gen_tree(expr.left), self.gen_tree(expr.right)]
+        if kind is UnaryNode:
+            return [expr.op, self.gen_tree(expr.operand)]
+        return {'call': expr.func, 'args': [self.gen_tree(a) for a in expr.args]}
+
+    def gen_pat(self, pat: PatternNode):
+        # Patterns become plain dicts so IR stays JSON-serializable
+        if pat.kind in {'tuple', 'list'}:
+            return {'kind': pat.kind, 'parts': [self.gen_pat(p) for p in pat.parts]}
+        if pat.kind == 'dict':
+            return {'kind': 'dict', 'parts': [[self.gen_tree(key), self.gen_pat(val)] for key, val in pat.parts]}
+        return {'kind': pat.kind, 'parts': list(pat.parts)}
+
+def write_ir(ir: Dict, base: str, fmt: str = 'json') -> List[str]:
+    # Writes <base>.json and/or <base>.bin (fmt: json, bin or both); returns the paths
+    if fmt not in {'json', 'bin', 'both'}:
+        raise ValueError(f"Unknown IR format: {fmt}")
+    paths = []
+    if fmt in {'json', 'both'}:
+        with open(base + '.json', 'w') as f:
+            f.write(json.dumps(ir, default=lambda o: o.__dict__))  # C encoder; json.dump streams in Python
+        paths.append(base + '.json')
+    if fmt in {'bin', 'both'}:
+        from velvet_ir_bin import dump
+        dump(ir, base + '.bin')
+        paths.append(base + '.bin')
+    return paths
+
+VelvetIRGen.dispatch = {
+    DecoratorNode: VelvetIRGen.gen_decorator, VarNode: VelvetIRGen.gen_var,
+    FuncNode: VelvetIRGen.gen_func, MacroNode: VelvetIRGen.gen_macro,
+    MatchNode: VelvetIRGen.gen_match, PatternNode: VelvetIRGen.gen_pattern,
+    IfNode: VelvetIRGen.gen_if, LoopNode: VelvetIRGen.gen_loop, ExprNode: VelvetIRGen.gen_expr,
+}
+
 if __name__ == '__main__':
     # Usage: python velvet_ir_gen.py <ast.json> > ir.json
     pass
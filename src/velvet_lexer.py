@@ -1,27 +1,151 @@
 import re
+import sys
+from array import array
+from bisect import bisect_right
+
+class TokenStream:
+    # Compact token storage: kind ids + start/end offsets into the source.
+    # Values are sliced from the source only when asked for.
+    def __init__(self, code: str, kind_names):
+        self.code = code
+        self.kind_names = kind_names
+        self.kinds = array('B')
+        self.starts = array('I')
+        self.ends = array('I')
+        self._line_starts = None
+        self._extra = []  # Text of tokens appended by append_text, pending seal()
+        self._extra_len = len(code)
+        # Identifiers/numbers repeat a lot; interned values share one str per name
+        self.intern_ids = {i for i, name in enumerate(kind_names) if name in ('ID', 'NUM')}
+
+    def __len__(self):
+        return len(self.kinds)
+
+    def __getitem__(self, i):
+        # (kind, value) pair, same shape as VelvetLexer.lex entries
+        k = self.kinds[i]
+        value = self.code[self.starts[i]:self.ends[i]]
+        return self.kind_names[k], sys.intern(value) if k in self.intern_ids else value
+
+    def __iter__(self):
+        code, names = self.code, self.kind_names
+        for k, s, e in zip(self.kinds, self.starts, self.ends):
+            yield names[k], code[s:e]
+
+    def copy_range(self, other: 'TokenStream', start: int, end: int):
+        # Append tokens [start, end) of another stream over the same source
+        self.kinds.extend(other.kinds[start:end])
+        self.starts.extend(other.starts[start:end])
+        self.ends.extend(other.ends[start:end])
+
+    def append_text(self, kid: int, text: str):
+        # Token with no source span (macro expansion output); stored past the
+        # end of the source and made visible by seal()
+        self.kinds.append(kid)
+        self.starts.append(self._extra_len)
+        self._extra_len += len(text)
+        self.ends.append(self._extra_len)
+        self._extra.append(text)
+
+    def seal(self):
+        if self._extra:
+            self.code += ''.join(self._extra)
+            self._extra = []
+        return self
+
+    def kind(self, i):
+        return self.kind_names[self.kinds[i]]
+
+    def value(self, i):
+        return self.code[self.starts[i]:self.ends[i]]
+
+    def span(self, i):
+        return self.starts[i], self.ends[i]
+
+    def line_col(self, i):
+        # 1-based line and column of token i
+        if self._line_starts is None:
+            self._line_starts = array('q', [0])
+            self._line_starts.extend(m.end() for m in re.finditer('\n', self.code))
+        start = self.starts[i]
+        line = bisect_right(self._line_starts, start)
+        return line, start - self._line_starts[line - 1] + 1
+
+# Inline blocks (#lang{ ... }) are foreign code: after an INLINE token the
+# lexer looks only for braces and string literals until the matching '}',
+# then emits one INLINE_CODE token spanning the body. Strings may not cross a
+# line, except Python triple quotes and JS template literals; in C-family
+# languages '...' is a one-character literal, so Rust lifetimes stay plain.
+RAW_OPEN_RE = re.compile(r'\s*\{')
+RAW_STRINGS = r'"(?:\\.|[^"\\\n])*"|`(?:\\.|[^`\\])*`|[{}]'
+RAW_RE = re.compile(r'"""[\s\S]*?"""|\'\'\'[\s\S]*?\'\'\'|\'(?:\\.|[^\'\\\n])*\'|' + RAW_STRINGS)
+RAW_CHAR_RE = re.compile(r"'(?:\\[^'\n]{1,8}|[^'\\\n])'|" + RAW_STRINGS)
+CHAR_LANGS = {'c', 'cpp', 'csharp', 'java', 'rust', 'go', 'zig', 'crystal', 'julia'}
+
+def raw_block(code: str, pos: int, lang: str = ''):
+    # Body span (start, end) of the {...} block at pos, or None if no '{' follows
+    m = RAW_OPEN_RE.match(code, pos)
+    if m is None:
+        return None
+    scan = RAW_CHAR_RE if lang in CHAR_LANGS else RAW_RE
+    depth = 1
+    for mo in scan.finditer(code, m.end()):
+        ch = mo.group()
+        if ch == '{':
+            depth += 1
+        elif ch == '}':
+            depth -= 1
+            if depth == 0:
+                return m.end(), mo.start()
+    line = code.count('\n', 0, pos) + 1
+    raise ValueError(f"Unterminated inline block at line {line}")
 
 class VelvetLexer:
     def __init__(self):
         self.token_specs = [
-            ('DEP_START', r'<'), ('DEP_END', r'>'),
-            ('VAR', r'~'), ('FUNC', r'!'), ('IF', r'\?'), ('LOOP', r'\*'),
-            ('MATCH', r'match'), ('LET', r'let'), ('ASYNC', r'async'),
-            ('AWAIT', r'await'), ('IMPORT', r'import'),
-            ('DECORATOR', r'@[\w]+'), ('MACRO', r'!macro'),
+            ('CMP', r'[<>=!]='), ('DEP_START', r'<'), ('DEP_END', r'>'),  # '<'/'>' double as comparisons
+            ('VAR', r'~'), ('MACRO', r'!macro\b'), ('FUNC', r'!'), ('IF', r'\?'), ('LOOP', r'\*'),
+            ('MATCH', r'match\b'), ('LET', r'let\b'), ('ASYNC', r'async\b'),
+            ('AWAIT', r'await\b'), ('IMPORT', r'import\b'),
+            ('DECORATOR', r'@[\w]+'),
             ('INLINE', r'#[\w]+'), ('LBRACE', r'{'), ('RBRACE', r'}'),
             ('LPAREN', r'\('), ('RPAREN', r'\)'), ('COMMA', r','),
-            ('EQ', r'='), ('COLON', r':'), ('SEMI', r';'),
-            ('ARROW', r'=>'), ('ID', r'[a-zA-Z_][a-zA-Z0-9_]*'),
+            ('ARROW', r'=>'), ('EQ', r'='), ('COLON', r':'), ('SEMI', r';'),
+            ('RANGE', r'\.\.'), ('CARET', r'\^'), ('ID', r'[a-zA-Z_][a-zA-Z0-9_]*'),
             ('NUM', r'\d+'), ('STR', r'".*?"'), ('OP', r'[+\-*/]'),
             ('COMMENT', r'@.*?$'), ('LBRACKET', r'\['), ('RBRACKET', r'\]'),
         ]
         self.token_re = re.compile('|'.join(f'(?P<{name}>{pat})' for name, pat in self.token_specs), re.MULTILINE)
+        self.kind_names = [name for name, _ in self.token_specs] + ['INLINE_CODE']  # Raw mode only
+        self.kind_ids = {name: i for i, name in enumerate(self.kind_names)}
+
+    def iter_tokens(self, code: str):
+        # Lazy mode: yields (kind_id, start, end) as the regex advances
+        skip, inline, raw = self.kind_ids['COMMENT'], self.kind_ids['INLINE'], self.kind_ids['INLINE_CODE']
+        pos = 0
+        while True:
+            for mo in self.token_re.finditer(code, pos):
+                kid = mo.lastindex - 1  # one top-level group per spec
+                if kid == skip:
+                    continue
+                yield kid, mo.start(), mo.end()
+                if kid == inline:
+                    body = raw_block(code, mo.end(), code[mo.start() + 1:mo.end()])
+                    if body is not None:
+                        yield raw, body[0], body[1]
+                        pos = body[1] + 1  # Resume after the closing '}'
+                        break
+            else:
+                return
+
+    def lex_stream(self, code: str) -> TokenStream:
+        stream = TokenStream(code, self.kind_names)
+        kinds, starts, ends = stream.kinds, stream.starts, stream.ends
+        for kid, s, e in self.iter_tokens(code):
+            kinds.append(kid)
+            starts.append(s)
+            ends.append(e)
+        return stream
 
     def lex(self, code: str):
-        tokens = []
-        for mo in self.token_re.finditer(code):
-            kind = mo.lastgroup
-            value = mo.group()
-            if kind != 'COMMENT':
-                tokens.append((kind, value))
-        return tokens
+        return list(self.lex_stream(code))
@@ -0,0 +1,147 @@
+from typing import Dict, List, Tuple
+from velvet_lexer import VelvetLexer, TokenStream
+
+# Token-level macro expansion, one left-to-right pass over the token stream.
+# `!macro name(~a, ~b) { body };` registers `name` where it is defined; later
+# `name(x, y)` calls are replaced by the body with a/b substituted. Macros
+# without a parameter list take one implicit parameter `x`.
+
+MAX_DEPTH = 64
+
+class MacroExpander:
+    def __init__(self, lexer: VelvetLexer, macros: Dict[str, Tuple[List[str], str]]):
+        self.lexer = lexer
+        self.macros = macros  # name: (params, body text); shared with the parser
+        self.compiled = {}  # name: (params, body tokens, wrap)
+        self.memo = {}  # (name, args): expansion tokens
+        ids = lexer.kind_ids
+        self.ID, self.MACRO, self.VAR = ids['ID'], ids['MACRO'], ids['VAR']
+        self.LPAREN, self.RPAREN, self.COMMA = ids['LPAREN'], ids['RPAREN'], ids['COMMA']
+        self.LBRACE, self.RBRACE = ids['LBRACE'], ids['RBRACE']
+        self.SEMI, self.CARET = ids['SEMI'], ids['CARET']
+
+    def expand(self, stream: TokenStream) -> TokenStream:
+        kinds = stream.kinds
+        if not self.macros and self.MACRO not in kinds:
+            return stream  # Nothing to do: no copy
+        ID, LPAREN, MACRO, macros = self.ID, self.LPAREN, self.MACRO, self.macros
+        out = TokenStream(stream.code, stream.kind_names)
+        n, i, copied = len(kinds), 0, 0
+        while i < n:
+            k = kinds[i]
+            if k == MACRO:
+                i = self.define_at(stream, i)  # Definition tokens are kept for the parser
+            elif k == ID and i + 1 < n and kinds[i + 1] == LPAREN and stream.value(i) in macros:
+                out.copy_range(stream, copied, i)
+                args, end = self.collect_args(stream, i + 2)
+                for kid, text in self.call(stream.value(i), args, 0):
+                    out.append_text(kid, text)
+                i = copied = end
+            else:
+                i += 1
+        out.copy_range(stream, copied, n)
+        return out.seal()
+
+    def define_at(self, stream: TokenStream, i: int) -> int:
+        # !macro name [(~a, ~b)] { body } -> register; returns index after the body
+        n = len(stream)
+        name = stream.value(i + 1)
+        j, params = i + 2, []
+        if j < n and stream.kinds[j] == self.LPAREN:
+            while j < n and stream.kinds[j] != self.RPAREN:
+                if stream.kinds[j] == self.ID and stream.kinds[j - 1] == self.VAR:
+                    params.append(stream.value(j))
+                j += 1
+            j += 1
+        body_start, depth = j + 1, 0
+        while j < n:
+            if stream.kinds[j] == self.LBRACE:
+                depth += 1
+            elif stream.kinds[j] == self.RBRACE:
+                depth -= 1
+                if depth == 0:
+                    break
+            j += 1
+        body = [stream[k] for k in range(body_start, j)]
+        self.define(name, params, body)
+        return j + 1
+
+    def define(self, name: str, params: List[str], body: List[Tuple[str, str]]):
+        self.macros[name] = (params, ' '.join(v for _, v in body))
+        self.compile(name, params, [(self.lexer.kind_ids[k], v) for k, v in body])
+
+    def compile(self, name, params, body):
+        if body and body[0][0] == self.CARET:
+            body = body[1:]  # { ^expr }: expression macro
+        wrap = all(k != self.SEMI for k, _ in body)  # Parenthesize expression bodies
+        self.compiled[name] = (params or ['x'], body, wrap)
+        self.memo = {key: v for key, v in self.memo.items() if key[0] != name}
+
+    def lookup(self, name):
+        if name not in self.compiled:
+            params, text = self.macros[name]
+            self.compile(name, params, [(self.lexer.kind_ids[k], v) for k, v in self.lexer.lex(text)])
+        return self.compiled[name]
+
+    def collect_args(self, toks, start: int):
+        # toks (token list or TokenStream) [start:] follows the call's '(';
+        # returns (args as (kind id, text) lists, index after ')')
+        args, cur, depth, i = [], [], 0, start
+        while i < len(toks):
+            kind = toks[i][0]
+            kind = self.lexer.kind_ids[kind] if isinstance(kind, str) else kind
+            tok = (kind, toks[i][1])
+            i += 1
+            if kind == self.LPAREN:
+                depth += 1
+            elif kind == self.RPAREN:
+                if depth == 0:
+                    break
+                depth -= 1
+            elif kind == self.COMMA and depth == 0:
+                args.append(cur)
+                cur = []
+                continue
+            cur.append(tok)
+        if cur or args:
+            args.append(cur)
+        return args, i
+
+    def call(self, name: str, args: List[List[Tuple]], depth: int) -> List[Tuple[int, str]]:
+        if depth > MAX_DEPTH:
+            raise ValueError(f"Macro expansion too deep (recursive macro {name}?)")
+        args = tuple(tuple(self.expand_list(a, depth + 1)) for a in args)  # Nested calls first
+        key = (name, args)
+        cached = self.memo.get(key)
+        if cached is not None:
+            return cached
+        params, body, wrap = self.lookup(name)
+        subst = dict(zip(params, args))
+        result = [(self.LPAREN, '(')] if wrap else []
+        for kid, text in body:
+            arg = subst.get(text) if kid == self.ID else None
+            if arg is None:
+                result.append((kid, text))
+            elif len(arg) > 1:
+                result.append((self.LPAREN, '('))
+                result.extend(arg)
+                result.append((self.RPAREN, ')'))
+            else:
+                result.extend(arg)
+        if wrap:
+            result.append((self.RPAREN, ')'))
+        result = self.expand_list(result, depth + 1)  # Macros used by the body
+        self.memo[key] = result
+        return result
+
+    def expand_list(self, toks: List[Tuple[int, str]], depth: int) -> List[Tuple[int, str]]:
+        out, i = [], 0
+        while i < len(toks):
+            kid, text = toks[i]
+            if kid == self.ID and text in self.macros and i + 1 < len(toks) and toks[i + 1][0] == self.LPAREN:
+                args, i = self.collect_args(toks, i + 2)
+                out.extend(self.call(text, args, depth))
+            else:
+                out.append(toks[i])
+                i += 1
+        return out
@@ -0,0 +1,187 @@
+import json
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+# Match compilation. Every case pattern flattens to a list of tests on a
+# *discriminator* (a path into the matched value plus what to look at there)
+# and a list of name bindings. The case rows then become a decision tree:
+#   Switch  evaluates one discriminator once and jumps through a dict on the
+#           result, so hundreds of literal arms cost one hash lookup
+#   Leaf    the first case whose tests all passed; applies its bindings
+# Rows that don't test a discriminator ride along into every branch, which
+# keeps first-match-wins order. A test shared by several cases (the tuple
+# shape, a dict key) is evaluated once on the way down, never per case.
+#
+# Paths are tuples of ('idx', i) / ('key', json key expr). Discriminators:
+#   (path, 'shape')          value itself for literals, (SEQ, len) or DICT
+#   (path, 'has', key)       key present in the dict at path
+
+class Shape:
+    __slots__ = ('name',)
+
+    def __init__(self, name):
+        self.name = name
+
+    def __repr__(self):
+        return f"<{self.name}>"
+
+SEQ, DICT = Shape('seq'), Shape('dict')
+
+def shape(value):
+    if isinstance(value, (list, tuple)):
+        return (SEQ, len(value))
+    if isinstance(value, dict):
+        return DICT
+    return value
+
+class Leaf:
+    __slots__ = ('case', 'binds')
+
+    def __init__(self, case: int, binds: List[Tuple[str, Tuple]]):
+        self.case = case
+        self.binds = binds
+
+class Switch:
+    __slots__ = ('disc', 'table', 'default')
+
+    def __init__(self, disc: Tuple, table: Dict[Any, Any], default):
+        self.disc = disc
+        self.table = table
+        self.default = default  # Leaf, Switch or None (no case matches)
+
+def flatten(pat: Dict, literal: Callable, path: Tuple = (), tests=None, binds=None):
+    # IR pattern -> ([(discriminator, expected)], [(name, path)])
+    tests = [] if tests is None else tests
+    binds = [] if binds is None else binds
+    kind, parts = pat['kind'], pat['parts']
+    if kind == 'var':
+        if parts[0] != '_':
+            binds.append((parts[0], path))
+    elif kind == 'lit':
+        tests.append(((path, 'shape'), literal(parts[0])))
+    elif kind in {'tuple', 'list'}:
+        tests.append(((path, 'shape'), (SEQ, len(parts))))
+        for i, sub in enumerate(parts):
+            flatten(sub, literal, path + (('idx', i),), tests, binds)
+    elif kind == 'dict':
+        tests.append(((path, 'shape'), DICT))
+        for key, sub in parts:
+            src = json.dumps(key)
+            tests.append(((path, 'has', src), True))
+            flatten(sub, literal, path + (('key', src),), tests, binds)
+    else:
+        raise ValueError(f"Unknown pattern kind: {kind}")
+    return tests, binds
+
+def build(pats: List[Dict], literal: Callable):
+    rows = []
+    for case, pat in enumerate(pats):
+        tests, binds = flatten(pat, literal)
+        rows.append((case, tuple(tests), binds))
+    return _build(rows, {})
+
+def _build(rows, memo):
+    if not rows:
+        return None
+    case, tests, binds = rows[0]
+    key = (case,) if not tests else tuple((r[0], r[1]) for r in rows)
+    node = memo.get(key)
+    if node is not None:
+        return node
+    if not tests:
+        node = memo[key] = Leaf(case, binds)  # First remaining row matched everything it tests
+        return node
+    # Branch on the first row's next test. Its prerequisites (the shape of the
+    # enclosing value) were decided above, and every row that tests the same
+    # discriminator agreed with that decision or it wouldn't be here.
+    disc = tests[0][0]
+    split = []  # (row, expected or None, row without that test)
+    consts = {}
+    for row in rows:
+        for i, (d, expected) in enumerate(row[1]):
+            if d == disc:
+                split.append((row, expected, (row[0], row[1][:i] + row[1][i + 1:], row[2])))
+                consts.setdefault(expected, None)
+                break
+        else:
+            split.append((row, None, row))
+    table = {c: _build([r for _, e, r in split if e is None or e == c], memo) for c in consts}
+    default = _build([r for _, e, r in split if e is None], memo)
+    node = memo[key] = Switch(disc, table, default)
+    return node
+
+def tree_size(tree) -> Tuple[int, int]:
+    # (switches, leaves), counting shared subtrees once
+    seen, stack, switches, leaves = set(), [tree], 0, 0
+    while stack:
+        node = stack.pop()
+        if node is None or id(node) in seen:
+            continue
+        seen.add(id(node))
+        if isinstance(node, Leaf):
+            leaves += 1
+        else:
+            switches += 1
+            stack.extend(node.table.values())
+            stack.append(node.default)
+    return switches, leaves
+
+def compile_tree(tree, compile_key: Callable) -> Callable:
+    # -> select(value, env): binds the winning case's names, returns its index or -1.
+    # compile_key(json key expr) -> fn(env) evaluating a dict pattern key.
+    keys: Dict[str, Callable] = {}
+    compiled: Dict[int, Callable] = {}
+
+    def key_fn(src):
+        fn = keys.get(src)
+        if fn is None:
+            fn = keys[src] = compile_key(src)
+        return fn
+
+    def getter(path) -> Optional[Callable]:
+        if not path:
+            return None
+        steps = [(step[1], None) if step[0] == 'idx' else (None, key_fn(step[1])) for step in path]
+        def get(value, env):
+            for idx, key in steps:
+                value = value[idx] if key is None else value[key(env)]
+            return value
+        return get
+
+    def emit(node) -> Callable:
+        if node is None:
+            return lambda value, env: -1
+        done = compiled.get(id(node))
+        if done is not None:
+            return done
+        if isinstance(node, Leaf):
+            case, binds = node.case, [(name, getter(path)) for name, path in node.binds]
+            if not binds:
+                fn = lambda value, env: case
+            else:
+                def fn(value, env):
+                    for name, get in binds:
+                        env[name] = value if get is None else get(value, env)
+                    return case
+        else:
+            path, rest = node.disc[0], node.disc[1:]
+            get, table, default = getter(path), {c: emit(n) for c, n in node.table.items()}, emit(node.default)
+            if rest == ('shape',):
+                def probe(value, env):
+                    return shape(value if get is None else get(value, env))
+            else:
+                key = key_fn(rest[1])
+                def probe(value, env):
+                    try:
+                        return key(env) in (value if get is None else get(value, env))
+                    except TypeError:
+                        return None  # Unhashable key
+            def fn(value, env):
+                try:
+                    nxt = table.get(probe(value, env), default)
+                except TypeError:
+                    nxt = default  # Unhashable value: no literal arm can match
+                return nxt(value, env)
+        compiled[id(node)] = fn
+        return fn
+
+    return emit(tree)
@@ -0,0 +1,278 @@
+import copy
+import time
+from typing import Any, Callable, Dict, List, Optional, Set
+from velvet_interp import BINOPS, UNOPS
+
+# IR -> IR optimization passes, run between VelvetIRGen.generate() and any
+# consumer (weave build --release). Passes rewrite a private deep copy of the
+# IR; expressions stay IR trees (strings, [op, ...] lists, call dicts).
+
+CMP_OPS = {'<', '>', '<=', '>=', '==', '!=', '!'}  # Results are bools
+FOLD_UNARY = {'-', '+', '!'}
+INLINE_MAX = 16  # Max terms in an inlinable function's return expression
+
+def is_const(tok) -> bool:
+    return isinstance(tok, str) and bool(tok) and (
+        tok[0] == '"' or tok.isdigit() or (tok[0] == '-' and tok[1:].isdigit()))
+
+def const_value(tok: str):
+    return tok[1:-1] if tok[0] == '"' else int(tok)
+
+def const_token(value) -> str:
+    if isinstance(value, bool):
+        return '1' if value else '0'  # Only produced for if conditions
+    if isinstance(value, str):
+        return '"' + value + '"'
+    return str(value)
+
+def fold(expr, in_cond: bool = False):
+    # Evaluate operator subtrees whose operands are all literals
+    if isinstance(expr, dict):
+        return {'call': expr['call'], 'args': [fold(a) for a in expr['args']]}
+    if not isinstance(expr, list):
+        return expr
+    op, args = expr[0], [fold(a, in_cond) for a in expr[1:]]
+    if all(is_const(a) for a in args) and (in_cond or op not in CMP_OPS) and op in (BINOPS if len(args) == 2 else FOLD_UNARY):
+        values = [const_value(a) for a in args]
+        if len(values) == 1 or (type(values[0]) is type(values[1]) and not (op == '/' and values[1] == 0)):
+            try:
+                return const_token((BINOPS if len(args) == 2 else UNOPS)[op](*values))
+            except TypeError:
+                pass  # e.g. "a" - "b": leave the runtime error in place
+    return [op] + args
+
+def node_exprs(node: Dict):
+    # (key, container) slots holding an expression in one node, not descending into bodies
+    kind = node['type']
+    keys = {'var': ('expr',), 'expr': ('expr',), 'func': ('ret',), 'if': ('cond',),
+            'loop': ('start', 'end'), 'match': ('expr',), 'pattern': ('expr',)}.get(kind, ())
+    return [(key, node) for key in keys if node.get(key) is not None]
+
+def child_blocks(node: Dict) -> List[List[Dict]]:
+    kind = node['type']
+    if kind in {'func', 'if', 'loop'}:
+        return [node['body']]
+    if kind == 'match':
+        return [c['stmt'] for c in node['cases']]
+    if kind == 'decorator':
+        return [[node['target']]]
+    return []
+
+def walk(nodes: List[Dict]):
+    for node in nodes:
+        yield node
+        for block in child_blocks(node):
+            yield from walk(block)
+
+def map_exprs(nodes: List[Dict], fn: Callable[[List, Dict, str], List]):
+    for node in walk(nodes):
+        for key, holder in node_exprs(node):
+            holder[key] = fn(holder[key], node, key)
+
+def expr_names(expr, out: Set[str]) -> Set[str]:
+    # Every name an expression loads or calls
+    if isinstance(expr, dict):
+        out.add(expr['call'])
+        for arg in expr['args']:
+            expr_names(arg, out)
+    elif isinstance(expr, list):
+        for arg in expr[1:]:
+            expr_names(arg, out)
+    elif expr is not None and not is_const(expr) and expr != '{}':
+        out.add(expr)
+    return out
+
+def expr_size(expr) -> int:
+    if isinstance(expr, dict):
+        return 1 + sum(expr_size(a) for a in expr['args'])
+    if isinstance(expr, list):
+        return 1 + sum(expr_size(a) for a in expr[1:])
+    return 0 if expr is None else 1
+
+def is_pure(expr) -> bool:
+    # No calls or awaits anywhere in the tree
+    if isinstance(expr, list):
+        return expr[0] != 'await' and all(is_pure(a) for a in expr[1:])
+    return not isinstance(expr, dict)
+
+def node_names(nodes: List[Dict]) -> Set[str]:
+    names = set()
+    for node in walk(nodes):
+        for key, holder in node_exprs(node):
+            expr_names(holder[key], names)
+        if node['type'] == 'decorator':
+            names.add(node['name'])
+    return names
+
+def pat_names(pat: Dict, out: List[str]):
+    if pat['kind'] == 'var':
+        out.append(pat['parts'][0])
+    elif pat['kind'] in {'tuple', 'list'}:
+        for p in pat['parts']:
+            pat_names(p, out)
+    elif pat['kind'] == 'dict':
+        for _, p in pat['parts']:
+            pat_names(p, out)
+
+def bindings(nodes: List[Dict]) -> Dict[str, int]:
+    # How many places bind each name: ~x =, params, loop vars, patterns, functions
+    counts = {}
+    def bind(name):
+        counts[name] = counts.get(name, 0) + 1
+    for node in walk(nodes):
+        kind = node['type']
+        if kind in {'var', 'func'}:
+            bind(node['name'])
+        if kind == 'func':
+            for p in node['params']:
+                bind(p['name'])
+        elif kind == 'loop':
+            bind(node['var'])
+        elif kind in {'pattern', 'match'}:
+            found = []
+            for pat in [node] if kind == 'pattern' else [c['pat'] for c in node['cases']]:
+                pat_names(pat, found)
+            for name in found:
+                bind(name)
+    return counts
+
+def substitute(expr, subst: Dict[str, Any]):
+    if isinstance(expr, dict):
+        return {'call': expr['call'], 'args': [substitute(a, subst) for a in expr['args']]}
+    if isinstance(expr, list):
+        return [expr[0]] + [substitute(a, subst) for a in expr[1:]]
+    return subst.get(expr, expr) if isinstance(expr, str) else expr
+
+def count(ir: Dict):
+    # (IR nodes, expression terms)
+    nodes = terms = 0
+    for node in walk(ir['nodes']):
+        nodes += 1
+        terms += sum(expr_size(holder[key]) for key, holder in node_exprs(node))
+    return nodes, terms
+
+# Passes: pass(ir, manager) rewrites ir['nodes'] in place
+
+def drop_macros(ir: Dict, pm):
+    # Macro calls are expanded at the token level before parsing; the
+    # definitions left in the IR are inert
+    ir['nodes'] = [n for n in ir['nodes'] if n['type'] != 'macro']
+
+def fold_constants(ir: Dict, pm):
+    map_exprs(ir['nodes'], lambda expr, node, key: fold(expr, in_cond=node['type'] == 'if'))
+
+def propagate_constants(ir: Dict, pm):
+    # A top-level ~x bound once (nowhere else as param/loop var/pattern/function)
+    # to a literal is replaced by that literal in everything after it; refolding
+    # as we go lets chains (~a = 1; ~b = a + 1;) collapse in one pass
+    nodes = ir['nodes']
+    counts = bindings(nodes)
+    for i, node in enumerate(nodes):
+        if node['type'] == 'var' and counts[node['name']] == 1 and is_const(node['expr']):
+            subst = {node['name']: node['expr']}
+            map_exprs(nodes[i + 1:], lambda expr, n, key: fold(substitute(expr, subst), n['type'] == 'if'))
+
+def inline_functions(ir: Dict, pm):
+    # Small pure functions (`!sq(~n){^n*n}`: no body, return uses only params,
+    # literals and operators) are substituted at call sites after their definition
+    nodes = ir['nodes']
+    counts = bindings(nodes)
+    for i, node in enumerate(nodes):
+        if node['type'] != 'func' or counts[node['name']] != 1 or node['body'] or node.get('async'):
+            continue
+        ret, params = node['ret'], [p['name'] for p in node['params']]
+        if ret is None or expr_size(ret) > INLINE_MAX or not is_pure(ret) \
+                or not expr_names(ret, set()) <= set(params):
+            continue
+        uses = {p: 0 for p in params}
+        def tally(expr):
+            if isinstance(expr, list):
+                for a in expr[1:]:
+                    tally(a)
+            elif expr in uses:
+                uses[expr] += 1
+        tally(ret)
+        name = node['name']
+        def inline(expr, n=None, key=None):
+            if isinstance(expr, list):
+                return [expr[0]] + [inline(a) for a in expr[1:]]
+            if not isinstance(expr, dict):
+                return expr
+            args = [inline(a) for a in expr['args']]
+            # Duplicating a compound argument would redo its work; calls could reorder effects
+            if expr['call'] == name and len(args) == len(params) and all(
+                    is_pure(a) and (isinstance(a, str) or uses[p] <= 1) for p, a in zip(params, args)):
+                pm.inlined += 1
+                return substitute(ret, dict(zip(params, args)))
+            return {'call': expr['call'], 'args': args}
+        map_exprs(nodes[i + 1:], inline)
+
+def remove_dead_ifs(ir: Dict, pm):
+    def prune(nodes):
+        out = []
+        for node in nodes:
+            for block in child_blocks(node):
+                block[:] = prune(block)
+            if node['type'] == 'if' and is_const(node['cond']):
+                if const_value(node['cond']):
+                    out.extend(node['body'])  # ?1{...}: ifs don't open a scope
+                continue
+            out.append(node)
+        return out
+    ir['nodes'] = prune(ir['nodes'])
+
+def remove_unused_functions(ir: Dict, pm):
+    # Entry modules only: nothing else can import their functions
+    if not pm.entry:
+        return
+    nodes = ir['nodes']
+    funcs = {}
+    for node in nodes:
+        if node['type'] == 'func':
+            funcs.setdefault(node['name'], []).append(node)
+    live = node_names([n for n in nodes if n['type'] != 'func'])
+    todo = [name for name in live if name in funcs]
+    while todo:
+        for fn in funcs.pop(todo.pop(), []):
+            for name in node_names([fn]) - live:
+                live.add(name)
+                if name in funcs:
+                    todo.append(name)
+    ir['nodes'] = [n for n in nodes if n['type'] != 'func' or n['name'] in live]
+
+PASSES = [
+    ('drop-macros', drop_macros),
+    ('fold', fold_constants),
+    ('propagate', propagate_constants),
+    ('inline', inline_functions),
+    ('fold', fold_constants),
+    ('dead-if', remove_dead_ifs),
+    ('dead-func', remove_unused_functions),
+]
+
+class PassManager:
+    def __init__(self, passes: Optional[List] = None, entry: bool = False):
+        self.passes = PASSES if passes is None else passes
+        self.entry = entry  # Module is a program entry point (no importers)
+        self.inlined = 0
+        self.report = []
+
+    def run(self, ir: Dict) -> Dict:
+        ir = copy.deepcopy(ir)
+        for name, fn in self.passes:
+            before = count(ir)
+            start = time.perf_counter()
+            fn(ir, self)
+            ms = (time.perf_counter() - start) * 1000
+            after = count(ir)
+            self.report.append({'pass': name, 'ms': ms, 'nodes': (before[0], after[0]), 'terms': (before[1], after[1])})
+        return ir
+
+    def format_report(self) -> str:
+        lines = [f"{'pass':<10} {'ms':>8} {'nodes':>11} {'terms':>13}"]
+        for r in self.report:
+            lines.append(f"{r['pass']:<10} {r['ms']:8.3f} {r['nodes'][0]:>5}->{r['nodes'][1]:<5} {r['terms'][0]:>6}->{r['terms'][1]:<6}")
+        return '\n'.join(lines)
+
+def optimize(ir: Dict, entry: bool = False) -> Dict:
+    return PassManager(entry=entry).run(ir)
@@ -1,24 +1,37 @@
 import re
-from collections import deque
-from velvet_lexer import VelvetLexer
+import hashlib
+from velvet_lexer import VelvetLexer, raw_block
 from velvet_ast import *
-from weave.helpers import expand_macros
+from velvet_macros import MacroExpander
+from velvet_profile import phase
 
 # Updated BNF (simplified):
 # <program> ::= <imports> <deps> <stmts>
 # <imports> ::= import "<path>";*
 # <deps> ::= <dep>*
-# <stmt> ::= <decorator>* (<var> | <func> | <macro> | <match> | <pattern> | <if> | <loop> | <inline>)
+# <stmt> ::= <decorator>* (<var> | <func> | <macro> | <match> | <pattern> | <if> | <loop> | <inline> | <exprstmt>)
 # <var> ::= ~<id>(:<type>)?=<expr>;
 # <type> ::= int | str | list<<type>> | map<<type>,<type>> | set<<type>> | tuple<<type>[,<type>]*> | ...
 # <func> ::= (async)? !<id>(<params>){<stmts> ^<expr>?};
-# <macro> ::= !macro <id> {<expansion>};
+# <macro> ::= !macro <id>(\(<params>\))? {<expansion>};
 # <match> ::= match <expr> { <case>* _ => <stmt> };
 # <case> ::= <pat> => <stmt>,
 # <pattern> ::= let <pat> = <expr>;
 # <if> ::= ?<expr>{<stmts>};
 # <loop> ::= *<id>=<expr>..<expr>{<stmts>};
 # <inline> ::= #<lang>{<code>};
+# <exprstmt> ::= <expr>;
+# <expr> ::= <unary> (<binop> <unary>)*      (precedence: BINARY_PREC)
+# <unary> ::= (- | + | ! | await) <unary> | <atom>
+# <atom> ::= <num> | <str> | <id> | <id>(<expr>[,<expr>]*) | (<expr>) | {}
+
+# Infix binding power; '<'/'>' lex as DEP_START/DEP_END and '*' as LOOP
+BINARY_PREC = {'==': 1, '!=': 1, '<': 2, '>': 2, '<=': 2, '>=': 2, '+': 3, '-': 3, '*': 4, '/': 4}
+INFIX_KINDS = {'OP', 'LOOP', 'CMP', 'DEP_START', 'DEP_END'}
+UNARY_OPS = {'-', '+', '!'}
+UNARY_PREC = 5  # Above every infix operator: -a * b is (-a) * b
+
+SPAN_RE = re.compile(r'".*?"|@(?!\w).*?$|#\w+|[{}()\[\];]', re.MULTILINE)
 
 class VelvetParser:
     def __init__(self):
@@ -26,23 +39,95 @@ class VelvetParser:
         self.tokens = []
         self.pos = 0
         self.ast = AST([], [], [], [])
-        self.macros = {}  # name: body for expansion
+        self.macros = {}  # name: (params, body) for expansion
+        self.span_cache = {}  # macro table + span digest: (AST fragment, macros it defines)
+        self.reparsed = 0  # Spans parsed by the last parse_incremental
+        ids = self.lexer.kind_ids
+        self.infix_ids = {ids[k] for k in INFIX_KINDS}
+        self.lparen_id = ids['LPAREN']
+
+    def reset(self):
+        self.tokens = []
+        self.pos = 0
+        self.ast = AST([], [], [], [])
 
     def parse(self, code: str) -> AST:
-        code = expand_macros(code, self.macros)  # Pre-expand macros
-        self.tokens = self.lexer.lex(code)
-        self.parse_imports()
-        self.parse_deps()
-        while self.pos < len(self.tokens):
-            decos = self.parse_decorators()
-            stmt = self.parse_stmt()
-            if decos:
-                for deco in reversed(decos):
-                    stmt = DecoratorNode(deco, stmt)
-            self.ast.nodes.append(stmt)
-        self.parse_inline(code)  # Regex for inline
+        self.reset()
+        with phase('lex'):
+            stream = self.lexer.lex_stream(code)
+        with phase('expand_macros'):
+            # Macros expand on the token stream, in one pass, as they are defined
+            self.tokens = MacroExpander(self.lexer, self.macros).expand(stream)
+        with phase('parse'):
+            self.parse_imports()
+            self.parse_deps()
+            while self.pos < len(self.tokens):
+                decos = self.parse_decorators()
+                stmt = self.parse_stmt()
+                if decos:
+                    for deco in reversed(decos):
+                        stmt = DecoratorNode(deco, stmt)
+                self.ast.nodes.append(stmt)
         return self.ast
 
+    def split_spans(self, code: str):
+        # Top-level statement spans: cut after each ';' at bracket depth 0
+        spans = []
+        start = depth = pos = 0
+        while pos is not None:
+            resume, pos = pos, None
+            for mo in SPAN_RE.finditer(code, resume):
+                ch = mo.group()
+                if ch[0] == '#':
+                    body = raw_block(code, mo.end(), ch[1:])  # Braces in inline code don't count
+                    if body is not None:
+                        pos = body[1]  # Resume at the block's closing '}' (depth unchanged)
+                        depth += 1
+                        break
+                elif ch in '{([':
+                    depth += 1
+                elif ch in '})]':
+                    depth = max(depth - 1, 0)
+                elif ch == ';' and depth == 0:
+                    spans.append((start, mo.end()))
+                    start = mo.end()
+        if code[start:].strip():
+            spans.append((start, len(code)))
+        return spans
+
+    def parse_incremental(self, code: str) -> AST:
+        # Reparse only spans whose text, or the macro table they start under,
+        # changed since the last call; unchanged spans reuse their Node objects
+        # and replay the macros they define.
+        cache, self.span_cache = self.span_cache, {}
+        self.reparsed = 0
+        result = AST([], [], [], [])
+        table = self.macro_digest()
+        for start, end in self.split_spans(code):
+            text = code[start:end]
+            key = table + hashlib.blake2b(text.encode(), digest_size=16).digest()
+            entry = cache.get(key) or self.span_cache.get(key)
+            if entry is None:
+                before = dict(self.macros)
+                frag = self.parse(text)
+                defined = {k: v for k, v in self.macros.items() if before.get(k) != v}
+                entry = (frag, defined)
+                self.reparsed += 1
+            frag, defined = entry
+            if defined:
+                self.macros.update(defined)
+                table = self.macro_digest()
+            self.span_cache[key] = entry
+            result.deps.extend(frag.deps)
+            result.imports.extend(frag.imports)
+            result.nodes.extend(frag.nodes)
+            result.inline.extend(frag.inline)
+        self.ast = result
+        return result
+
+    def macro_digest(self) -> bytes:
+        return hashlib.blake2b(repr(sorted(self.macros.items())).encode(), digest_size=16).digest()
+
     def parse_imports(self):
         while self.peek() == 'IMPORT':
             self.consume('IMPORT')
@@ -54,6 +139,9 @@ class VelvetParser:
         while self.peek() == 'DEP_START':
             self.consume('DEP_START')
             dep = self.consume('ID')
+            while self.peek() != 'DEP_END':  # e.g. <crux-lib>
+                dep += self.tokens[self.pos][1]
+                self.pos += 1
             self.consume('DEP_END')
             self.ast.deps.append(dep)
 
@@ -79,6 +167,12 @@ class VelvetParser:
             return self.parse_if()
         elif tok == 'LOOP':
             return self.parse_loop()
+        elif tok == 'INLINE':
+            return self.parse_inline()
+        elif tok in {'ID', 'NUM', 'STR', 'LPAREN', 'OP', 'AWAIT'}:
+            expr = self.parse_expr()
+            self.end_stmt()
+            return ExprNode(expr)
         else:
             self.pos += 1
             return Node()
@@ -92,26 +186,27 @@ class VelvetParser:
             typ = self.parse_type()
         self.consume('EQ')
         expr = self.parse_expr()
-        self.consume('SEMI')
+        self.end_stmt()
         return VarNode(name, typ, expr)
 
     def parse_type(self):
         base = self.consume('ID')
-        if self.peek() == '<':
-            self.consume('<')
+        if self.peek() == 'DEP_START':
+            self.consume('DEP_START')
             params = []
-            while self.peek() != '>':
+            while self.peek() != 'DEP_END':
                 params.append(self.parse_type())
                 if self.peek() == 'COMMA': self.consume('COMMA')
-            self.consume('>')
+            self.consume('DEP_END')
             if base == 'list':
                 return TypeNode('list', params)
             elif base == 'map':
-                return MapType(params[0], params[1])
+                return MapType(key=params[0], val=params[1])
             elif base == 'set':
-                return SetType(params[0])
+                return SetType(elem=params[0])
             elif base == 'tuple':
-                return TupleType(params)
+                return TupleType(elems=params)
+            return TypeNode(base, params)  # User generic, e.g. Pair<int, str>
         return TypeNode(base)
 
     def parse_func(self):
@@ -124,33 +219,51 @@ class VelvetParser:
         self.consume('LPAREN')
         params = []
         while self.peek() != 'RPAREN':
-            params.append(self.parse_var())
+            params.append(self.parse_param())
             if self.peek() == 'COMMA': self.consume('COMMA')
         self.consume('RPAREN')
         self.consume('LBRACE')
         body = []
-        while self.peek() != 'RBRACE' and self.peek() != '^':
+        while self.peek() != 'RBRACE' and self.peek() != 'CARET':
             body.append(self.parse_stmt())
         ret = None
-        if self.peek() == '^':
-            self.consume('^')
+        if self.peek() == 'CARET':
+            self.consume('CARET')
             ret = self.parse_expr()
         self.consume('RBRACE')
-        self.consume('SEMI')
+        self.end_stmt()
         return FuncNode(name, params, body, ret, async_flag)
 
+    def parse_param(self):
+        self.consume('VAR')
+        name = self.consume('ID')
+        typ = None
+        if self.peek() == 'COLON':
+            self.consume('COLON')
+            typ = self.parse_type()
+        return VarNode(name, typ)
+
     def parse_macro(self):
         self.consume('MACRO')
         name = self.consume('ID')
+        params = []
+        if self.peek() == 'LPAREN':  # !macro double(~x){...}
+            self.consume('LPAREN')
+            while self.peek() != 'RPAREN':
+                params.append(self.parse_param().name)
+                if self.peek() == 'COMMA': self.consume('COMMA')
+            self.consume('RPAREN')
         self.consume('LBRACE')
-        body = ''
-        while self.peek() != 'RBRACE':
-            body += self.tokens[self.pos][1] + ' '
+        body, depth = [], 0
+        while depth or self.peek() != 'RBRACE':
+            tok, val = self.tokens[self.pos]
+            depth += (tok == 'LBRACE') - (tok == 'RBRACE')
+            body.append(val)
             self.pos += 1
         self.consume('RBRACE')
-        self.consume('SEMI')
-        macro = MacroNode(name, body)
-        self.macros[name] = body  # For expansion
+        self.end_stmt()
+        macro = MacroNode(name, ' '.join(body), params)
+        self.macros[name] = (params, macro.body)  # Already registered by the expander
         return macro
 
     def parse_match(self):
@@ -165,7 +278,7 @@ class VelvetParser:
             cases.append({'pat': pat, 'stmt': stmt})
             if self.peek() == 'COMMA': self.consume('COMMA')
         self.consume('RBRACE')
-        self.consume('SEMI')
+        self.end_stmt()
         return MatchNode(expr, cases)
 
     def parse_pattern(self):
@@ -173,8 +286,8 @@ class VelvetParser:
         pat = self.parse_pat()
         self.consume('EQ')
         expr = self.parse_expr()
-        self.consume('SEMI')
-        return PatternNode(pat.kind, pat.parts)  # Adjusted
+        self.end_stmt()
+        return PatternNode(pat.kind, pat.parts, expr)
 
     def parse_if(self):
         self.consume('IF')
@@ -184,7 +297,7 @@ class VelvetParser:
         while self.peek() != 'RBRACE':
             body.append(self.parse_stmt())
         self.consume('RBRACE')
-        self.consume('SEMI')
+        self.end_stmt()
         return IfNode(cond, body)
 
     def parse_loop(self):
@@ -192,14 +305,14 @@ class VelvetParser:
         var = self.consume('ID')
         self.consume('EQ')
         start = self.parse_expr()
-        self.consume('..')
+        self.consume('RANGE')
         end = self.parse_expr()
         self.consume('LBRACE')
         body = []
         while self.peek() != 'RBRACE':
             body.append(self.parse_stmt())
         self.consume('RBRACE')
-        self.consume('SEMI')
+        self.end_stmt()
         return LoopNode(var, start, end, body)
 
     def parse_pat(self):
@@ -230,52 +343,80 @@ class VelvetParser:
                 if self.peek() == 'COMMA': self.consume('COMMA')
             self.consume('RBRACE')
             return PatternNode('dict', parts)
+        elif self.peek() in {'NUM', 'STR'}:
+            return PatternNode('lit', [self.consume(self.peek())])
         else:
             name = self.consume('ID')
             return PatternNode('var', [name])
 
-    def parse_expr(self):
-        output = deque()
-        ops = deque()
-        prec = {'+': 1, '-': 1, '*': 2, '/': 2}
-        while self.pos < len(self.tokens) and self.peek() not in {';', '}', ',', 'ARROW'}:
-            tok, val = self.tokens[self.pos]
-            if tok in {'ID', 'NUM', 'STR'}:
-                output.append(val)
-            elif tok == 'LPAREN':
-                ops.append('(')
-            elif tok == 'RPAREN':
-                while ops and ops[-1] != '(':
-                    output.append(ops.pop())
-                ops.pop()
-            elif tok == 'OP':
-                while ops and ops[-1] != '(' and prec.get(ops[-1], 0) >= prec[val]:
-                    output.append(ops.pop())
-                ops.append(val)
-            # Func call: id( args )
-            elif tok == 'ID' and self.peek(1) == 'LPAREN':
-                func_name = val
-                self.pos += 1  # Consume ID
-                self.consume('LPAREN')
-                args = []
-                while self.peek() != 'RPAREN':
-                    args.append(self.parse_expr())
-                    if self.peek() == 'COMMA': self.consume('COMMA')
-                self.consume('RPAREN')
-                output.append({'call': func_name, 'args': args})
+    def parse_expr(self, min_prec=0):
+        # Pratt loop: fold infix operators that bind tighter than min_prec.
+        # Reads the stream's kind array directly; this is the parser's hot path.
+        left = self.parse_operand()
+        toks = self.tokens
+        kinds, infix = toks.kinds, self.infix_ids
+        while self.pos < len(kinds) and kinds[self.pos] in infix:
+            op = toks.value(self.pos)
+            prec = BINARY_PREC.get(op, 0)
+            if prec <= min_prec:
+                break
             self.pos += 1
-        while ops:
-            output.append(ops.pop())
-        return list(output)
+            left = BinOpNode(op, left, self.parse_expr(prec))
+        return left
 
-    def parse_inline(self, code: str):
-        matches = re.findall(r'#(\w+)\s*\{(.*?)\}', code, re.DOTALL)
-        for lang, block in matches:
-            self.ast.inline.append(InlineNode(lang, block))
+    def parse_operand(self):
+        toks, pos = self.tokens, self.pos
+        if pos >= len(toks):
+            raise ValueError("Expected expression, got end of input")
+        kind, val = toks[pos]
+        self.pos = pos = pos + 1
+        if kind in {'NUM', 'STR'}:
+            return val
+        if kind == 'ID':
+            if pos < len(toks) and toks.kinds[pos] == self.lparen_id:
+                return self.parse_call(val)
+            return val
+        if kind == 'LPAREN':
+            expr = self.parse_expr()
+            self.consume('RPAREN')
+            return expr
+        if kind == 'LBRACE' and self.peek() == 'RBRACE':
+            self.pos += 1
+            return '{}'
+        if val in UNARY_OPS or kind == 'AWAIT':  # '!' lexes as FUNC
+            return UnaryNode(val, self.parse_expr(UNARY_PREC))
+        raise ValueError(f"Expected expression, got {kind} {val!r}")
+
+    def parse_call(self, name):
+        self.consume('LPAREN')
+        args = []
+        while self.peek() != 'RPAREN':
+            args.append(self.parse_expr())
+            if self.peek() != 'RPAREN':
+                self.consume('COMMA')
+        self.consume('RPAREN')
+        return CallNode(name, args)
+
+    def parse_inline(self):
+        # The lexer captured the body raw (INLINE_CODE); the node is collected into ast.inline
+        lang = self.consume('INLINE')[1:]
+        if self.peek() != 'INLINE_CODE':
+            raise ValueError(f"Expected {{ after #{lang}")
+        self.ast.inline.append(InlineNode(lang, self.tokens.value(self.pos)))  # One slice per block
+        self.pos += 1
+        if self.peek() == 'SEMI': self.consume('SEMI')
+        return Node()
+
+    def end_stmt(self):
+        # ';' is optional before ',' / '}' (match arms, one-line bodies)
+        if self.peek() == 'SEMI':
+            self.consume('SEMI')
+        elif self.peek() not in {'COMMA', 'RBRACE', None}:
+            self.consume('SEMI')
 
     def peek(self, offset=0):
         if self.pos + offset < len(self.tokens):
-            return self.tokens[self.pos + offset][0]
+            return self.tokens.kind(self.pos + offset)
         return None
 
     def consume(self, expected):
@@ -286,8 +427,30 @@ class VelvetParser:
         raise ValueError(f"Expected {expected}, got {tok}")
 
 if __name__ == '__main__':
+    # Usage: python velvet_parser.py [file] [--output-ir ir.json|ir.bin | --exec] [--targets=rust,zig] [--no-cache] [--cache-stats]
     import sys
-    code = sys.stdin.read() if not sys.argv[1:] else open(sys.argv[1]).read()
+    import json
+    from velvet_cache import VelvetCache
+    args = [a for a in sys.argv[1:] if not a.startswith('--')]
+    ir_out = sys.argv[sys.argv.index('--output-ir') + 1] if '--output-ir' in sys.argv else None
+    if ir_out in args: args.remove(ir_out)
+    code = sys.stdin.read() if not args else open(args[0]).read()
     parser = VelvetParser()
-    ast = parser.parse(code)
-    print(ast)
+    cache = VelvetCache(enabled='--no-cache' not in sys.argv)
+    targets = next((a.split('=', 1)[1].split(',') for a in sys.argv if a.startswith('--targets=')), None)
+    ast, ir = cache.compile(code, parser, targets=targets)
+    if ir_out and ir_out.endswith('.bin'):
+        from velvet_ir_bin import dump
+        dump(ir, ir_out)
+    elif ir_out:
+        with open(ir_out, 'w') as f:
+            json.dump(ir, f, default=lambda o: o.__dict__)
+    elif '--exec' in sys.argv:
+        from velvet_interp import VelvetInterpreter
+        VelvetInterpreter().run(ir)
+    else:
+        print(ast)
+    stats = cache.stats()
+    totals = cache.record()
+    if '--cache-stats' in sys.argv:
+        print(f"cache: {stats} totals: {totals}", file=sys.stderr)
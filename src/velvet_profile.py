@@ -0,0 +1,193 @@
+import os
+import sys
+import json
+import time
+from contextlib import contextmanager
+from typing import Dict, List, Optional
+
+# Pipeline profiler. Instrumented code calls phase(name) around each stage
+# (lex, expand_macros, parse, ir_gen, inline_exec, interp); with
+# no profiler enabled that is one global read returning a shared no-op context.
+# The interpreter checks `active` once when compiling and only then wraps its
+# closures to count IR node evaluations and function calls, so disabled runs
+# execute the same closures as before.
+#
+#   with profiling() as prof:
+#       ...compile and run...
+#   prof.write_trace('out.trace.json')   # chrome://tracing / Perfetto
+
+active: Optional['Profiler'] = None
+
+class _NullPhase:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+NULL_PHASE = _NullPhase()
+
+def phase(name: str):
+    prof = active
+    return NULL_PHASE if prof is None else prof.phase(name)
+
+class Phase:
+    __slots__ = ('prof', 'name', 'module', 'start', 'blocks')
+
+    def __init__(self, prof: 'Profiler', name: str):
+        self.prof = prof
+        self.name = name
+
+    def __enter__(self):
+        self.module = self.prof.module
+        self.blocks = sys.getallocatedblocks()
+        self.start = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, *exc):
+        end = time.perf_counter_ns()
+        # allocs: net memory blocks still allocated at the end of the phase
+        self.prof.events.append((self.name, self.module, self.start, end - self.start,
+                                 sys.getallocatedblocks() - self.blocks))
+        return False
+
+class Profiler:
+    def __init__(self):
+        self.t0 = time.perf_counter_ns()
+        self.module = '<main>'
+        self.events: List[tuple] = []  # (phase, module, start ns, duration ns, net blocks)
+        self.nodes: Dict[str, int] = {}  # IR node label: evaluations
+        self.funcs: Dict[str, List[int]] = {}  # function: [calls, inclusive ns]
+
+    def phase(self, name: str) -> Phase:
+        return Phase(self, name)
+
+    @contextmanager
+    def in_module(self, module: str):
+        outer, self.module = self.module, module
+        try:
+            yield
+        finally:
+            self.module = outer
+
+    # Interpreter hooks; only reached when compiling with a profiler active
+
+    def count_node(self, label: str, stmt):
+        nodes = self.nodes
+        nodes.setdefault(label, 0)
+        def counted(env):
+            nodes[label] += 1
+            return stmt(env)
+        return counted
+
+    def count_func(self, fn):
+        # Wraps Function.body/ret in place: calls, plus inclusive time for sync functions
+        stats = self.funcs.setdefault(fn.name, [0, 0])
+        body, ret, clock = fn.body, fn.ret, time.perf_counter_ns
+        if fn.is_async or body is None or ret is None:
+            first = 'ret' if body is None else 'body'
+            inner = getattr(fn, first)
+            timed = not fn.is_async
+            def whole(frame):
+                stats[0] += 1
+                if not timed:
+                    return inner(frame)
+                start = clock()
+                try:
+                    return inner(frame)
+                finally:
+                    stats[1] += clock() - start
+            setattr(fn, first, whole)
+            return fn
+        starts = []
+        def enter(frame):
+            stats[0] += 1
+            starts.append(clock())
+            try:
+                return body(frame)
+            except BaseException:
+                stats[1] += clock() - starts.pop()
+                raise
+        def leave(frame):
+            try:
+                return ret(frame)
+            finally:
+                stats[1] += clock() - starts.pop()
+        fn.body, fn.ret = enter, leave
+        return fn
+
+    # Reports
+
+    def summary(self) -> List[Dict]:
+        # Per (phase, module): calls, total ms, net blocks; slowest first
+        rows: Dict[tuple, Dict] = {}
+        for name, module, _, dur, blocks in self.events:
+            row = rows.setdefault((name, module), {'phase': name, 'module': module, 'calls': 0, 'ms': 0.0, 'allocs': 0})
+            row['calls'] += 1
+            row['ms'] += dur / 1e6
+            row['allocs'] += blocks
+        return sorted(rows.values(), key=lambda r: -r['ms'])
+
+    def trace(self) -> Dict:
+        pid = os.getpid()
+        events = [{'name': name, 'cat': module, 'ph': 'X', 'pid': pid, 'tid': 1,
+                   'ts': (start - self.t0) / 1e3, 'dur': dur / 1e3, 'args': {'module': module, 'allocs': blocks}}
+                  for name, module, start, dur, blocks in self.events]
+        events.sort(key=lambda e: (e['ts'], -e['dur']))  # Parents before the phases they contain
+        return {
+            'traceEvents': events,
+            'displayTimeUnit': 'ms',
+            'otherData': {
+                'nodes': dict(sorted(self.nodes.items(), key=lambda kv: -kv[1])),
+                'functions': {name: {'calls': c, 'ms': ns / 1e6} for name, (c, ns) in self.funcs.items()},
+            },
+        }
+
+    def write_trace(self, path: str):
+        with open(path, 'w') as f:
+            json.dump(self.trace(), f)
+
+    def table(self, top: int = 10):
+        # rich renderable: phases, then the hottest functions and IR nodes
+        from rich.table import Table
+        from rich.console import Group
+        total = sum(r['ms'] for r in self.summary() if r['phase'] == 'total') or \
+            sum(dur for _, _, _, dur, _ in self.events) / 1e6
+        phases = Table(title="Phases")
+        for col in ('phase', 'module', 'calls', 'ms', '%', 'allocs'):
+            phases.add_column(col, justify='left' if col in ('phase', 'module') else 'right')
+        for r in self.summary():
+            pct = f"{100 * r['ms'] / total:.1f}" if total else '-'
+            phases.add_row(r['phase'], r['module'], str(r['calls']), f"{r['ms']:.2f}", pct, str(r['allocs']))
+        funcs = Table(title="Functions")
+        for col in ('function', 'calls', 'ms'):
+            funcs.add_column(col, justify='left' if col == 'function' else 'right')
+        for name, (calls, ns) in sorted(self.funcs.items(), key=lambda kv: -kv[1][1])[:top]:
+            funcs.add_row(name, str(calls), f"{ns / 1e6:.2f}")
+        nodes = Table(title="IR nodes")
+        nodes.add_column('node')
+        nodes.add_column('evals', justify='right')
+        for label, count in sorted(self.nodes.items(), key=lambda kv: -kv[1])[:top]:
+            nodes.add_row(label, str(count))
+        return Group(phases, funcs, nodes)
+
+def enable() -> Profiler:
+    global active
+    active = Profiler()
+    return active
+
+def disable() -> Optional[Profiler]:
+    global active
+    prof, active = active, None
+    return prof
+
+@contextmanager
+def profiling():
+    prof = enable()
+    try:
+        with prof.phase('total'):
+            yield prof
+    finally:
+        disable()
@@ -0,0 +1,107 @@
+from typing import Dict, Optional, Sequence, Tuple
+from velvet_ast import TypeNode, MapType, SetType, TupleType
+
+# Velvet type -> target language type. Generic templates use $T (element),
+# $K/$V (map key/value) and $* (tuple elements, comma-joined unless
+# TUPLE_FIELDS says otherwise); a parameter the template doesn't mention is
+# dropped (python `list`, ruby `Hash`).
+TYPE_MAPPINGS = {
+    'int': {
+        'rust': 'i32', 'python': 'int', 'go': 'int', 'crystal': 'Int32', 'ruby': 'Integer',
+        'c': 'int', 'cpp': 'int', 'csharp': 'int', 'julia': 'Int', 'zig': 'i32',
+        'lua': 'number', 'java': 'int', 'javascript': 'number', 'shell': 'int', 'powershell': 'int'
+    },
+    'str': {
+        'rust': '&str', 'python': 'str', 'go': 'string', 'crystal': 'String', 'ruby': 'String',
+        'c': 'char*', 'cpp': 'std::string', 'csharp': 'string', 'julia': 'String', 'zig': '[]const u8',
+        'lua': 'string', 'java': 'String', 'javascript': 'string', 'shell': 'string', 'powershell': 'string'
+    },
+    'list': {
+        'rust': 'Vec<$T>', 'python': 'list', 'go': '[]$T', 'crystal': 'Array($T)', 'ruby': 'Array',
+        'c': 'array', 'cpp': 'std::vector<$T>', 'csharp': 'List<$T>', 'julia': 'Vector{$T}', 'zig': '[]$T',
+        'lua': 'table', 'java': 'List<$T>', 'javascript': 'array', 'shell': 'array', 'powershell': 'array'
+    },
+    'map': {
+        'rust': 'HashMap<$K,$V>', 'python': 'dict', 'go': 'map[$K]$V', 'crystal': 'Hash($K,$V)', 'ruby': 'Hash',
+        'c': 'map', 'cpp': 'std::map<$K,$V>', 'csharp': 'Dictionary<$K,$V>', 'julia': 'Dict{$K,$V}', 'zig': 'std.HashMap($K,$V)',
+        'lua': 'table', 'java': 'Map<$K,$V>', 'javascript': 'object', 'shell': 'assoc', 'powershell': 'hashtable'
+    },
+    'set': {
+        'rust': 'HashSet<$T>', 'python': 'set', 'go': 'map[$T]struct{}', 'crystal': 'Set($T)', 'ruby': 'Set',
+        'c': 'set', 'cpp': 'std::set<$T>', 'csharp': 'HashSet<$T>', 'julia': 'Set{$T}', 'zig': 'std.HashSet($T)',
+        'lua': 'table', 'java': 'Set<$T>', 'javascript': 'Set', 'shell': 'set', 'powershell': 'hashset'
+    },
+    'tuple': {
+        'rust': '($*)', 'python': 'tuple', 'go': 'struct{$*}', 'crystal': 'Tuple($*)', 'ruby': 'Array',
+        'c': 'struct', 'cpp': 'std::tuple<$*>', 'csharp': 'Tuple<$*>', 'julia': 'Tuple{$*}', 'zig': 'struct {$*}',
+        'lua': 'table', 'java': 'Pair<$*>', 'javascript': 'array', 'shell': 'array', 'powershell': 'array'
+    },
+    # Add more types as needed
+}
+
+TARGETS = tuple(TYPE_MAPPINGS['int'])
+
+# Tuple element form ($i index, $T type) and separator where a plain type list
+# isn't valid: Go struct fields need names (struct{F0 int; F1 string})
+TUPLE_FIELDS = {'go': ('F$i $T', '; ')}
+
+# Boxed forms for generic arguments (List<Integer>, not List<int>)
+BOXED = {'java': {'int': 'Integer'}}
+
+def type_key(t: TypeNode) -> Tuple:
+    # Structural identity: list<int> written twice resolves once
+    if isinstance(t, MapType):
+        return ('map', type_key(t.key) if t.key else None, type_key(t.val) if t.val else None)
+    if isinstance(t, SetType):
+        return ('set', type_key(t.elem) if t.elem else None)
+    if isinstance(t, TupleType):
+        return ('tuple',) + tuple(type_key(e) for e in t.elems)
+    return (t.base,) + tuple(type_key(p) for p in t.params)
+
+class VelvetTypeResolver:
+    def __init__(self, targets: Optional[Sequence[str]] = None, mappings: Dict = None):
+        self.mappings = TYPE_MAPPINGS if mappings is None else mappings
+        self.targets = tuple(targets) if targets else TARGETS
+        unknown = [t for t in self.targets if t not in TARGETS]
+        if unknown:
+            raise ValueError(f"Unknown target language(s): {', '.join(unknown)}")
+        self.memo: Dict[Tuple, str] = {}  # (type key, lang): rendered type
+        self.typ_memo: Dict[Tuple, Dict[str, str]] = {}  # type key: {lang: type}, shared by every use
+        self.hits = 0
+        self.misses = 0
+
+    def resolve(self, t: Optional[TypeNode]) -> Optional[Dict[str, str]]:
+        if t is None:
+            return None
+        key = type_key(t)
+        typ = self.typ_memo.get(key)
+        if typ is None:
+            self.misses += 1
+            typ = self.typ_memo[key] = {lang: self.render(key, lang) for lang in self.targets}
+        else:
+            self.hits += 1
+        return typ
+
+    def render(self, key: Tuple, lang: str, arg: bool = False) -> str:
+        memo_key = (key, lang, arg)
+        out = self.memo.get(memo_key)
+        if out is not None:
+            return out
+        base, params = key[0], key[1:]
+        template = self.mappings.get(base, {}).get(lang)
+        args = [self.render(p, lang, True) if p is not None else None for p in params]
+        if template is None:
+            out = f"{base}<{','.join(a or 'T' for a in args)}>" if args else base  # User type: keep its arguments
+        elif base == 'map':
+            k, v = (args + [None, None])[:2]
+            out = template.replace('$K', k or 'K').replace('$V', v or 'V')
+        elif base == 'tuple':
+            field, sep = TUPLE_FIELDS.get(lang, ('$T', ','))
+            out = template.replace('$*', sep.join(field.replace('$i', str(i)).replace('$T', a or 'T')
+                                                  for i, a in enumerate(args)))
+        else:
+            out = template.replace('$T', args[0] if args and args[0] else 'T')  # Bare `list` stays generic
+        if arg:
+            out = BOXED.get(lang, {}).get(out, out)
+        self.memo[memo_key] = out
+        return out
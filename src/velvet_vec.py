@@ -0,0 +1,226 @@
+from typing import Callable, Dict, Optional
+
+# Range-loop specializer. A `*i=a..b{...}` body qualifies when every statement
+# is an integer assignment of one of two forms:
+#   temporary     ~t = f(i, invariants, earlier temporaries)
+#   accumulator   ~s = s + f(...) - g(...) ...  (s once, added, anywhere in the chain)
+# with f built from + - * and unary minus only. Nothing is loop-carried except
+# the accumulators, which nothing else reads, so the loop reduces to one sum
+# per accumulator over the whole index range: int64 NumPy arrays in chunks when
+# NumPy is installed and the values provably fit, otherwise the term compiled
+# to a single Python expression summed over range() (exact big ints).
+# Values are checked on entry; anything else (floats, strings, undefined
+# names) runs the generic loop instead.
+
+ARITH = {'+', '-', '*'}
+CHUNK = 1 << 20
+LIMIT = 1 << 62  # Largest magnitude allowed in an int64 intermediate or chunk sum
+
+_np = False
+
+def numpy():
+    # Imported on first specialized loop; None when not installed
+    global _np
+    if _np is False:
+        try:
+            import numpy as np
+        except ImportError:
+            np = None
+        _np = np
+    return _np
+
+def is_int_lit(tok: str) -> bool:
+    return tok.isdigit() or (tok[:1] == '-' and tok[1:].isdigit())
+
+def names(tree, out=None):
+    out = set() if out is None else out
+    if isinstance(tree, str):
+        if not is_int_lit(tree):
+            out.add(tree)
+    else:
+        for arg in tree[1:]:
+            names(arg, out)
+    return out
+
+def is_arith(tree) -> bool:
+    if isinstance(tree, str):
+        return is_int_lit(tree) or tree[:1].isalpha() or tree[:1] == '_'
+    if isinstance(tree, list):
+        if len(tree) == 3:
+            return tree[0] in ARITH and is_arith(tree[1]) and is_arith(tree[2])
+        return tree[0] in {'-', '+'} and is_arith(tree[1])
+    return False  # Calls
+
+def substitute(tree, temps: Dict):
+    if isinstance(tree, str):
+        return temps.get(tree, tree)
+    return [tree[0]] + [substitute(a, temps) for a in tree[1:]]
+
+def additive(tree, sign: int = 1, out=None):
+    # a - (b + c) -> [(1, a), (-1, b), (-1, c)]
+    out = [] if out is None else out
+    if isinstance(tree, list) and len(tree) == 3 and tree[0] in {'+', '-'}:
+        additive(tree[1], sign, out)
+        additive(tree[2], sign if tree[0] == '+' else -sign, out)
+    else:
+        out.append((sign, tree))
+    return out
+
+def split_acc(name: str, expr):
+    # ~s = s + a - b -> a - b (the per-iteration increment); None if not that shape
+    terms = additive(expr)
+    if (1, name) not in terms:
+        return None
+    terms.remove((1, name))
+    if not terms:
+        return None
+    sign, tree = terms[0]
+    tree = tree if sign > 0 else ['-', tree]
+    for sign, term in terms[1:]:
+        tree = ['+' if sign > 0 else '-', tree, term]
+    return tree
+
+def analyze(node: Dict) -> Optional[Dict]:
+    # -> {'temps': {name: tree}, 'accs': {name: increment tree}, 'invariants': [...]}
+    # with every tree rewritten in terms of the index and invariants; None if the loop doesn't qualify
+    var, body = node['var'], node['body']
+    if not body or any(n['type'] != 'var' for n in body):
+        return None
+    assigned = {n['name'] for n in body}
+    if var in assigned:
+        return None
+    temps, accs = {}, {}
+    for n in body:
+        name, expr = n['name'], n['expr']
+        if name in temps or name in accs or not is_arith(expr):
+            return None
+        inc = split_acc(name, expr)
+        term = expr if inc is None else inc
+        used = names(term)
+        if used & set(accs) or name in used or (used & assigned) - set(temps):
+            return None  # Reads a carried value
+        if inc is None:
+            temps[name] = substitute(term, temps)
+        else:
+            accs[name] = substitute(term, temps)
+    invariants = set()
+    for tree in list(temps.values()) + list(accs.values()):
+        invariants |= names(tree)
+    invariants.discard(var)
+    return {'temps': temps, 'accs': accs, 'invariants': sorted(invariants)}
+
+def bounds(tree, var: str, lo: int, hi: int, values: Dict):
+    # Interval of tree over var in [lo, hi]; None if any intermediate leaves int64
+    if isinstance(tree, str):
+        if tree == var:
+            r = (lo, hi)
+        else:
+            v = int(tree) if is_int_lit(tree) else values[tree]
+            r = (v, v)
+    elif len(tree) == 2:
+        r = bounds(tree[1], var, lo, hi, values)
+        if r is not None and tree[0] == '-':
+            r = (-r[1], -r[0])
+    else:
+        a, b = bounds(tree[1], var, lo, hi, values), bounds(tree[2], var, lo, hi, values)
+        if a is None or b is None:
+            return None
+        if tree[0] == '+':
+            r = (a[0] + b[0], a[1] + b[1])
+        elif tree[0] == '-':
+            r = (a[0] - b[1], a[1] - b[0])
+        else:
+            p = (a[0] * b[0], a[0] * b[1], a[1] * b[0], a[1] * b[1])
+            r = (min(p), max(p))
+    if r is None or max(-r[0], r[1]) >= LIMIT:
+        return None
+    return r
+
+def eval_tree(tree, var: str, index, values: Dict):
+    # Works on scalars and NumPy arrays alike
+    if isinstance(tree, str):
+        if tree == var:
+            return index
+        return int(tree) if is_int_lit(tree) else values[tree]
+    if len(tree) == 2:
+        x = eval_tree(tree[1], var, index, values)
+        return -x if tree[0] == '-' else x
+    a, b = eval_tree(tree[1], var, index, values), eval_tree(tree[2], var, index, values)
+    return a + b if tree[0] == '+' else a - b if tree[0] == '-' else a * b
+
+def to_source(tree, var: str, slots: Dict) -> str:
+    if isinstance(tree, str):
+        if tree == var:
+            return 'i'
+        return f"({tree})" if is_int_lit(tree) else slots[tree]
+    if len(tree) == 2:
+        return f"({tree[0]}{to_source(tree[1], var, slots)})"
+    return f"({to_source(tree[1], var, slots)} {tree[0]} {to_source(tree[2], var, slots)})"
+
+def sum_numpy(np, tree, var, start, end, values) -> Optional[int]:
+    r = bounds(tree, var, start, end - 1, values)
+    if r is None:
+        return None
+    peak = max(-r[0], r[1], 1)
+    chunk = min(CHUNK, LIMIT // peak)
+    if chunk < 1024:
+        return None  # Chunk sums would overflow; not worth batching
+    total = 0
+    for lo in range(start, end, chunk):
+        terms = eval_tree(tree, var, np.arange(lo, min(lo + chunk, end), dtype=np.int64), values)
+        if isinstance(terms, np.ndarray):
+            total += int(terms.sum(dtype=np.int64))
+        else:
+            total += int(terms) * (min(lo + chunk, end) - lo)  # Term doesn't depend on the index
+    return total
+
+def sum_python(tree, var, start, end, values) -> int:
+    slots = {name: f"v{k}" for k, name in enumerate(sorted(values))}
+    ns = {slots[name]: value for name, value in values.items()}
+    fn = eval(f"lambda i: {to_source(tree, var, slots)}", ns)  # Only ints, slot names and + - *
+    return sum(map(fn, range(start, end)))
+
+def specialize(node: Dict, body: Callable, start_of: Callable, end_of: Callable,
+               load: Callable) -> Optional[Callable]:
+    # -> loop(env) or None. body/start_of/end_of are the compiled generic loop
+    # parts, load(name) the interpreter's name lookup
+    plan = analyze(node)
+    if plan is None:
+        return None
+    from velvet_interp import VelvetError
+    var, temps, accs = node['var'], plan['temps'], plan['accs']
+    loads = [(name, load(name)) for name in plan['invariants'] + list(accs)]
+
+    def generic(env, start, end):
+        for i in range(start, end):  # Bounds already evaluated once; don't repeat their side effects
+            env[var] = i
+            body(env)
+
+    def loop(env):
+        start, end = start_of(env), end_of(env)
+        if type(start) is not int or type(end) is not int:
+            return generic(env, start, end)
+        if end <= start:
+            return None
+        values = {}
+        for name, get in loads:
+            try:
+                value = get(env)
+            except VelvetError:
+                return generic(env, start, end)  # Raises the usual error
+            if type(value) is not int:
+                return generic(env, start, end)
+            values[name] = value
+        np = numpy()
+        results = {}
+        for name, tree in accs.items():
+            total = sum_numpy(np, tree, var, start, end, values) if np is not None else None
+            if total is None:
+                total = sum_python(tree, var, start, end, values)
+            results[name] = values[name] + total
+        last = end - 1
+        env[var] = last
+        for name, tree in temps.items():
+            env[name] = eval_tree(tree, var, last, values)
+        env.update(results)
+    return loop
@@ -0,0 +1,40 @@
+import json
+from velvet_parser import VelvetParser
+from velvet_ir_gen import VelvetIRGen
+from velvet_interp import VelvetInterpreter
+from weave.bench import SHAPES, gen_corpus, percentile, compare, run_suite, main
+
+def test_corpora_run():
+    for shape in list(SHAPES) + ['mixed']:
+        code = gen_corpus(shape, 4)
+        assert len(code) >= 4 * 1024
+        ir = VelvetIRGen(VelvetParser().parse(code)).generate()
+        VelvetInterpreter(builtins={'print': lambda *a: None}).run(ir)
+    assert gen_corpus('inline', 4).count('#python{') > 10
+
+def test_percentile():
+    samples = [float(x) for x in range(1, 101)]
+    assert percentile(samples, 50) == 50
+    assert percentile(samples, 95) == 95
+    assert percentile([3.0], 95) == 3.0
+
+def test_suite_and_compare(tmp_path):
+    report = run_suite(['match'], 2, runs=3, warmup=0)
+    row = report['results']['match/parse']
+    assert row['runs'] == 3 and row['min_ms'] <= row['median_ms'] <= row['p95_ms']
+    assert set(k.split('/')[1] for k in report['results']) == {'lex', 'expand_macros', 'parse', 'ir_gen', 'exec'}
+    slower = json.loads(json.dumps(report))
+    slower['results']['match/lex']['median_ms'] *= 2
+    rows = {r['phase']: r for r in compare(slower, report, 0.10)}
+    assert rows['match/lex']['regressed'] and not rows['match/parse']['regressed']
+
+def test_main_fails_on_regression(tmp_path):
+    base = tmp_path / 'base.json'
+    assert main(None, ['--shapes=inline', '--size=1', '--runs=2', '--warmup=0', f'--out={base}']) == 0
+    data = json.loads(base.read_text())
+    for row in data['results'].values():
+        row['median_ms'] /= 100  # Baseline 100x faster: everything regressed
+    base.write_text(json.dumps(data))
+    out = tmp_path / 'cur.json'
+    assert main(None, ['--shapes=inline', '--size=1', '--runs=2', '--warmup=0', f'--out={out}', f'--baseline={base}']) == 1
+    assert main(None, ['--shapes=bogus']) == 2
@@ -0,0 +1,72 @@
+import pytest
+from concurrent.futures import ProcessPoolExecutor
+from velvet_cache import VelvetCache
+from velvet_parser import VelvetParser
+
+@pytest.fixture
+def cache(tmp_path):
+    return VelvetCache(root=str(tmp_path / "cache"))
+
+def test_cache_hit(cache):
+    code = "~x: int = 5;"
+    ast, ir = cache.compile(code, VelvetParser())
+    cached_ast, cached_ir = cache.compile(code, VelvetParser())
+    assert cache.hits == 1 and cache.misses == 1
+    assert cached_ir == ir
+    assert cached_ast.nodes[0].name == 'x'
+
+def test_cache_key_includes_macros(cache):
+    code = "~x: int = 5;"
+    assert cache.key(code, {}) != cache.key(code, {'inc': 'x + 1'})
+    assert cache.key(code, {}) != cache.key(code + " ", {})
+    assert cache.key(code, {}) != cache.key(code, {}, ['rust'])
+
+def test_cache_hit_registers_macros(cache):
+    code = "!macro dbl(~x){ x * 2 };\n~a = dbl(3);"
+    parsed = VelvetParser()
+    cache.compile(code, parsed)
+    hit = VelvetParser()
+    cache.compile(code, hit)
+    assert cache.hits == 1 and hit.macros == parsed.macros and 'dbl' in hit.macros
+
+def test_cache_disabled(tmp_path):
+    cache = VelvetCache(root=str(tmp_path / "cache"), enabled=False)
+    cache.compile("~x: int = 5;", VelvetParser())
+    cache.compile("~x: int = 5;", VelvetParser())
+    assert cache.hits == 0
+    assert cache.entries() == []
+
+def test_cache_eviction(tmp_path):
+    cache = VelvetCache(root=str(tmp_path / "cache"), max_bytes=1)
+    cache.compile("~x: int = 5;", VelvetParser())
+    cache.compile("~y: int = 6;", VelvetParser())
+    assert cache.evictions == 2
+    assert cache.entries() == []
+
+def test_cache_record(cache):
+    cache.compile("~x: int = 5;", VelvetParser())
+    cache.compile("~x: int = 5;", VelvetParser())
+    totals = cache.record()
+    assert totals['hits'] == 1 and totals['misses'] == 1
+    assert cache.record()['hits'] == 1
+
+def record_hit(root):
+    cache = VelvetCache(root=root)
+    cache.hits = 1
+    cache.record()
+
+def test_cache_record_concurrent(tmp_path):
+    root = str(tmp_path / "cache")
+    with ProcessPoolExecutor(max_workers=8) as pool:
+        list(pool.map(record_hit, [root] * 64))
+    assert VelvetCache(root=root).record()['hits'] == 64
+
+def test_cache_put_skips_walk_under_limit(cache, monkeypatch):
+    cache.compile("~x: int = 5;", VelvetParser())  # Seeds the size estimate
+    walks = []
+    entries = cache.entries
+    monkeypatch.setattr(cache, 'entries', lambda: walks.append(1) or entries())
+    for i in range(5):
+        cache.compile(f"~x: int = {i + 10};", VelvetParser())
+    assert walks == []
+    assert cache.read_size() == sum(size for _, size, _ in entries())
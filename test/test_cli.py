@@ -0,0 +1,33 @@
+import os
+import sys
+import subprocess
+from click.testing import CliRunner
+from vel.main import cli
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def test_import_is_light():
+    code = ("import sys, vel.main\n"
+            "heavy = ['rich', 'prompt_toolkit', 'watchfiles', 'velvet_parser', 'velvet_interp', 'utils.inline_exec']\n"
+            "print(','.join(m for m in heavy if m in sys.modules))")
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join([os.path.join(ROOT, 'src'), ROOT]))
+    out = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True, env=env, cwd=ROOT)
+    assert out.returncode == 0, out.stderr
+    assert out.stdout.strip() == ''
+
+def test_run_in_process(tmp_path, monkeypatch):
+    def no_spawn(*args, **kwargs):
+        raise AssertionError("vel run must not spawn a process")
+    monkeypatch.setattr(subprocess, 'run', no_spawn)
+    monkeypatch.setattr(subprocess, 'Popen', no_spawn)
+    monkeypatch.chdir(tmp_path)  # Short paths keep rich panels on one line
+    (tmp_path / 'p.vel').write_text('~x = 2;\nprint(x * 21);\n')
+    result = CliRunner().invoke(cli, ['run', '--no-cache', 'p.vel'])
+    assert result.exit_code == 0, result.output
+    assert '42' in result.output and 'Execution complete' in result.output
+
+def test_run_error_exit_code(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / 'bad.vel').write_text('~x = y + 1;\n')
+    result = CliRunner().invoke(cli, ['run', '--no-cache', 'bad.vel'])
+    assert result.exit_code == 1 and 'Undefined name' in result.output
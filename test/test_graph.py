@@ -0,0 +1,29 @@
+import pytest
+from weave.graph import ModuleGraph, scan_header
+
+def write(tmp_path, name, code):
+    path = tmp_path / name
+    path.write_text(code)
+    return str(path)
+
+def test_scan_header():
+    imports, deps = scan_header('import "util.vel";\n<crux-lib> <std>\n@ comment\n~x = 1;\n<late>')
+    assert imports == ["util.vel"]
+    assert deps == ["crux-lib", "std"]
+
+def test_waves(tmp_path):
+    base = write(tmp_path, "base.vel", "~x = 1;")
+    mid = write(tmp_path, "mid.vel", 'import "base.vel";\n~y = 2;')
+    other = write(tmp_path, "other.vel", "<std>\n~z = 3;")
+    top = write(tmp_path, "top.vel", 'import "mid";\n<other>\n~w = 4;')
+    graph = ModuleGraph(str(tmp_path))
+    graph.discover()
+    assert graph.waves() == [sorted([base, other]), [mid], [top]]
+
+def test_cycle(tmp_path):
+    write(tmp_path, "a.vel", 'import "b.vel";')
+    write(tmp_path, "b.vel", 'import "a.vel";')
+    graph = ModuleGraph(str(tmp_path))
+    graph.discover()
+    with pytest.raises(ValueError, match="Import cycle"):
+        graph.waves()
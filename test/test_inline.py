@@ -1,5 +1,12 @@
+import os
+import time
+import shutil
+import subprocess
 import pytest
+import utils.inline_exec as inline_exec
 from utils.inline_exec import InlineExecutor
+from utils.inline_stream import Tail
+from utils.inline_limits import load_limits, parse_size
 
 @pytest.fixture
 def executor():
@@ -30,3 +37,197 @@ def test_error_handling(executor):
     assert "err" in results[0]['stderr']
 
 # Add tests for all langs
+
+def test_concurrent_order(executor):
+    executor.concurrency = 4
+    blocks = [("python", f'import time; time.sleep({0.6 - i * 0.2}); print({i})') for i in range(3)]
+    start = time.perf_counter()
+    results = executor.execute(blocks, "test.vel")
+    elapsed = time.perf_counter() - start
+    assert list(results) == [0, 1, 2]
+    assert [results[i]['stdout'] for i in range(3)] == ["0", "1", "2"]
+    assert elapsed < 1.0  # Serial sleeps alone take 0.6 + 0.4 + 0.2
+
+def test_lang_timeout(executor):
+    executor.lang_timeouts = {"python": 0.5}
+    results = executor.execute([("python", 'import time; time.sleep(5)')], "test.vel")
+    assert results[0]['timeout']
+    assert results[0]['code'] != 0
+    assert results[0]['wall'] < 5
+
+def test_artifact_cache(executor, tmp_path):
+    executor.artifact_dir = str(tmp_path / "inline")
+    block = [("c", 'printf("cached\\n");')]
+    first = executor.execute(block, "test.vel")
+    second = executor.execute(block, "test.vel")
+    assert first[0]['stdout'] == second[0]['stdout'] == "cached"
+    assert (executor.artifact_misses, executor.artifact_hits) == (1, 1)
+    executor.compile_flags = {"c": ["-O2"]}
+    executor.execute(block, "test.vel")
+    assert executor.artifact_misses == 2
+
+def test_compiler_probe_cached(executor, tmp_path, monkeypatch):
+    executor.artifact_dir = str(tmp_path / "inline")
+    version = executor.compiler_version("c")
+    probes = []
+    run = subprocess.run
+    monkeypatch.setattr(subprocess, 'run', lambda cmd, *a, **kw: probes.append(cmd) or run(cmd, *a, **kw))
+    fresh = InlineExecutor()
+    fresh.artifact_dir = executor.artifact_dir
+    assert fresh.compiler_version("c") == version and probes == []  # Same gcc binary: no --version spawn
+
+def test_warm_worker(executor):
+    executor.warm_pool_size = 1
+    try:
+        first = executor.execute([("python", 'x = 41\nprint(x + 1)')], "test.vel")
+        second = executor.execute([("python", 'print(globals().get("x"))')], "test.vel")
+        assert first[0] == {'stdout': "42", 'stderr': "", 'code': 0, 'wall': first[0]['wall']}
+        assert second[0]['stdout'] == "None"  # Fresh namespace per block
+        error = executor.execute([("python", 'raise ValueError("err")')], "test.vel")
+        assert error[0]['code'] != 0 and "err" in error[0]['stderr']
+    finally:
+        executor.close()
+
+def test_warm_worker_isolation(executor):
+    executor.warm_pool_size = 1
+    try:
+        blocks = [("python", 'import os, sys, json\nos.chdir("/")\nos.environ["VELVET_T"] = "1"\nsys.velvet_t = 1\njson.dumps = None'),
+                  ("python", 'import os, sys\nprint(os.getcwd(), os.environ.get("VELVET_T"), getattr(sys, "velvet_t", None))'),
+                  ("python", 'print(input())')]
+        results = executor.execute(blocks, "test.vel")
+        assert results[0]['code'] == 0
+        assert results[1]['stdout'] == f"{os.getcwd()} None None"
+        assert results[2]['code'] != 0 and "EOFError" in results[2]['stderr']  # stdin is not the request pipe
+        garbled = executor.execute([("python", 'import __main__\n__main__.write(b"2\\nxx")')], "test.vel")
+        assert garbled[0]['code'] != 0 and "malformed" in garbled[0]['stderr']
+        assert executor.execute([("python", 'print(1)')], "test.vel")[0]['stdout'] == "1"
+        assert executor.pools['python'].restarts == 1
+    finally:
+        executor.close()
+
+def test_warm_worker_missing_interpreter(executor, monkeypatch):
+    monkeypatch.setitem(inline_exec.WORKER_CMDS, 'lua', ['velvet-no-such-lua', '-e', ''])
+    executor.warm_pool_size = 1
+    try:
+        results = executor.execute([("lua", 'print(1)'), ("python", 'print(2)')], "test.vel")
+        assert results[0]['code'] == 127 and "not found" in results[0]['stderr']
+        assert results[1]['stdout'] == "2"  # The batch keeps going
+    finally:
+        executor.close()
+
+@pytest.mark.skipif(shutil.which('lua') is None, reason="lua not installed")
+def test_warm_worker_lua(executor):
+    executor.warm_pool_size = 1
+    try:
+        results = executor.execute([("lua", 'x = 1\nprint("a", x + 1)'), ("lua", 'io.write(tostring(x))')], "test.vel")
+        assert results[0]['stdout'] == "a\t2" and results[0]['code'] == 0
+        assert results[1]['stdout'] == "nil"  # Globals don't leak between blocks
+    finally:
+        executor.close()
+
+def test_warm_worker_restart(executor):
+    executor.warm_pool_size = 1
+    try:
+        crashed = executor.execute([("python", 'import os; os._exit(3)')], "test.vel")
+        assert crashed[0]['code'] == 3
+        executor.lang_timeouts = {"python": 0.5}
+        timed_out = executor.execute([("python", 'while True: pass')], "test.vel")
+        assert timed_out[0]['timeout']
+        again = executor.execute([("python", 'print("alive")')], "test.vel")
+        assert again[0]['stdout'] == "alive"
+        assert executor.pools["python"].restarts == 2
+    finally:
+        executor.close()
+
+def test_stream_lines_live(executor):
+    seen = []
+    executor.stream_output = True
+    executor.on_output = lambda i, stream, line: seen.append((i, stream, line, time.monotonic()))
+    code = 'import sys, time\nprint("first")\ntime.sleep(0.5)\nprint("oops", file=sys.stderr)\nprint("last")'
+    results = executor.execute([("python", code)], "test.vel")
+    done = time.monotonic()
+    assert seen[0][:3] == (0, 'stdout', "first")
+    assert sorted(s[:3] for s in seen[1:]) == [(0, 'stderr', "oops"), (0, 'stdout', "last")]  # Pipes race
+    assert done - seen[0][3] >= 0.4  # Forwarded before the block finished
+    assert results[0]['stdout'] == "first\nlast" and results[0]['stderr'] == "oops"
+
+def test_stream_tail_bounded(executor):
+    executor.stream_output = True
+    executor.on_output = lambda *args: None
+    executor.output_tail = 1000
+    results = executor.execute([("python", 'for i in range(20000): print(i)')], "test.vel")
+    out = results[0]['stdout']
+    assert len(out) <= 1000 and out.endswith("19999")
+    assert results[0]['truncated'] and results[0]['stdout_bytes'] == sum(len(f"{i}\n") for i in range(20000))
+
+def test_output_limit_kills(executor):
+    executor.output_limit = 100_000
+    results = executor.execute([("python", 'while True: print("x" * 100)')], "test.vel")
+    assert results[0]['output_limit'] and results[0]['code'] != 0
+    assert "exceeded the output limit" in results[0]['stderr']
+    assert results[0]['stdout_bytes'] <= 100_000 + 65536
+
+def test_output_limit_bypasses_workers(executor):
+    executor.warm_pool_size = 1
+    executor.output_limit = 100_000
+    try:
+        results = executor.execute([("python", 'while True: print("x" * 100)')], "test.vel")
+        assert results[0]['output_limit'] and results[0]['stdout_bytes'] <= 100_000 + 65536
+        assert executor.pools == {}  # Killed in a fresh process, not buffered by a worker
+    finally:
+        executor.close()
+
+def test_tail_ring_buffer():
+    tail = Tail(10)
+    for chunk in (b"abcdef", b"ghijkl", b"mnop"):
+        tail.write(chunk)
+    assert tail.value() == b"ghijklmnop" and tail.total == 16 and tail.dropped == 6
+    assert len(tail.chunks) == 2  # Chunks fully past the window are released
+
+def test_usage_reported(executor):
+    results = executor.execute([("python", 'x = bytearray(64 << 20); sum(range(3_000_000))')], "test.vel")
+    assert results[0]['max_rss'] >= 64 << 20
+    assert 0 < results[0]['cpu'] <= results[0]['wall'] + 0.1
+
+def test_usage_excludes_parent(executor):
+    ballast = bytearray(200 << 20)  # The executor's own footprint must not show up as the block's
+    ballast[::4096] = b'x' * len(ballast[::4096])
+    results = executor.execute([("shell", 'echo hi')], "test.vel")
+    assert results[0]['stdout'] == "hi" and results[0]['max_rss'] < 50 << 20
+
+def test_cpu_limit_kills(executor):
+    executor.limits = {'python': {'cpu': 1}}
+    results = executor.execute([("python", 'while True: pass')], "test.vel")
+    assert results[0]['cpu_limit'] and results[0]['code'] != 0
+    assert "CPU limit exceeded" in results[0]['stderr']
+    assert 0.9 <= results[0]['cpu'] < 3  # Tick granularity
+
+def test_limits_with_jobs(executor):
+    executor.concurrency = 4
+    executor.limits = {'python': {'cpu': 5, 'files': 32}}
+    blocks = [("python", f'import resource; print(resource.getrlimit(resource.RLIMIT_NOFILE)[0] + {i})') for i in range(4)]
+    results = executor.execute(blocks, "test.vel")
+    assert [results[i]['stdout'] for i in range(4)] == ["32", "33", "34", "35"]
+
+def test_run_plain(executor):
+    result = executor.run_plain(["python", "-c", "print(1)"], dict(os.environ))
+    assert result == {'stdout': "1", 'stderr': "", 'code': 0}
+    assert executor.run_plain(["velvet-no-such-cmd"], dict(os.environ))['code'] == 127
+
+def test_memory_limit(executor):
+    executor.limits = {'*': {'memory': parse_size("256M")}}
+    results = executor.execute([("python", 'x = bytearray(512 << 20)')], "test.vel")
+    assert results[0]['code'] != 0 and "MemoryError" in results[0]['stderr']
+
+def test_limits_config(executor, tmp_path):
+    config = tmp_path / ".velvet.toml"
+    config.write_text('[inline.limits]\nwall = 0.5\nfiles = 64\n\n[inline.limits.python]\nmemory = "1G"\n')
+    assert load_limits(str(config)) == {'*': {'wall': 0.5, 'files': 64}, 'python': {'memory': 1 << 30}}
+    executor.limits_file = str(config)
+    start = time.perf_counter()
+    results = executor.execute([("shell", 'sleep 30 & sleep 30; echo done')], "test.vel")  # Background child holds the pipe
+    assert results[0]['timeout'] and time.perf_counter() - start < 5
+    config.write_text('[inline.limits]\nstack = 1\n')
+    with pytest.raises(ValueError, match="Unknown inline limit 'stack'"):
+        load_limits(str(config))
+
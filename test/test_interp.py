@@ -0,0 +1,116 @@
+import time
+import asyncio
+import pytest
+from velvet_parser import VelvetParser
+from velvet_ir_gen import VelvetIRGen
+from velvet_interp import VelvetInterpreter, VelvetError
+from velvet_async import MemoryIO, NetIO, VelvetIO
+
+def run(code):
+    interp = VelvetInterpreter()
+    ir = VelvetIRGen(VelvetParser().parse(code)).generate()
+    return interp, interp.run(ir)
+
+def test_eval_rpn():
+    interp, _ = run("~y = 1 + 2 * 3;")
+    assert interp.globals['y'] == 7
+
+def test_call_func():
+    interp, value = run("!add(~a,~b){^a+b};\nadd(2, 3) * 2;")
+    assert value == 10
+
+def test_loop():
+    interp, _ = run("~s = 0;\n*i=0..10{ ~s = s + i; };")
+    assert interp.globals['s'] == 45
+
+def test_func_locals():
+    interp, value = run("!fib(~n){ ~a=0; ~b=1; *i=0..n{ ~t=a+b; ~a=b; ~b=t; }; ^a };\nfib(10);")
+    assert value == 55
+    assert 'a' not in interp.globals
+
+def test_match():
+    interp, _ = run('~c = "red";\nmatch c { "red" => ~hot=1, _ => ~hot=0 };')
+    assert interp.globals['hot'] == 1
+
+def test_builtins():
+    out = []
+    interp = VelvetInterpreter(builtins={'print': lambda *a: out.append(a)})
+    interp.run(VelvetIRGen(VelvetParser().parse('print("hi", 2);')).generate())
+    assert out == [("hi", 2)]
+
+def test_undefined_name():
+    with pytest.raises(VelvetError):
+        run("~x = y + 1;")
+
+def test_comparisons_unary():
+    interp, _ = run("~x = 5;\n~a = 0;\n?x>3 { ~a = -x * 2; };\n~b = !(x == 5);\n~c = x != 4;")
+    assert interp.globals['a'] == -10
+    assert interp.globals['b'] is False
+    assert interp.globals['c'] is True
+
+def run_async(code, io):
+    interp = VelvetInterpreter(io=io)
+    try:
+        interp.run(VelvetIRGen(VelvetParser().parse(code)).generate())
+    finally:
+        interp.close()
+    return interp
+
+def test_async_overlaps():
+    io = MemoryIO({'a': 'xy'}, latency_ms=50)
+    code = ('async !get(~u){ ~res = await fetch(u); ^res };\n'
+            '*i=0..20{ get("a"); };\n~r = await get("a") + await get("a");')
+    start = time.perf_counter()
+    interp = run_async(code, io)
+    assert time.perf_counter() - start < 0.5  # 22 fetches share one latency window, not 22
+    assert interp.globals['r'] == 'xyxy'
+    assert io.requests == 22
+
+def test_async_sequential_in_body():
+    code = 'async !total(~n){ ~t = 0; *i=0..n{ ~t = t + len(await fetch("a")); }; ^t };\n~r = await total(3);'
+    assert run_async(code, MemoryIO({'a': 'abc'})).globals['r'] == 9
+
+def test_async_fetch_error():
+    with pytest.raises(ConnectionError):
+        run_async('~r = await fetch("missing");', MemoryIO())
+
+def test_io_backend_needs_fetch():
+    class SleepOnly(VelvetIO):
+        async def sleep(self, ms):
+            pass
+    with pytest.raises(TypeError, match="fetch"):
+        SleepOnly()
+
+def test_await_in_sync_func_from_async():
+    code = '!f(){ ^await fetch("a") };\nasync !g(){ ^f() };\n~r = await g();'
+    with pytest.raises(VelvetError):
+        run_async(code, MemoryIO({'a': 'x'}))
+
+def test_net_io_local_server():
+    # Local HTTP stand-in on the interpreter's own loop
+    interp = VelvetInterpreter(io=NetIO(timeout=5))
+    loop = interp.runtime.loop
+
+    async def handle(reader, writer):
+        line = await reader.readline()
+        while (await reader.readline()).strip():
+            pass
+        path = line.split()[1].decode()
+        status = b'200 OK' if path == '/hello' else b'404 Not Found'
+        writer.write(b'HTTP/1.0 ' + status + b'\r\n\r\nhi ' + path.encode())
+        await writer.drain()
+        writer.close()
+
+    server = loop.run_until_complete(asyncio.start_server(handle, '127.0.0.1', 0))
+    port = server.sockets[0].getsockname()[1]
+    code = (f'async !get(~p){{ ~res = await fetch("http://127.0.0.1:{port}" + p); ^res }};\n'
+            '~a = get("/hello");\n~r = await a;')
+    try:
+        interp.run(VelvetIRGen(VelvetParser().parse(code)).generate())
+        assert interp.globals['r'] == 'hi /hello'
+        with pytest.raises(ConnectionError):
+            interp.run(VelvetIRGen(VelvetParser().parse('~x = await get("/nope");')).generate())
+    finally:
+        server.close()
+        loop.run_until_complete(server.wait_closed())
+        interp.close()
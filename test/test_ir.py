@@ -1,5 +1,8 @@
+import os
+import json
 import pytest
 from velvet_ir_gen import VelvetIRGen
+from velvet_ir_bin import dumps, load
 from velvet_parser import VelvetParser
 
 @pytest.fixture
@@ -27,4 +30,52 @@ def test_match(ir_gen):
     assert ir['nodes'][0]['type'] == 'match'
     assert len(ir['nodes'][0]['cases']) == 2
 
+def test_generic_types():
+    code = "~a: list<int> = 1;\n~b: map<str, list<int>> = 2;\n~c: tuple<int, str> = 3;\n~d: Pair<int> = 4;\n~e: list<int> = 5;"
+    gen = VelvetIRGen(VelvetParser().parse(code))
+    nodes = gen.generate()['nodes']
+    assert nodes[0]['typ']['rust'] == 'Vec<i32>'
+    assert nodes[0]['typ']['java'] == 'List<Integer>'
+    assert nodes[1]['typ']['go'] == 'map[string][]int'
+    assert nodes[1]['typ']['python'] == 'dict'
+    assert nodes[2]['typ']['cpp'] == 'std::tuple<int,std::string>'
+    assert nodes[2]['typ']['go'] == 'struct{F0 int; F1 string}'
+    assert nodes[3]['typ']['rust'] == 'Pair<i32>'
+    assert nodes[4]['typ'] is nodes[0]['typ']  # Memoized by structure
+    assert gen.types.misses == 4
+
+def test_targets():
+    ir = VelvetIRGen(VelvetParser().parse("~x: list<str> = 1;\n~y = 2;"), ['rust', 'zig']).generate()
+    assert ir['nodes'][0]['typ'] == {'rust': 'Vec<&str>', 'zig': '[][]const u8'}
+    assert ir['nodes'][1]['typ'] is None
+    with pytest.raises(ValueError):
+        VelvetIRGen(VelvetParser().parse("~x = 1;"), ['cobol'])
+
+def test_binary_roundtrip(tmp_path):
+    code = '~x: int = 5;\n~y: int = -7;\n!f(~a){ ^a + 1 };\nmatch x { 1 => y, _ => z };'
+    gen = VelvetIRGen(VelvetParser().parse(code))
+    ir = gen.generate()
+    paths = gen.write(str(tmp_path / "m.ir"), 'both')
+    assert [os.path.basename(p) for p in paths] == ["m.ir.json", "m.ir.bin"]
+    with load(paths[1]) as bin_ir:
+        assert len(bin_ir['nodes']) == 4
+        assert bin_ir['nodes'][-1] == json.loads(json.dumps(ir['nodes'][-1]))
+        assert bin_ir.to_dict() == json.load(open(paths[0]))
+
+def test_binary_values(tmp_path):
+    ir = {'deps': [], 'nodes': [{'v': [0, -1, 2 ** 40, 2 ** 70, 1.5, None, True, False, "é", [], {}]}]}
+    data = dumps(ir)
+    assert data[:4] == b'VLIR' and len(data) % 4 == 0
+    assert len(dumps({'deps': [], 'nodes': ir['nodes'] * 50})) == len(data) + 49 * 4  # Shared subtrees
+    path = tmp_path / "v.ir.bin"
+    path.write_bytes(data)
+    with load(str(path)) as bin_ir:
+        assert bin_ir.to_dict() == ir
+
+def test_binary_bad_file(tmp_path):
+    bad = tmp_path / "bad.ir.bin"
+    bad.write_bytes(b'{"nodes": []}' * 10)
+    with pytest.raises(ValueError):
+        load(str(bad))
+
 # Add tests for macro expansion, inline embed, etc.
@@ -0,0 +1,41 @@
+import pytest
+from velvet_lexer import VelvetLexer
+
+@pytest.fixture
+def lexer():
+    return VelvetLexer()
+
+def test_lex_list(lexer):
+    tokens = lexer.lex("~x = 5;")
+    assert tokens == [('VAR', '~'), ('ID', 'x'), ('EQ', '='), ('NUM', '5'), ('SEMI', ';')]
+
+def test_stream_matches_list(lexer):
+    code = "<std>\n@ comment\n!add(~a,~b){^a+b};"
+    stream = lexer.lex_stream(code)
+    assert list(stream) == lexer.lex(code)
+    assert len(stream) == len(lexer.lex(code))
+
+def test_stream_offsets(lexer):
+    stream = lexer.lex_stream("~x = 5;\n~name = 10;")
+    assert stream.kind(6) == 'ID'
+    assert stream.value(6) == 'name'
+    assert stream.span(6) == (9, 13)
+    assert stream.line_col(6) == (2, 2)
+
+def test_inline_raw_block(lexer):
+    code = '~x=1;\n#c{ int main(){ char c = \'}\'; puts("}{"); return 0; } };\n~y=2;'
+    stream = lexer.lex_stream(code)
+    kinds = [stream.kind(i) for i in range(len(stream))]
+    assert kinds[5:8] == ['INLINE', 'INLINE_CODE', 'SEMI']
+    assert stream.value(6) == ' int main(){ char c = \'}\'; puts("}{"); return 0; } '
+    assert code[slice(*stream.span(6))] == stream.value(6)  # Offsets into the source, no copy
+    assert kinds[8:] == ['VAR', 'ID', 'EQ', 'NUM', 'SEMI']
+
+def test_inline_raw_strings(lexer):
+    tokens = lexer.lex('#rust{ fn f<\'a>(x: &\'a str) { \'{\'; } };\n#python{ s = \'}\' + """{\n""" };')
+    assert [t for t, _ in tokens] == ['INLINE', 'INLINE_CODE', 'SEMI', 'INLINE', 'INLINE_CODE', 'SEMI']
+    assert tokens[4][1] == ' s = \'}\' + """{\n""" '
+
+def test_inline_unterminated(lexer):
+    with pytest.raises(ValueError, match="Unterminated inline block at line 2"):
+        lexer.lex('~x=1;\n#c{ int main() { ')
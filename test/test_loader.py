@@ -0,0 +1,143 @@
+import os
+import threading
+import pytest
+from velvet_cache import VelvetCache
+from velvet_interp import VelvetInterpreter
+from weave.loader import ModuleLoader
+
+def write(tmp_path, name, code):
+    path = tmp_path / name
+    path.write_text(code)
+    return str(path)
+
+@pytest.fixture
+def session(tmp_path):
+    interp = VelvetInterpreter()
+    loader = ModuleLoader(interp.run, root=str(tmp_path))
+    yield interp, loader
+    interp.close()
+
+def names(paths):
+    return [os.path.basename(p) for p in paths]
+
+def test_transitive_once(tmp_path, session):
+    interp, loader = session
+    write(tmp_path, "base.vel", "~b = 1;")
+    write(tmp_path, "left.vel", 'import "base.vel";\n~l = b + 1;')
+    write(tmp_path, "right.vel", 'import "base";\n~r = b + 2;')
+    top = write(tmp_path, "top.vel", 'import "left.vel";\nimport "right.vel";\n~t = l + r;')
+    assert names(loader.load(top)) == ["base.vel", "left.vel", "right.vel", "top.vel"]
+    assert interp.globals['t'] == 5
+    assert loader.parsed == 4  # base parsed once for both importers
+    assert loader.load(top) == []
+
+def test_missing_import(tmp_path, session):
+    _, loader = session
+    top = write(tmp_path, "top.vel", 'import "nope.vel";\n~t = 1;')
+    with pytest.raises(ValueError, match="nope.vel not found"):
+        loader.load(top)
+    assert loader.modules == {} and loader.graph.edges == {}
+
+def test_cycle(tmp_path, session):
+    _, loader = session
+    a = write(tmp_path, "a.vel", 'import "b.vel";\n~a = 1;')
+    write(tmp_path, "b.vel", 'import "a.vel";\n~b = 1;')
+    with pytest.raises(ValueError, match="Import cycle"):
+        loader.load(a)
+    assert loader.modules == {}
+
+def test_failed_run_not_loaded(tmp_path, session):
+    interp, loader = session
+    write(tmp_path, "base.vel", "~b = 1;")
+    top = write(tmp_path, "top.vel", 'import "base.vel";\n~t = nope + b;')
+    with pytest.raises(Exception, match="Undefined name: nope"):
+        loader.load(top)
+    assert names(loader.modules) == ["base.vel"]  # base ran; top did not finish
+    write(tmp_path, "top.vel", 'import "base.vel";\n~t = 1 + b;')
+    assert names(loader.load(top)) == ["top.vel"]  # Not "already loaded"
+    assert interp.globals['t'] == 2
+
+def test_reload_dependents_only(tmp_path, session):
+    interp, loader = session
+    base = write(tmp_path, "base.vel", "~b = 1;")
+    write(tmp_path, "mid.vel", 'import "base.vel";\n~m = b * 10;')
+    other = write(tmp_path, "other.vel", "~o = 7;")
+    loader.load(write(tmp_path, "top.vel", 'import "mid.vel";\n~t = m + 1;'))
+    loader.load(other)
+    parsed = loader.parsed
+    write(tmp_path, "base.vel", "~b = 2;")
+    assert names(loader.reload([base, other])) == ["base.vel", "mid.vel", "top.vel"]
+    assert loader.parsed == parsed + 1  # Dependents re-run from their loaded IR
+    assert interp.globals['t'] == 21
+    assert loader.reload([base]) == []  # Unchanged
+
+def test_reload_cycle_keeps_state(tmp_path, session):
+    interp, loader = session
+    base = write(tmp_path, "base.vel", "~b = 1;")
+    top = write(tmp_path, "top.vel", 'import "base.vel";\n~t = b;')
+    loader.load(top)
+    edges = {k: set(v) for k, v in loader.graph.edges.items()}
+    write(tmp_path, "base.vel", 'import "top.vel";\n~b = 2;')
+    with pytest.raises(ValueError, match="Import cycle"):
+        loader.reload([base])
+    assert loader.graph.edges == edges
+    assert loader.modules[base].code == "~b = 1;"
+
+def test_reload_new_import(tmp_path, session):
+    interp, loader = session
+    top = write(tmp_path, "top.vel", "~t = 1;")
+    loader.load(top)
+    write(tmp_path, "extra.vel", "~e = 5;")
+    write(tmp_path, "top.vel", 'import "extra.vel";\n~t = e + 1;')
+    assert names(loader.reload([top])) == ["extra.vel", "top.vel"]
+    assert interp.globals['t'] == 6
+
+def test_macros_flow_to_importers(tmp_path, session):
+    interp, loader = session
+    lib = write(tmp_path, "lib.vel", "!macro twice(~x){ x * 2 };\n~l = 0;")
+    top = write(tmp_path, "top.vel", 'import "lib.vel";\n~t = twice(4);')
+    loader.load(top)
+    assert interp.globals['t'] == 8
+    assert 'twice' in loader.macros
+    write(tmp_path, "lib.vel", "!macro twice(~x){ x * 3 };\n~l = 0;")
+    loader.reload([lib])
+    assert interp.globals['t'] == 12  # top reparsed: its expansion changed
+
+def test_reload_macro_module_reparses_edit_only(tmp_path, session):
+    interp, loader = session
+    body = ''.join(f"~v{k} = dbl({k});\n" for k in range(200))
+    path = write(tmp_path, "m.vel", "!macro dbl(~x){ x * 2 };\n" + body)
+    loader.load(path)
+    assert loader.parsers[path].reparsed == 201
+    write(tmp_path, "m.vel", "!macro dbl(~x){ x * 2 };\n" + body.replace("dbl(7)", "dbl(8)"))
+    assert names(loader.reload([path])) == ["m.vel"]
+    assert loader.parsers[path].reparsed == 1
+    assert interp.globals['v7'] == 16
+
+def test_macros_survive_cache_hits(tmp_path):
+    write(tmp_path, "lib.vel", "!macro inc(~x){ x + 1 };")
+    top = write(tmp_path, "top.vel", 'import "lib.vel";\n~t = inc(1);')
+    cache = VelvetCache(root=str(tmp_path / "cache"))
+    for _ in range(2):
+        interp = VelvetInterpreter()
+        ModuleLoader(interp.run, root=str(tmp_path), cache=cache).load(top)
+        assert interp.globals['t'] == 2
+        interp.close()
+    assert cache.hits == 2
+
+def test_siblings_parse_in_parallel(tmp_path):
+    for i in range(4):
+        write(tmp_path, f"m{i}.vel", f"~v{i} = {i};")
+    top = write(tmp_path, "top.vel", "".join(f'import "m{i}.vel";\n' for i in range(4)) + "~t = 0;")
+    interp = VelvetInterpreter()
+    loader = ModuleLoader(interp.run, root=str(tmp_path), jobs=4)
+    threads = set()
+    compile_one = loader.compile_one
+    def record(*args):
+        threads.add(threading.get_ident())
+        return compile_one(*args)
+    loader.compile_one = record
+    loader.load(top)
+    interp.close()
+    assert threading.get_ident() not in threads
+    assert [interp.globals[f"v{i}"] for i in range(4)] == [0, 1, 2, 3]
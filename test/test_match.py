@@ -0,0 +1,76 @@
+import pytest
+from velvet_parser import VelvetParser
+from velvet_ir_gen import VelvetIRGen
+from velvet_interp import VelvetInterpreter
+from velvet_match import build, tree_size, Switch, Leaf, DICT, SEQ
+
+def match_ir(arms, subject='v'):
+    code = f"match {subject} {{ {', '.join(arms)} }};"
+    return VelvetIRGen(VelvetParser().parse(code)).generate()
+
+def run_match(arms, value):
+    interp = VelvetInterpreter()
+    interp.globals['v'] = value
+    interp.run(match_ir(arms))
+    return interp.globals
+
+def tree(arms):
+    return build([c['pat'] for c in match_ir(arms)['nodes'][0]['cases']], VelvetInterpreter().literal)
+
+def max_repeats(node, seen=()):
+    if not isinstance(node, Switch):
+        return max([seen.count(d) for d in seen] or [1])
+    seen += (node.disc,)
+    return max(max_repeats(n, seen) for n in list(node.table.values()) + [node.default])
+
+def test_literal_arms_one_switch():
+    arms = [f'"s{i}" => ~r={i}' for i in range(300)] + ['_ => ~r=-1']
+    t = tree(arms)
+    assert isinstance(t, Switch) and len(t.table) == 300
+    assert isinstance(t.default, Leaf) and t.default.case == 300
+    assert run_match(arms, 's217')['r'] == 217
+    assert run_match(arms, 'zzz')['r'] == -1
+    assert run_match(arms, [1, 2])['r'] == -1  # Unhashable subject falls through
+
+def test_first_match_wins():
+    arms = ['1 => ~r="a"', 'x => ~r="b"', '1 => ~r="c"', '2 => ~r="d"']
+    assert run_match(arms, 1)['r'] == 'a'
+    g = run_match(arms, 2)
+    assert g['r'] == 'b' and g['x'] == 2
+
+def test_tuple_shared_prefix():
+    arms = ['(1, a) => ~r=a', '(1, 2, b) => ~r=b', '(2, a) => ~r=0', '(x, 7) => ~r=x', '_ => ~r=-1']
+    t = tree(arms)
+    assert t.disc == ((), 'shape')  # Tuple shape tested once at the root
+    assert set(t.table) == {(SEQ, 2), (SEQ, 3)}
+    assert tree_size(t) == (5, 5)  # Arms reached from several branches are shared
+    assert max_repeats(t) == 1  # No test runs twice on any path
+    assert run_match(arms, (1, 5))['r'] == 5
+    assert run_match(arms, [1, 2, 9])['r'] == 9
+    assert run_match(arms, (2, 3))['r'] == 0
+    assert run_match(arms, (3, 7))['r'] == 3
+    assert run_match(arms, (3, 8))['r'] == -1
+
+def test_dict_patterns():
+    arms = ['{"op": "add", "x": a} => ~r=a', '{"op": o} => ~r=o', '[a, {"k": b}] => ~r=b', '_ => ~r=0']
+    t = tree(arms)
+    assert DICT in t.table
+    assert run_match(arms, {'op': 'add', 'x': 4})['r'] == 4
+    assert run_match(arms, {'op': 'sub'})['r'] == 'sub'
+    assert run_match(arms, {'x': 1})['r'] == 0
+    assert run_match(arms, [1, {'k': 'deep'}])['r'] == 'deep'
+
+@pytest.mark.parametrize("value", [0, 1, 2, "a", (1, 2), (2, 1), [1, 2, 3], {"k": 1}, {"k": 2, "j": 1}, {}, None])
+def test_same_as_linear(value):
+    # Decision tree picks the same arm and bindings as trying each pattern in order
+    arms = ['(a, 1) => ~r=1', '(1, b) => ~r=2', '[1, 2, c] => ~r=3', '{"k": 1} => ~r=4',
+            '{"j": j, "k": k} => ~r=5', '1 => ~r=6', '"a" => ~r=7', 'z => ~r=8']
+    interp = VelvetInterpreter()
+    for i, case in enumerate(match_ir(arms)['nodes'][0]['cases']):
+        expected = {}
+        if interp.compile_pat(case['pat'])(value, expected):
+            expected['r'] = i + 1
+            break
+    got = run_match(arms, value)
+    got.pop('v')
+    assert got == expected
@@ -0,0 +1,69 @@
+import pytest
+from velvet_parser import VelvetParser
+from velvet_ir_gen import VelvetIRGen
+from velvet_interp import VelvetInterpreter
+from velvet_opt import PassManager, fold
+
+def opt(code, entry=False):
+    ir = VelvetIRGen(VelvetParser().parse(code)).generate()
+    pm = PassManager(entry=entry)
+    return ir, pm.run(ir), pm
+
+def test_fold():
+    assert fold(['+', '1', ['*', '2', '3']]) == '7'
+    assert fold(['+', 'x', ['*', '2', '3']]) == ['+', 'x', '6']
+    assert fold(['/', '1', '0']) == ['/', '1', '0']  # Left for the runtime error
+    assert fold(['+', '"a"', '"b"']) == '"ab"'
+    assert fold(['+', '"a"', '1']) == ['+', '"a"', '1']
+    assert fold(['-', '2', '5']) == '-3'
+    assert fold(['-', ['-', '4']]) == '4'
+    assert fold(['<', '1', '2']) == ['<', '1', '2']
+    assert fold(['<', '1', '2'], in_cond=True) == '1'
+    assert fold({'call': 'f', 'args': [['+', '1', '1']]}) == {'call': 'f', 'args': ['2']}
+
+def test_propagate():
+    ir, out, _ = opt("~a = 1 + 2;\n~b = a * 2;\n~c = b + x;")
+    assert [n['expr'] for n in out['nodes']] == ['3', '6', ['+', '6', 'x']]
+    assert ir['nodes'][1]['expr'] == ['*', 'a', '2']  # Input IR untouched
+
+def test_no_propagate_rebound():
+    _, out, _ = opt("~s = 0;\n*i=0..3{ ~s = s + i; };")
+    assert out['nodes'][1]['body'][0]['expr'] == ['+', 's', 'i']
+
+def test_dead_if():
+    _, out, _ = opt("~d = 0;\n?d{ print(1); };\n?1{ print(2); };")
+    assert [n['type'] for n in out['nodes']] == ['var', 'expr']
+    assert out['nodes'][1]['expr']['args'] == ['2']
+
+def test_inline_and_dead_func():
+    code = "!sq(~n){^n * n};\n!unused(~n){^n};\n~y = sq(4) + sq(z);"
+    _, out, pm = opt(code, entry=True)
+    assert [n['type'] for n in out['nodes']] == ['var']
+    assert out['nodes'][0]['expr'] == ['+', '16', ['*', 'z', 'z']]
+    assert pm.inlined == 2
+    _, lib, _ = opt(code, entry=False)
+    assert [n.get('name') for n in lib['nodes']] == ['sq', 'unused', 'y']
+
+def test_no_inline_impure():
+    _, out, _ = opt("!f(~n){ print(n); ^n };\n!g(~n){^h(n)};\n~y = f(1) + g(2);", entry=True)
+    assert [n.get('name') for n in out['nodes']] == ['f', 'g', 'y']
+
+def test_report():
+    _, _, pm = opt("!macro dbl(~x){ x * 2 };\n~y = dbl(3);")
+    assert [r['pass'] for r in pm.report][:2] == ['drop-macros', 'fold']
+    assert pm.report[0]['nodes'] == (2, 1)
+    assert pm.report[1]['terms'] == (3, 1)
+    assert 'dead-func' in pm.format_report()
+
+@pytest.mark.parametrize("code", [
+    "!fib(~n){ ~a=0; ~b=1; *i=0..n{ ~t=a+b; ~a=b; ~b=t; }; ^a };\n~r = fib(10);",
+    "!inc(~x){^x+1};\n~s = 0;\n*i=0..10{ ~s = inc(s); };\n~r = s;",
+    "~k = 2;\n~r = 0;\n?k - 2{ ~r = 1; };\n?k{ ~r = r + k * 3; };",
+    "~k = 3;\n~r = 0;\n?k > 2{ ~r = -k * 2; };\n?!(k == 3){ ~r = 100; };",
+])
+def test_same_result(code):
+    ir, out, _ = opt(code, entry=True)
+    plain, fast = VelvetInterpreter(), VelvetInterpreter()
+    plain.run(ir)
+    fast.run(out)
+    assert plain.globals['r'] == fast.globals['r']
@@ -15,8 +15,19 @@ def test_parse_var(parser):
 
 def test_parse_expr(parser):
     ast = parser.parse("~y = 1 + 2 * 3;")
-    # RPN check: approx [1, 2, 3, *, +]
-    assert len(ast.nodes[0].expr) == 5  # Stub assertion
+    assert ast.nodes[0].expr == BinOpNode('+', '1', BinOpNode('*', '2', '3'))
+
+def test_parse_expr_tree(parser):
+    ast = parser.parse("?x>0 { f(a, -b * 2, g()); };\n~c = !(a <= b) == (1 - 2 - 3 != x);")
+    assert ast.nodes[0].cond == BinOpNode('>', 'x', '0')
+    call = ast.nodes[0].body[0].expr
+    assert call == CallNode('f', ['a', BinOpNode('*', UnaryNode('-', 'b'), '2'), CallNode('g', [])])
+    assert ast.nodes[1].expr == BinOpNode('==', UnaryNode('!', BinOpNode('<=', 'a', 'b')),
+                                          BinOpNode('!=', BinOpNode('-', BinOpNode('-', '1', '2'), '3'), 'x'))
+
+def test_parse_expr_error(parser):
+    with pytest.raises(ValueError, match="Expected expression"):
+        parser.parse("~x = 1 + ;")
 
 def test_parse_pattern_tuple(parser):
     ast = parser.parse("let (a,b) = c;")
@@ -51,3 +62,74 @@ def test_parse_macro(parser):
     ast = parser.parse("!macro inc { x + 1 };")
     assert isinstance(ast.nodes[0], MacroNode)
     assert ast.nodes[0].name == 'inc'
+
+def test_parser_reuse_resets(parser):
+    parser.parse("~x = 1;")
+    ast = parser.parse("~y = 2;")
+    assert len(ast.nodes) == 1
+    assert ast.nodes[0].name == 'y'
+
+def test_split_spans(parser):
+    code = "~x = 1;\n!f(){ ~y=2; ^y };\n"
+    spans = parser.split_spans(code)
+    assert [code[s:e].strip() for s, e in spans] == ["~x = 1;", "!f(){ ~y=2; ^y };"]
+
+def test_parse_inline_braces(parser):
+    ast = parser.parse('~x = 1;\n#java{ class A { void f() { System.out.println("}"); } } };\n~y = 2;')
+    assert [(n.lang, n.code) for n in ast.inline] == [('java', ' class A { void f() { System.out.println("}"); } } ')]
+    assert [n.name for n in ast.nodes if hasattr(n, 'name')] == ['x', 'y']
+
+def test_split_spans_inline(parser):
+    code = "~x = 1;\n#c{ puts(\"}\"); char c = '{'; };\n~y = 2;"
+    spans = parser.split_spans(code)
+    assert [code[s:e].strip() for s, e in spans] == ["~x = 1;", "#c{ puts(\"}\"); char c = '{'; };", "~y = 2;"]
+
+def test_parse_incremental_reuses_nodes(parser):
+    code = "~x = 1;\n~y = 2;\n~z = 3;\n"
+    first = parser.parse_incremental(code)
+    second = parser.parse_incremental(code.replace("~y = 2", "~y = 5"))
+    assert parser.reparsed == 1
+    assert second.nodes[0] is first.nodes[0]
+    assert second.nodes[2] is first.nodes[2]
+    assert second.nodes[1].expr == '5'
+
+def test_parse_incremental_macro_table_in_key(parser):
+    parser.macros = {'dbl': (['x'], 'x * 2')}
+    parser.parse_incremental("~a = dbl(3);")
+    parser.macros = {'dbl': (['x'], 'x * 100')}
+    ast = parser.parse_incremental("~a = dbl(3);")
+    assert parser.reparsed == 1 and ast.nodes[0].expr.right == '100'
+
+def test_parse_incremental_replays_macros(parser):
+    code = "!macro dbl(~x){ x * 2 };\n~a = dbl(3);\n~b = 1;"
+    parser.parse_incremental(code)
+    parser.macros = {}  # Fresh table each build, as in weave --watch
+    ast = parser.parse_incremental(code.replace("dbl(3)", "dbl(4)"))
+    assert parser.reparsed == 1  # Only the edited statement
+    assert type(ast.nodes[1].expr).__name__ == 'BinOpNode' and ast.nodes[1].expr.left == '4'
+    assert 'dbl' in parser.macros
+
+def test_nodes_are_slotted(parser):
+    ast = parser.parse("~x: map<int,str> = {};\n!f(~a){^a};")
+    assert not hasattr(ast.nodes[0], '__dict__')
+    assert not hasattr(ast.nodes[0].type, '__dict__')
+    assert not hasattr(ast.nodes[1], '__dict__')
+    assert ast.nodes[1].params[0].name is ast.nodes[1].return_expr  # Interned
+
+def test_macro_same_file(parser):
+    ast = parser.parse("!macro double(~x){ ^x * 2 };\n~y = double(5);")
+    assert ast.nodes[0].params == ['x']
+    assert ast.nodes[1].expr == BinOpNode('*', '5', '2')
+
+def test_macro_nested_multi_arg(parser):
+    ast = parser.parse("!macro add(~a, ~b){ a + b };\n~y = add(add(1, 2), 3) * 2;")
+    assert ast.nodes[1].expr == BinOpNode('*', BinOpNode('+', BinOpNode('+', '1', '2'), '3'), '2')
+
+def test_macro_shared_table(parser):
+    parser.parse("!macro inc { x + 1 };")
+    ast = parser.parse("~y = inc(4);")
+    assert ast.nodes[0].expr == BinOpNode('+', '4', '1')
+
+def test_macro_recursion_limit(parser):
+    with pytest.raises(ValueError, match="too deep"):
+        parser.parse("!macro loop { loop(x) };\n~y = loop(1);")
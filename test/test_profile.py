@@ -0,0 +1,45 @@
+import json
+import velvet_profile
+from velvet_parser import VelvetParser
+from velvet_ir_gen import VelvetIRGen
+from velvet_interp import VelvetInterpreter
+
+CODE = "!sq(~n){^n * n};\n!tot(~k){ ~s = 0; *i=0..k{ ~s = s + sq(i); }; ^s };\n~r = tot(50);"
+
+def test_disabled_is_noop():
+    assert velvet_profile.active is None
+    assert velvet_profile.phase('lex') is velvet_profile.NULL_PHASE
+    interp = VelvetInterpreter()
+    interp.run(VelvetIRGen(VelvetParser().parse(CODE)).generate())
+    assert interp.globals['r'] == sum(i * i for i in range(50))
+
+def test_phases_and_counts(tmp_path):
+    with velvet_profile.profiling() as prof:
+        with prof.in_module('m.vel'):
+            ir = VelvetIRGen(VelvetParser().parse(CODE)).generate()
+            interp = VelvetInterpreter()
+            interp.run(ir)
+    assert velvet_profile.active is None
+    phases = {(r['phase'], r['module']) for r in prof.summary()}
+    for name in ('lex', 'expand_macros', 'parse', 'ir_gen', 'interp_compile', 'interp_run'):
+        assert (name, 'm.vel') in phases
+    assert ('total', '<main>') in phases
+    assert prof.funcs['sq'][0] == 50 and prof.funcs['tot'][0] == 1
+    assert prof.funcs['tot'][1] >= prof.funcs['sq'][1]  # Inclusive time
+    assert prof.nodes['tot:5 var s'] == 50 and prof.nodes['tot:4 loop i'] == 1
+    assert prof.nodes['<module>:6 var r'] == 1
+    assert interp.globals['r'] == sum(i * i for i in range(50))
+
+    path = tmp_path / 'out.trace.json'
+    prof.write_trace(str(path))
+    trace = json.loads(path.read_text())
+    lex = next(e for e in trace['traceEvents'] if e['name'] == 'lex')
+    assert lex['ph'] == 'X' and lex['cat'] == 'm.vel' and lex['dur'] >= 0
+    assert trace['otherData']['functions']['sq']['calls'] == 50
+
+def test_counts_specialized_loop():
+    with velvet_profile.profiling() as prof:
+        interp = VelvetInterpreter()
+        interp.run(VelvetIRGen(VelvetParser().parse("~s = 0;\n*i=0..100{ ~s = s + i; };")).generate())
+    assert prof.nodes['<module>:3 var s'] == 100  # Not batched away by velvet_vec
+    assert interp.globals['s'] == sum(range(100))
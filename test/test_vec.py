@@ -0,0 +1,65 @@
+import pytest
+import velvet_vec
+from velvet_parser import VelvetParser
+from velvet_ir_gen import VelvetIRGen
+from velvet_interp import VelvetInterpreter, VelvetError
+from velvet_vec import analyze
+
+def ir(code):
+    return VelvetIRGen(VelvetParser().parse(code)).generate()
+
+def both(code, **globals_):
+    fast, plain = VelvetInterpreter(), VelvetInterpreter(vectorize=False)
+    for interp in (fast, plain):
+        interp.globals.update(globals_)
+        interp.run(ir(code))
+    return fast.globals, plain.globals
+
+def loop_node(code):
+    return next(n for n in ir(code)['nodes'] if n['type'] == 'loop')
+
+def test_analyze():
+    plan = analyze(loop_node("*i=0..10{ ~t = i * k; ~s = s + t - 1; ~c = c - i; };"))
+    assert plan['temps'] == {'t': ['*', 'i', 'k']}
+    assert plan['accs'] == {'s': ['-', ['*', 'i', 'k'], '1'], 'c': ['-', 'i']}
+    assert plan['invariants'] == ['k']
+
+@pytest.mark.parametrize("code", [
+    "*i=0..10{ ~s = s + t; ~t = i; };",            # Reads last iteration's t
+    "*i=0..10{ ~s = s + i; ~u = s * 2; };",        # Reads the accumulator
+    "*i=0..10{ ~s = s * 2 + i; };",
+    "*i=0..10{ ~s = i - s; };",
+    "*i=0..10{ print(i); };",
+    "*i=0..10{ ~s = s + len(i); };",
+    "*i=0..10{ ~i = i + 1; };",
+])
+def test_not_specialized(code):
+    assert analyze(loop_node(code)) is None
+
+@pytest.mark.parametrize("code,env", [
+    ("~s = 0;\n*i=0..1000{ ~s = s + i * i; };", {}),
+    ("~s = 5;\n~c = 0;\n*i=-50..70{ ~t = i * k - 3; ~s = s + t * t; ~c = c - t; };", {'k': 7}),
+    ("~s = 0;\n*i=3..3{ ~s = s + i; };", {}),
+    ("~s = 0;\n*i=0..2000{ ~s = s + i * i * i * i * i * big; };", {'big': 10 ** 12}),  # Past int64
+    ("~s = 0;\n*i=0..10{ ~s = s + i * k; };", {'k': 1.5}),  # Float: generic loop
+    ("~s = \"\";\n*i=0..3{ ~s = s + k; };", {'k': "ab"}),
+])
+def test_same_result(code, env):
+    fast, plain = both(code, **env)
+    assert fast == plain
+
+def test_without_numpy(monkeypatch):
+    monkeypatch.setattr(velvet_vec, '_np', None)
+    fast, plain = both("~s = 0;\n*i=0..5000{ ~t = i - 7; ~s = s + t * t; };")
+    assert fast == plain and fast['t'] == 4992
+
+def test_undefined_name_still_raises():
+    with pytest.raises(VelvetError):
+        VelvetInterpreter().run(ir("~s = 0;\n*i=0..10{ ~s = s + i * q; };"))
+
+def test_bounds_evaluated_once():
+    calls = []
+    interp = VelvetInterpreter(builtins={'n': lambda: calls.append(1) or 10})
+    interp.globals['k'] = 1.5
+    interp.run(ir("~s = 0;\n*i=0..n(){ ~s = s + i * k; };"))  # Falls back after evaluating bounds
+    assert calls == [1] and interp.globals['s'] == 67.5
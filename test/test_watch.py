@@ -0,0 +1,126 @@
+import os
+import json
+import pytest
+from weave.watch import WatchBuild, allowed_langs
+
+def write(root, name, code):
+    path = root / name
+    path.write_text(code)
+    return str(path)
+
+@pytest.fixture
+def project(tmp_path, monkeypatch):
+    monkeypatch.setenv('VELVET_CACHE_DIR', str(tmp_path / "cache"))
+    root = tmp_path / "proj"
+    root.mkdir()
+    return root
+
+def names(paths):
+    return sorted(os.path.basename(p) for p in paths)
+
+def test_rebuild_only_changed(project):
+    a = write(project, "a.vel", "~a = 1;\n~b = 2;\n~c = 3;")
+    write(project, "b.vel", 'import "a.vel";\n~x = a;')
+    state = WatchBuild(str(project))
+    assert names(state.start(rebuild=True)['rebuilt']) == ["a.vel", "b.vel"]
+    write(project, "a.vel", "~a = 1;\n~b = 5;\n~c = 3;")
+    report = state.rebuild(state.changed([a]))
+    assert names(report['rebuilt']) == ["a.vel"]  # b's IR doesn't read a's
+    assert report['reparsed'] == 1  # One edited statement
+    with open(project / "target" / "ir" / "a.vel.ir.json") as f:
+        assert '"5"' in f.read()
+
+def test_rebuild_expands_macros(project):
+    m = write(project, "m.vel", "!macro dbl(~x){ x * 2 };\n~a = dbl(3);")
+    state = WatchBuild(str(project), use_cache=False)
+    state.start(rebuild=True)
+    write(project, "m.vel", "!macro dbl(~x){ x * 2 };\n~a = dbl(5);")
+    report = state.rebuild(state.changed([m]))
+    assert report['reparsed'] == 1
+    with open(project / "target" / "ir" / "m.vel.ir.json") as f:
+        ir = json.load(f)
+    assert ir['nodes'][1]['expr'] == ['*', '5', '2']  # Not a call to dbl
+
+def test_touch_is_not_a_change(project):
+    a = write(project, "a.vel", "~a = 1;")
+    state = WatchBuild(str(project))
+    state.start()
+    write(project, "a.vel", "~a = 1;")
+    assert state.changed([a, str(project / "notes.txt")]) == {}
+
+def test_entry_flip_rebuilds_release_importee(project):
+    write(project, "lib.vel", "~l = 1;")
+    top = write(project, "top.vel", "~t = 2;")
+    state = WatchBuild(str(project), release=True)
+    state.start(rebuild=True)
+    write(project, "top.vel", 'import "lib.vel";\n~t = 2;')
+    report = state.rebuild(state.changed([top]))
+    assert names(report['rebuilt']) == ["lib.vel", "top.vel"]  # lib is no longer an entry module
+    assert not state.units[str(project / "lib.vel")].entry
+
+def test_delete_removes_outputs(project):
+    a = write(project, "a.vel", "~a = 1;")
+    state = WatchBuild(str(project))
+    state.start(rebuild=True)
+    out = project / "target" / "ir" / "a.vel.ir.json"
+    assert out.exists()
+    os.remove(a)
+    report = state.rebuild(state.changed([a]))
+    assert names(report['removed']) == ["a.vel"]
+    assert not out.exists() and a not in state.units
+
+def test_cycle_keeps_batch_pending(project):
+    a = write(project, "a.vel", "~a = 1;")
+    b = write(project, "b.vel", 'import "a.vel";\n~b = 1;')
+    state = WatchBuild(str(project))
+    state.start(rebuild=True)
+    write(project, "a.vel", 'import "b.vel";\n~a = 2;')
+    with pytest.raises(ValueError, match="Import cycle"):
+        state.rebuild(state.changed([a]))
+    write(project, "b.vel", "~b = 1;")
+    report = state.rebuild(state.changed([b]))
+    assert names(report['rebuilt']) == ["a.vel", "b.vel"]  # a's held-back edit is built too
+
+def test_failed_first_build_rebuilds_all(project):
+    a = write(project, "a.vel", 'import "b.vel";\n~a = 1;')
+    b = write(project, "b.vel", 'import "a.vel";\n~b = 1;')
+    write(project, "c.vel", "~c = 1;")
+    state = WatchBuild(str(project))
+    with pytest.raises(ValueError, match="Import cycle"):
+        state.start(rebuild=True)  # What watch(rebuild=True) does after the build failed
+    write(project, "b.vel", "~b = 1;")
+    report = state.rebuild(state.changed([b]))
+    assert names(report['rebuilt']) == ["a.vel", "b.vel", "c.vel"]
+    assert sorted(os.listdir(project / "target" / "ir")) == ["a.vel.ir.json", "b.vel.ir.json", "c.vel.ir.json"]
+    assert state.changed([a]) == {}
+
+def test_parse_error_builds_rest_of_batch(project):
+    a = write(project, "a.vel", "~a = 1;")
+    c = write(project, "c.vel", "~c = 1;")
+    state = WatchBuild(str(project))
+    state.start(rebuild=True)
+    write(project, "a.vel", "~a = ;")
+    write(project, "c.vel", "~c = 2;")
+    report = state.rebuild(state.changed([a, c]))
+    assert names(report['rebuilt']) == ["c.vel"] and names(report['errors']) == ["a.vel"]
+    with open(project / "target" / "ir" / "c.vel.ir.json") as f:
+        assert '"2"' in f.read()
+    write(project, "a.vel", "~a = 3;")
+    assert names(state.rebuild(state.changed([a]))['rebuilt']) == ["a.vel"]
+    assert state.pending == {}
+
+def test_inline_reruns_changed_blocks(project):
+    m = write(project, "m.vel", '~x = 1;\n#python{print("one")};\n#python{print("two")};')
+    state = WatchBuild(str(project), allow={'python'})
+    assert state.start(rebuild=True)['inline_run'] == 2
+    write(project, "m.vel", '~x = 2;\n#python{print("one")};\n#python{print("three")};')
+    report = state.rebuild(state.changed([m]))
+    assert (report['inline_run'], report['inline_reused']) == (1, 1)
+    with open(project / "target" / "inline" / "m.vel.json") as f:
+        assert [r['stdout'] for r in json.load(f)] == ["one", "three"]
+    state.close()
+
+def test_allowed_langs():
+    assert allowed_langs(['--watch', '--allow-python', '--allow-lua']) == {'python', 'lua'}
+    assert 'rust' in allowed_langs(['--allow-all'])
+    assert allowed_langs(['--release']) == set()
@@ -1,21 +1,33 @@
 import click
-from rich.console import Console
-from rich.panel import Panel
-from rich.theme import Theme
-import subprocess
-import sys
-from prompt_toolkit import PromptSession
-from prompt_toolkit.history import FileHistory
-from prompt_toolkit.auto_suggest import AutoSuggestFromHistory
-from velvet_parser import VelvetParser
-from velvet_ir_gen import VelvetIRGen
-from utils.inline_exec import InlineExecutor
-import threading
-import watchfiles
 import os
+import sys
+
+# Startup matters here: every subcommand imports what it uses inside its own
+# body (rich, prompt_toolkit, watchfiles, the compiler pipeline), and run/debug
+# execute in this process instead of spawning another interpreter.
+
+CYBER_THEME = {"run": "blue bold underline", "debug": "magenta blink", "info": "cyan", "success": "green", "error": "red"}
+_console = None
+
+def console():
+    global _console
+    if _console is None:
+        from rich.console import Console
+        from rich.theme import Theme
+        _console = Console(theme=Theme(CYBER_THEME))
+    return _console
 
-cyber_theme = Theme({"run": "blue bold underline", "debug": "magenta blink", "info": "cyan", "success": "green", "error": "red"})
-console = Console(theme=cyber_theme)
+def say(message, style):
+    from rich.panel import Panel
+    console().print(Panel(message, style=style))
+
+def read_source(path):
+    try:
+        with open(path) as f:
+            return f.read()
+    except OSError as e:
+        say(f"Cannot read {path}: {e.strerror}", "error")
+        sys.exit(1)
 
 @click.group()
 def cli():
@@ -23,81 +35,185 @@ def cli():
 
 @cli.command()
 @click.argument('project')
-def run(project):
-    console.print(Panel(f"Running {project} in cyber mode...", style="run"))
+@click.option('--no-cache', is_flag=True, help="Re-parse even if a cached AST/IR exists")
+def run(project, no_cache):
+    say(f"Running {project} in cyber mode...", "run")
+    from velvet_cache import VelvetCache
+    from velvet_parser import VelvetParser
+    from velvet_interp import VelvetInterpreter, VelvetError
     # Interpret .weave or .vel
-    subprocess.run([sys.executable, "src/velvet_parser.py", project, "--exec"])
-    console.print(Panel("Execution complete.", style="success"))
+    code = read_source(project)
+    cache = VelvetCache(enabled=not no_cache)
+    interpreter = VelvetInterpreter()
+    try:
+        _, ir = cache.compile(code, VelvetParser())
+        interpreter.run(ir)
+    except (VelvetError, ValueError) as e:
+        say(f"{project}: {e}", "error")
+        sys.exit(1)
+    finally:
+        interpreter.close()
+        cache.record()
+    say("Execution complete.", "success")
 
 @cli.command()
 @click.argument('project')
 def debug(project):
-    console.print(Panel(f"Debug {project}: Neon traces...", style="debug"))
-    # Enhanced: Step-through, vars dump
-    subprocess.run([sys.executable, "src/utils/inline_exec.py", "--allow-all", project])
-    # Add Rich live display
+    say(f"Debug {project}: Neon traces...", "debug")
+    from rich.table import Table
+    from velvet_parser import VelvetParser
+    from velvet_ir_gen import VelvetIRGen
+    from velvet_interp import VelvetInterpreter, VelvetError
+    from utils.inline_exec import InlineExecutor
+    code = read_source(project)
+    executor = InlineExecutor()
+    executor.allow_langs |= executor.supported_langs  # Debug runs every inline block
+    interpreter = VelvetInterpreter()
+    try:
+        ir = VelvetIRGen(VelvetParser().parse(code)).generate()
+        executor.execute([(i['lang'], i['code']) for i in ir['inline']], project)
+        interpreter.run(ir)
+    except (VelvetError, ValueError) as e:
+        say(f"{project}: {e}", "error")
+        sys.exit(1)
+    finally:
+        executor.close()
+        interpreter.close()
+    # Vars dump
+    table = Table(title=f"{project} globals")
+    table.add_column("name", style="cyan")
+    table.add_column("value")
+    for name, value in interpreter.globals.items():
+        table.add_row(name, repr(value))
+    console().print(table)
+
+@cli.command()
+@click.argument('file')
+@click.option('--trace', 'trace_path', default=None, help="Chrome trace output (default: <file>.trace.json)")
+@click.option('--allow', multiple=True, help="Run inline blocks of this language (repeatable)")
+@click.option('--top', default=10, help="Rows per function/node table")
+def profile(file, trace_path, allow, top):
+    import velvet_profile
+    from velvet_parser import VelvetParser
+    from velvet_ir_gen import VelvetIRGen
+    from velvet_interp import VelvetInterpreter
+    from utils.inline_exec import InlineExecutor
+    executor = InlineExecutor()
+    executor.allow_langs.update(allow)
+    interpreter = VelvetInterpreter()
+    loaded = set()
+
+    def load(path):
+        # Imports first, each profiled as its own module
+        path = os.path.normpath(path)
+        if path in loaded or not os.path.exists(path):
+            return
+        loaded.add(path)
+        with open(path) as f:
+            code = f.read()
+        with prof.in_module(path):
+            ir = VelvetIRGen(VelvetParser().parse(code)).generate()
+        for dep in ir['imports']:
+            load(os.path.join(os.path.dirname(path), dep))
+        with prof.in_module(path):
+            executor.execute([(i['lang'], i['code']) for i in ir['inline']], path)
+            interpreter.run(ir)
+
+    with velvet_profile.profiling() as prof:
+        try:
+            load(file)
+        finally:
+            executor.close()
+            interpreter.close()
+    trace_path = trace_path or f"{file}.trace.json"
+    prof.write_trace(trace_path)
+    console().print(prof.table(top))
+    say(f"Trace written to {trace_path} (open in chrome://tracing or ui.perfetto.dev)", "success")
+
+@cli.command()
+@click.option('--clear', is_flag=True, help="Remove all cached entries")
+def cache(clear):
+    from velvet_cache import VelvetCache
+    store = VelvetCache()
+    if clear:
+        store.clear()
+        say(f"Cleared {store.root}", "success")
+        return
+    stats = store.stats()
+    totals = store.record() or {}
+    say(f"{stats['entries']} entries, {stats['bytes'] / 1024:.1f} KiB in {store.root}\n"
+        f"hits {totals.get('hits', 0)}, misses {totals.get('misses', 0)}, evictions {totals.get('evictions', 0)}, "
+        f"saved {totals.get('saved_seconds', 0):.2f}s", "info")
 
 @cli.command()
 def update():
-    console.print(Panel("Updating libs via weave...", style="info"))
+    import subprocess
+    say("Updating libs via weave...", "info")
     subprocess.run(["cargo", "run", "--", "update"])
 
 @cli.command()
-def repl():
-    console.print(Panel("Velvet REPL (cyberpunk mode)...", style="run"))
+@click.option('--no-cache', is_flag=True, help="Always re-parse loaded modules")
+def repl(no_cache):
+    import threading
+    import watchfiles
+    from prompt_toolkit import PromptSession
+    from prompt_toolkit.history import FileHistory
+    from prompt_toolkit.auto_suggest import AutoSuggestFromHistory
+    from velvet_parser import VelvetParser
+    from velvet_ir_gen import VelvetIRGen
+    from velvet_cache import VelvetCache
+    from velvet_interp import VelvetInterpreter
+    from utils.inline_exec import InlineExecutor
+    from weave.loader import ModuleLoader
+    say("Velvet REPL (cyberpunk mode)...", "run")
     session = PromptSession(history=FileHistory('.velvet_history'))
     executor = InlineExecutor()
+    executor.warm_pool_size = 1  # Keep interpreters warm between REPL lines
     parser = VelvetParser()
     ir_gen = VelvetIRGen  # Class reference
-    modules = {}  # path: ast
+    store = VelvetCache(enabled=not no_cache)
+    interpreter = VelvetInterpreter()  # Globals persist across REPL lines
+    loader = ModuleLoader(interpreter.run, cache=store, macros=parser.macros)  # Imported macros reach REPL lines
+    grown = threading.Event()  # Set when the loaded module set grows; restarts the watcher
+    done = threading.Event()
 
     def interpret(ast):
         ir = ir_gen(ast).generate()
         inline_results = executor.execute([(i['lang'], i['code']) for i in ir['inline']], "repl.vel")
-        env = {}  # Stub env for vars/funcs
-        for node in ir['nodes']:
-            if node['type'] == 'var':
-                env[node['name']] = node['expr']  # Eval stub
-            elif node['type'] == 'func':
-                # Call stub
-                pass
-            elif node['type'] == 'match':
-                # Eval match
-                pass
-            elif node['type'] == 'if':
-                # Eval cond
-                pass
-            elif node['type'] == 'loop':
-                # Loop exec
-                pass
-            elif node['type'] == 'pattern':
-                # Destruct
-                pass
-            # Async: Thread stub
-            if 'async' in node and node['async']:
-                # Threading.thread
-                pass
-        return f"Executed with inline results: {inline_results}"
+        value = interpreter.run(ir)
+        if inline_results:
+            return f"{value} (inline results: {inline_results})"
+        return str(value)
 
     def load_module(path):
-        if not os.path.exists(path):
-            console.print(Panel(f"Module {path} not found", style="error"))
-            return None
-        with open(path, 'r') as f:
-            code = f.read()
-        ast = parser.parse(code)
-        modules[path] = ast
-        console.print(Panel(f"Loaded module {path}", style="success"))
-        return ast
+        ran = loader.load(path)
+        grown.set()
+        if not ran:
+            say(f"Module {path} already loaded", "info")
+        else:
+            say(f"Loaded module {path}" + (f" (+{len(ran) - 1} imports)" if len(ran) > 1 else ""), "success")
 
     def watch_modules():
-        for changes in watchfiles.watch(*modules.keys()):
-            for change_type, changed_path in changes:
-                if change_type == watchfiles.Change.modified:
-                    load_module(changed_path)
-                    console.print(Panel(f"Reloaded {changed_path}", style="info"))
+        # Watch the directories of loaded modules; reload changed ones and their dependents
+        def loaded(change, path):
+            return change != watchfiles.Change.deleted and path in loader.modules
+        while not done.is_set():
+            dirs = loader.watch_dirs()
+            if not dirs:
+                grown.wait()
+            else:
+                for changes in watchfiles.watch(*dirs, watch_filter=loaded, stop_event=grown):
+                    try:
+                        ran = loader.reload(path for _, path in changes)
+                    except Exception as e:
+                        say(f"Reload failed: {e}", "error")
+                        continue
+                    if ran:
+                        say(f"Reloaded {', '.join(os.path.relpath(p) for p in ran)}", "info")
+            grown.clear()
 
-    threading.Thread(target=watch_modules, daemon=True).start()
+    watcher = threading.Thread(target=watch_modules, daemon=True)
+    watcher.start()
 
     while True:
         try:
@@ -107,11 +223,18 @@ def repl():
                 path = code.split(maxsplit=1)[1].strip('"')
                 load_module(path)
                 continue
-            ast = parser.parse(code)
-            result = interpret(ast)
-            console.print(Panel(result, style="success"))
+            with loader.lock:  # Not while a reload is re-running modules
+                ast = parser.parse(code)
+                result = interpret(ast)
+            say(result, "success")
         except Exception as e:
-            console.print(Panel(str(e), style="error"))
+            say(str(e), "error")
+    done.set()
+    grown.set()  # Stops a running watch
+    watcher.join(1)
+    store.record()
+    executor.close()
+    interpreter.close()
 
 if __name__ == '__main__':
     cli()
@@ -0,0 +1,221 @@
+import os
+import gc
+import sys
+import json
+import time
+import platform
+from typing import Callable, Dict, List, Optional
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if os.path.join(ROOT, 'src') not in sys.path:
+    sys.path[:0] = [ROOT, os.path.join(ROOT, 'src')]
+from velvet_lexer import VelvetLexer
+from velvet_macros import MacroExpander
+from velvet_parser import VelvetParser
+from velvet_ir_gen import VelvetIRGen
+from velvet_interp import VelvetInterpreter
+
+# weave bench: synthetic .vel corpora through each pipeline phase.
+#   weave bench [project] [--shapes=nesting,macros] [--size=256] [--runs=15] [--warmup=3]
+#               [--out=bench.json] [--baseline=old.json] [--threshold=0.10]
+# --size is KB of source per shape; a project dir/file adds its .vel files as
+# the `project` corpus. With --baseline the run fails (exit 1) when a phase's
+# median is more than threshold slower than the stored one.
+
+def unit_nesting(i: int, depth: int = 8) -> str:
+    # Alternating ifs and 2-step loops, `depth` levels deep
+    inner = f"~z{i} = n{i} + {i};"
+    for k in reversed(range(depth)):
+        inner = f"?n{i} + {k} > 0{{ {inner} }};" if k % 2 == 0 else f"*j{k}=0..2{{ {inner} }};"
+    return f"~n{i} = {i % 7 + 1};\n{inner}\n"
+
+MACROS = 50
+
+def macro_defs(count: int = MACROS) -> str:
+    return ''.join(f"!macro m{k}(~x){{ x * {k % 9 + 1} }};\n" for k in range(count))
+
+def unit_macros(i: int, count: int = MACROS) -> str:
+    return f"~v{i} = m{i % count}(m{(i + 1) % count}({i})) + 1;\n"
+
+def unit_inline(i: int) -> str:
+    langs = ('python', 'shell', 'javascript', 'ruby')
+    return f"~x{i} = {i} * 2;\n#{langs[i % 4]}{{ print({i}) }};\n"
+
+def unit_match(i: int, width: int = 64) -> str:
+    arms = ', '.join(f'"s{k}" => ~r{i} = {k}' for k in range(width))
+    return f'~s{i} = "s{i % (width + 1)}";\nmatch s{i} {{ {arms}, _ => ~r{i} = -1 }};\n'
+
+SHAPES: Dict[str, Callable[[int], str]] = {
+    'nesting': unit_nesting,
+    'macros': unit_macros,
+    'inline': unit_inline,
+    'match': unit_match,
+}
+
+def gen_corpus(shape: str, size_kb: float) -> str:
+    if shape == 'mixed':
+        per = size_kb / len(SHAPES)
+        return ''.join(gen_corpus(s, per) for s in SHAPES)
+    unit, target = SHAPES[shape], int(size_kb * 1024)
+    parts, size, i = [], 0, 0
+    if shape == 'macros':
+        parts = [macro_defs()]  # Definitions first so every use sees them
+        size = len(parts[0])
+    while size < target:
+        part = unit(i)
+        parts.append(part)
+        size += len(part)
+        i += 1
+    return ''.join(parts)
+
+def project_corpus(path: str) -> List[str]:
+    # One source per file: deps and imports only parse at the top of a file
+    if os.path.isfile(path):
+        with open(path) as f:
+            return [f.read()]
+    parts = []
+    for dirpath, dirnames, filenames in os.walk(path):
+        dirnames[:] = sorted(d for d in dirnames if not d.startswith('.'))
+        for name in sorted(filenames):
+            if name.endswith('.vel'):
+                with open(os.path.join(dirpath, name)) as f:
+                    parts.append(f.read())
+    return parts
+
+def percentile(samples: List[float], pct: float) -> float:
+    # Nearest-rank
+    ordered = sorted(samples)
+    rank = max(1, -(-len(ordered) * pct // 100))
+    return ordered[int(rank) - 1]
+
+def measure(fn: Callable, runs: int, warmup: int) -> List[float]:
+    for _ in range(warmup):
+        fn()
+    samples = []
+    for _ in range(runs):
+        gc.collect()
+        gc.disable()  # Keep collector pauses out of the timed region
+        try:
+            start = time.perf_counter()
+            fn()
+            samples.append(time.perf_counter() - start)
+        finally:
+            gc.enable()
+    return samples
+
+def stats(samples: List[float], size: int) -> Dict:
+    med = percentile(samples, 50)
+    return {
+        'median_ms': med * 1e3,
+        'p95_ms': percentile(samples, 95) * 1e3,
+        'min_ms': min(samples) * 1e3,
+        'mean_ms': sum(samples) / len(samples) * 1e3,
+        'runs': len(samples),
+        'mb_s': size / med / 1e6 if med else None,
+    }
+
+def bench_corpus(sources: List[str], runs: int, warmup: int) -> Dict[str, Dict]:
+    lexer = VelvetLexer()
+    quiet = {'print': lambda *args: None}
+    size = sum(len(code.encode()) for code in sources)
+    results = {}
+    try:
+        streams = [lexer.lex_stream(code) for code in sources]
+        asts = [VelvetParser().parse(code) for code in sources]  # Inputs for the later phases, built once
+        irs = [VelvetIRGen(ast).generate() for ast in asts]
+    except Exception as e:
+        return {'parse': {'error': f"{type(e).__name__}: {e}"}}
+    phases = {
+        'lex': lambda: [lexer.lex_stream(code) for code in sources],
+        'expand_macros': lambda: [MacroExpander(lexer, {}).expand(stream) for stream in streams],
+        'parse': lambda: [VelvetParser().parse(code) for code in sources],  # Whole front end: lex + expand + parse
+        'ir_gen': lambda: [VelvetIRGen(ast).generate() for ast in asts],
+        # Compile + run; inline blocks are not executed
+        'exec': lambda: [VelvetInterpreter(builtins=quiet).run(ir) for ir in irs],
+    }
+    for name, fn in phases.items():
+        try:
+            results[name] = stats(measure(fn, runs, warmup), size)
+        except Exception as e:  # A project corpus may not run standalone
+            results[name] = {'error': f"{type(e).__name__}: {e}"}
+    return results
+
+def run_suite(shapes: List[str], size_kb: float, runs: int, warmup: int, project: Optional[str] = None) -> Dict:
+    corpora = {shape: [gen_corpus(shape, size_kb)] for shape in shapes}
+    if project:
+        corpora['project'] = project_corpus(project)
+    results = {}
+    for name, sources in corpora.items():
+        for phase, row in bench_corpus(sources, runs, warmup).items():
+            results[f"{name}/{phase}"] = dict(row, bytes=sum(len(code.encode()) for code in sources))
+    return {
+        'meta': {
+            'python': platform.python_version(), 'platform': platform.platform(),
+            'size_kb': size_kb, 'runs': runs, 'warmup': warmup, 'shapes': list(corpora),
+            'time': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        },
+        'results': results,
+    }
+
+def compare(current: Dict, baseline: Dict, threshold: float) -> List[Dict]:
+    # Median ratio per phase present in both runs; regressed past 1 + threshold
+    rows = []
+    for key, row in current['results'].items():
+        old = baseline['results'].get(key)
+        if 'error' in row or not (old or {}).get('median_ms'):
+            continue
+        ratio = row['median_ms'] / old['median_ms']
+        rows.append({'phase': key, 'baseline_ms': old['median_ms'], 'median_ms': row['median_ms'],
+                     'ratio': ratio, 'regressed': ratio > 1 + threshold})
+    return rows
+
+def main(project: Optional[str] = None, flags: List[str] = ()) -> int:
+    from rich.console import Console
+    from rich.table import Table
+    opts = dict(f[2:].split('=', 1) for f in flags if f.startswith('--') and '=' in f)
+    shapes = opts.get('shapes', ','.join(SHAPES)).split(',')
+    unknown = [s for s in shapes if s not in SHAPES and s != 'mixed']
+    console = Console()
+    if unknown:
+        console.print(f"[red]Unknown corpus shape(s): {', '.join(unknown)} (have {', '.join(SHAPES)}, mixed)")
+        return 2
+    report = run_suite(shapes, float(opts.get('size', 256)), int(opts.get('runs', 15)),
+                       int(opts.get('warmup', 3)), project)
+    table = Table(title=f"weave bench ({report['meta']['size_kb']:g} KB/shape, {report['meta']['runs']} runs)")
+    for col in ('corpus/phase', 'median ms', 'p95 ms', 'MB/s'):
+        table.add_column(col, justify='left' if col == 'corpus/phase' else 'right')
+    for key, row in report['results'].items():
+        if 'error' in row:
+            table.add_row(key, '-', '-', f"[red]{row['error']}")
+            continue
+        table.add_row(key, f"{row['median_ms']:.2f}", f"{row['p95_ms']:.2f}", f"{row['mb_s']:.2f}" if row['mb_s'] else '-')
+    console.print(table)
+    out = opts.get('out', 'bench.json')
+    with open(out, 'w') as f:
+        json.dump(report, f, indent=2)
+    console.print(f"Results written to {out}")
+    if 'baseline' not in opts:
+        return 0
+    with open(opts['baseline']) as f:
+        baseline = json.load(f)
+    if baseline.get('meta', {}).get('size_kb') != report['meta']['size_kb']:
+        console.print(f"[yellow]Baseline used --size={baseline.get('meta', {}).get('size_kb')}; timings are not comparable")
+    threshold = float(opts.get('threshold', 0.10))
+    rows = compare(report, baseline, threshold)
+    diff = Table(title=f"vs {opts['baseline']} (fail above +{threshold:.0%})")
+    for col in ('corpus/phase', 'baseline ms', 'median ms', 'change'):
+        diff.add_column(col, justify='left' if col == 'corpus/phase' else 'right')
+    for r in rows:
+        change = f"{(r['ratio'] - 1) * 100:+.1f}%"
+        diff.add_row(r['phase'], f"{r['baseline_ms']:.2f}", f"{r['median_ms']:.2f}",
+                     f"[red]{change}[/red]" if r['regressed'] else change)
+    console.print(diff)
+    regressed = [r['phase'] for r in rows if r['regressed']]
+    if regressed:
+        console.print(f"[red]Regressed: {', '.join(regressed)}")
+        return 1
+    return 0
+
+if __name__ == '__main__':
+    args = sys.argv[1:]
+    sys.exit(main(next((a for a in args if not a.startswith('--')), None), [a for a in args if a.startswith('--')]))
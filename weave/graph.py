@@ -0,0 +1,84 @@
+import os
+import re
+from typing import Dict, List, Set, Tuple
+
+# Header of a .vel file: imports, <deps> and '@ ' comment lines, in any order
+HEADER_RE = re.compile(r'\s*(?:import\s+"([^"]*)"\s*;|<([\w\-]+)>|@(?!\w)[^\n]*)')
+SKIP_DIRS = {'target', 'node_modules', '__pycache__', 'weave-library'}
+
+def scan_header(code: str) -> Tuple[List[str], List[str]]:
+    # Cheap import/dep scan without lexing the whole file
+    imports, deps = [], []
+    pos = 0
+    while True:
+        m = HEADER_RE.match(code, pos)
+        if not m or m.end() == pos:
+            break
+        if m.group(1) is not None:
+            imports.append(m.group(1))
+        elif m.group(2):
+            deps.append(m.group(2))
+        pos = m.end()
+    return imports, deps
+
+class ModuleGraph:
+    def __init__(self, root: str = '.'):
+        self.root = os.path.abspath(root)
+        self.edges: Dict[str, Set[str]] = {}  # module path: paths it depends on
+
+    def discover(self) -> List[str]:
+        found = []
+        for dirpath, dirnames, filenames in os.walk(self.root):
+            dirnames[:] = sorted(d for d in dirnames if not d.startswith(('.', 'tmp_inline_')) and d not in SKIP_DIRS)
+            found.extend(os.path.join(dirpath, f) for f in sorted(filenames) if f.endswith('.vel'))
+        for path in found:
+            self.add(path)
+        return found
+
+    def add(self, path: str, code: str = None) -> Set[str]:
+        if code is None:
+            with open(path, 'r') as f:
+                code = f.read()
+        imports, deps = scan_header(code)
+        edges = set()
+        for name in imports + deps:
+            dep = self.resolve(path, name)
+            if dep is not None:
+                edges.add(dep)
+        self.edges[path] = edges
+        return edges
+
+    def resolve(self, path: str, name: str):
+        # import "x" / "x.vel" is relative to the importer; <dep> matches a project module
+        name = name if name.endswith('.vel') else name + '.vel'
+        for base in (os.path.dirname(path), self.root):
+            candidate = os.path.normpath(os.path.join(base, name))
+            if os.path.exists(candidate):
+                return candidate
+        return None  # External library dep
+
+    def waves(self, only: Set[str] = None) -> List[List[str]]:
+        # Kahn layering: each wave depends only on earlier waves
+        nodes = set(self.edges) if only is None else set(only)
+        pending = {m: {d for d in self.edges.get(m, ()) if d in nodes} for m in nodes}
+        waves = []
+        while pending:
+            ready = sorted(m for m, deps in pending.items() if not deps)
+            if not ready:
+                raise ValueError(f"Import cycle: {' -> '.join(self.find_cycle(pending))}")
+            waves.append(ready)
+            for m in ready:
+                del pending[m]
+            for deps in pending.values():
+                deps.difference_update(ready)
+        return waves
+
+    def find_cycle(self, pending: Dict[str, Set[str]]) -> List[str]:
+        path, seen = [], set()
+        node = next(iter(sorted(pending)))
+        while node not in seen:
+            seen.add(node)
+            path.append(node)
+            node = sorted(pending[node])[0]
+        cycle = path[path.index(node):] + [node]
+        return [os.path.relpath(p, self.root) for p in cycle]
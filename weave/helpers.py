@@ -1,6 +1,9 @@
-def expand_macros(code: str, macros: Dict[str, str]) -> str:
-    # Simple text-based expansion (replace macro calls with body)
-    for name, body in macros.items():
-        # Stub: Assume macro like inc(x) -> body with x replaced
-        code = re.sub(rf'{name}\((.*?)\)', lambda m: body.replace('~x', m.group(1)), code)
-    return code
+from typing import Dict, List, Tuple
+
+def expand_macros(code: str, macros: Dict[str, Tuple[List[str], str]]) -> str:
+    # Text-level view of the token expander (VelvetParser expands tokens directly)
+    from velvet_lexer import VelvetLexer
+    from velvet_macros import MacroExpander
+    lexer = VelvetLexer()
+    stream = MacroExpander(lexer, macros).expand(lexer.lex_stream(code))
+    return ' '.join(value for _, value in stream)
@@ -0,0 +1,201 @@
+import os
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Iterable, List, Optional, Set
+from weave.graph import ModuleGraph, scan_header
+
+# Module loader for long-lived sessions (vel repl), on the same ModuleGraph
+# weave build uses. load(path) pulls in the path's imports transitively:
+# headers are scanned first to build the graph, the new modules are layered
+# into waves (which rejects cycles), each wave parses on a thread pool, and
+# then every module runs once, dependencies first. reload(paths) reparses
+# only modules whose source changed, then re-runs them and everything that
+# imports them. Dependents are reparsed too when a changed module's macros
+# change, since their expansion depends on them.
+#
+# The velvet_* modules (src/) must be importable by the caller.
+
+class Module:
+    __slots__ = ('path', 'code', 'ast', 'ir', 'uses', 'macros')
+
+    def __init__(self, path: str, code: str, ast, ir: Dict, uses: Dict, macros: Dict):
+        self.path = path
+        self.code = code
+        self.ast = ast
+        self.ir = ir
+        self.uses = uses  # Macro table the module was parsed with
+        self.macros = macros  # uses + the module's own definitions; what importers see
+
+class ModuleLoader:
+    def __init__(self, run: Callable[[Dict], object], root: str = '.', cache=None,
+                 macros: Optional[Dict] = None, jobs: Optional[int] = None):
+        self.graph = ModuleGraph(root)
+        self.run = run  # Executes one module's IR in the session
+        self.cache = cache  # VelvetCache or None
+        self.macros = {} if macros is None else macros  # Session table; loaded modules' macros merge in
+        self.jobs = jobs or min(8, os.cpu_count() or 1)
+        self.modules: Dict[str, Module] = {}
+        self.parsers = {}  # path: VelvetParser holding that module's span cache
+        self.lock = threading.RLock()  # Held while loading/running; share it with other users of `run`
+        self.parsed = 0  # Modules actually parsed (cache misses), for reports and tests
+        self.count_lock = threading.Lock()
+
+    def load(self, path: str) -> List[str]:
+        # -> paths run, in order; [] if already loaded
+        path = os.path.abspath(path)
+        with self.lock:
+            if path in self.modules:
+                return []
+            edges = dict(self.graph.edges)
+            try:
+                fresh = self.discover([path], {})
+                waves = self.graph.waves(set(fresh))
+                built = self.compile(waves, fresh)
+            except BaseException:
+                self.graph.edges = edges
+                raise
+            return self.execute([p for wave in waves for p in wave], built, edges)
+
+    def reload(self, paths: Iterable[str]) -> List[str]:
+        # -> paths re-run, in order; unchanged, unknown and deleted files are skipped
+        with self.lock:
+            changed = {}
+            for path in {os.path.abspath(p) for p in paths}:
+                mod = self.modules.get(path)
+                if mod is None:
+                    continue
+                try:
+                    code = self.read(path)
+                except ValueError:
+                    continue  # Deleted or mid-save; keep the loaded version
+                if code != mod.code:
+                    changed[path] = code
+            if not changed:
+                return []
+            edges = dict(self.graph.edges)
+            try:
+                fresh = self.discover(list(changed), changed)
+                waves = self.graph.waves(self.dependents(changed) | set(fresh))
+                built = self.compile(waves, fresh)
+            except BaseException:
+                self.graph.edges = edges
+                raise
+            return self.execute([p for wave in waves for p in wave], built, edges)
+
+    def dependents(self, paths: Iterable[str]) -> Set[str]:
+        # paths plus every loaded module importing one of them, transitively
+        users: Dict[str, Set[str]] = {}
+        for mod, deps in self.graph.edges.items():
+            for dep in deps:
+                users.setdefault(dep, set()).add(mod)
+        found, stack = set(), list(paths)
+        while stack:
+            path = stack.pop()
+            if path not in found:
+                found.add(path)
+                stack.extend(users.get(path, ()))
+        return found
+
+    def watch_dirs(self) -> List[str]:
+        with self.lock:
+            return sorted({os.path.dirname(p) for p in self.modules})
+
+    # Steps
+
+    def read(self, path: str) -> str:
+        try:
+            with open(path, 'r') as f:
+                return f.read()
+        except OSError:
+            raise ValueError(f"Module {os.path.relpath(path)} not found") from None
+
+    def discover(self, paths: List[str], sources: Dict[str, str]) -> Dict[str, str]:
+        # New or changed modules reachable from paths: {path: source}; updates graph edges
+        fresh, stack = {}, list(paths)
+        while stack:
+            path = stack.pop()
+            if path in fresh or (path in self.modules and path not in sources):
+                continue
+            code = sources[path] if path in sources else self.read(path)
+            fresh[path] = code
+            imports, deps = scan_header(code)
+            edges = set()
+            for name in imports + deps:
+                dep = self.graph.resolve(path, name)
+                if dep is None and name in imports:
+                    raise ValueError(f"Module {name} not found (imported by {os.path.relpath(path)})")
+                if dep is not None:
+                    edges.add(os.path.abspath(dep))
+            self.graph.edges[path] = edges
+            stack.extend(edges)
+        return fresh
+
+    def visible(self, path: str, built: Dict[str, Module]) -> Dict:
+        # Session macros plus whatever the module's imports define. The module's
+        # own macros were merged into the session when it ran; they are left
+        # out so its uses stay stable across reloads.
+        macros = dict(self.macros)
+        old = self.modules.get(path)
+        if old is not None:
+            for name, macro in old.macros.items():
+                if old.uses.get(name) != macro and macros.get(name) == macro:
+                    del macros[name]
+        for dep in sorted(self.graph.edges[path]):
+            mod = built.get(dep) or self.modules[dep]
+            macros.update(mod.macros)
+        return macros
+
+    def compile(self, waves: List[List[str]], fresh: Dict[str, str]) -> Dict[str, Module]:
+        from velvet_parser import VelvetParser
+        built: Dict[str, Module] = {}
+        with ThreadPoolExecutor(max_workers=self.jobs) as pool:
+            for wave in waves:
+                jobs = []
+                for path in wave:
+                    uses = self.visible(path, built)
+                    old = self.modules.get(path)
+                    if path in fresh or old.uses != uses:
+                        self.parsers.setdefault(path, VelvetParser())
+                        jobs.append((path, fresh[path] if path in fresh else old.code, uses))
+                for mod in pool.map(lambda job: self.compile_one(*job), jobs):
+                    built[mod.path] = mod
+        return built
+
+    def compile_one(self, path: str, code: str, uses: Dict) -> Module:
+        from velvet_ast import MacroNode
+        from velvet_ir_gen import VelvetIRGen
+        key = self.cache.key(code, uses) if self.cache is not None else None
+        cached = self.cache.get(key) if key is not None else None
+        if cached is not None:
+            ast, ir = cached
+        else:
+            start = time.perf_counter()
+            parser = self.parsers[path]
+            parser.macros = dict(uses)  # Part of each span's cache key
+            ast = parser.parse_incremental(code)  # Only edited statements reparse on reload
+            ir = VelvetIRGen(ast).generate()
+            if key is not None:
+                self.cache.put(key, ast, ir, time.perf_counter() - start)
+            with self.count_lock:
+                self.parsed += 1
+        own = {n.name: (n.params, n.body) for n in ast.nodes if isinstance(n, MacroNode)}
+        return Module(path, code, ast, ir, uses, dict(uses, **own))
+
+    def execute(self, order: List[str], built: Dict[str, Module], edges: Dict[str, Set[str]]) -> List[str]:
+        # A module counts as loaded only once it has run; on an error the
+        # failed and unrun modules keep their previous state (or stay unloaded)
+        for n, path in enumerate(order):
+            mod = built.get(path) or self.modules[path]
+            try:
+                self.run(mod.ir)
+            except BaseException:
+                for p in order[n:]:
+                    if p in edges:
+                        self.graph.edges[p] = edges[p]
+                    else:
+                        self.graph.edges.pop(p, None)
+                raise
+            self.modules[path] = mod
+            self.macros.update(mod.macros)
+        return order
@@ -1,10 +1,18 @@
+import os
 import sys
+import json
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
 from rich.console import Console
 from rich.theme import Theme
 from rich.panel import Panel
 from rich.progress import Progress
 import subprocess  # Call Rust/Zig
 
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path[:0] = [ROOT, os.path.join(ROOT, 'src')]  # velvet_* modules for build workers
+from weave.graph import ModuleGraph
+
 cyber_theme = Theme({
     "info": "cyan blink",
     "warning": "magenta",
@@ -14,32 +22,132 @@ cyber_theme = Theme({
 
 console = Console(theme=cyber_theme)
 
+def build_module(path, root, out_dir, use_cache=True, release=False, entry=False, ir_format='json', targets=None):
+    # Process-pool worker: parse + IR (+ optimization passes) for one module, written to out_dir
+    from velvet_parser import VelvetParser
+    from velvet_cache import VelvetCache
+    from velvet_ir_gen import write_ir
+    start = time.perf_counter()
+    with open(path, 'r') as f:
+        code = f.read()
+    cache = VelvetCache(enabled=use_cache)
+    _, ir = cache.compile(code, VelvetParser(), targets=targets)
+    cache.record()
+    report = []
+    if release:
+        from velvet_opt import PassManager
+        pm = PassManager(entry=entry)
+        ir = pm.run(ir)
+        report = pm.report
+    out = os.path.join(out_dir, os.path.relpath(path, root) + '.ir')
+    os.makedirs(os.path.dirname(out), exist_ok=True)
+    write_ir(ir, out, ir_format)
+    return path, time.perf_counter() - start, report
+
+def get_ir_format(flags):
+    # --ir=json|bin|both: target/ir/<module>.ir.json and/or .ir.bin
+    for flag in flags:
+        if flag.startswith('--ir='):
+            return flag.split('=', 1)[1]
+    return 'json'
+
+def get_targets(flags):
+    # --targets=rust,zig: only emit type mappings for these backends (default: all)
+    for flag in flags:
+        if flag.startswith('--targets='):
+            return [t for t in flag.split('=', 1)[1].split(',') if t]
+    return None
+
+def get_jobs(flags):
+    for flag in flags:
+        if flag.startswith('--jobs='):
+            return int(flag.split('=', 1)[1])
+    return os.cpu_count() or 1
+
+def merge_reports(totals, report):
+    # Sum per-pass timings and node/token counts across modules
+    for i, r in enumerate(report):
+        if i == len(totals):
+            totals.append({'pass': r['pass'], 'ms': 0.0, 'nodes': [0, 0], 'terms': [0, 0]})
+        t = totals[i]
+        t['ms'] += r['ms']
+        for key in ('nodes', 'terms'):
+            t[key][0] += r[key][0]
+            t[key][1] += r[key][1]
+    return totals
+
+def compile_modules(root, flags, progress):
+    # Parse/IR every module in topological waves; modules in a wave run in parallel
+    graph = ModuleGraph(root)
+    modules = graph.discover()
+    waves = graph.waves()
+    out_dir = os.path.join(graph.root, 'target', 'ir')
+    task = progress.add_task("[cyan]Parsing modules...", total=len(modules))
+    use_cache = '--no-cache' not in flags
+    release = '--release' in flags
+    ir_format = get_ir_format(flags)
+    targets = get_targets(flags)
+    imported = set().union(*graph.edges.values()) if graph.edges else set()
+    reports = []
+    with ProcessPoolExecutor(max_workers=get_jobs(flags)) as pool:
+        for wave in waves:
+            futures = [pool.submit(build_module, path, graph.root, out_dir, use_cache, release,
+                                   path not in imported, ir_format, targets)
+                       for path in wave]
+            for future in as_completed(futures):
+                path, _, report = future.result()
+                merge_reports(reports, report)
+                progress.update(task, advance=1, description=f"[cyan]{os.path.relpath(path, graph.root)}")
+    return len(modules), len(waves), reports
+
 def build(project_name=None, flags=[]):
+    root = project_name if project_name and os.path.isdir(project_name) else '.'
     with Progress() as progress:
-        task = progress.add_task("[cyan]Weaving...", total=100)
-        # Simulate steps
-        progress.update(task, advance=20)
         console.print(Panel("Parsing .vel files...", style="info"))
-        # Call velvet_parser.py
-        subprocess.run(["python", "src/velvet_parser.py"])
-        progress.update(task, advance=30)
+        start = time.perf_counter()
+        try:
+            count, waves, reports = compile_modules(root, flags, progress)
+        except ValueError as e:
+            console.print(Panel(str(e), style="danger"))
+            if '--watch' in flags:
+                progress.stop()
+                watch_build(root, flags, failed=True)  # Keep watching for the fix
+            return
+        console.print(Panel(f"Parsed {count} modules in {waves} waves ({time.perf_counter() - start:.2f}s)", style="info"))
+        task = progress.add_task("[cyan]Weaving...", total=2)
         console.print(Panel("Checking errors...", style="warning"))
         # Call Rust for checks (like Cargo check)
         subprocess.run(["cargo", "run", "--bin", "weave_check"])
-        progress.update(task, advance=20)
+        progress.update(task, advance=1)
         if '--release' in flags:
-            console.print(Panel("Optimizing for release...", style="success"))
+            lines = [f"{r['pass']:<10} {r['ms']:8.2f} ms  nodes {r['nodes'][0]} -> {r['nodes'][1]}  "
+                     f"terms {r['terms'][0]} -> {r['terms'][1]}" for r in reports]
+            console.print(Panel("\n".join(lines) or "No modules", title="Optimized for release", style="success"))
         # Call Zig for codegen
         subprocess.run(["zig", "build-exe", "src/compiler.zig"])
-        progress.update(task, advance=30)
+        progress.update(task, advance=1)
         out_file = f"{project_name or 'app'}.weave" if not flags else f"{project_name or 'app'}.{flags[0].strip('--')}"
         console.print(Panel(f"Built: {out_file}", style="success"))
+    if '--watch' in flags:
+        watch_build(root, flags)
+
+def watch_build(root, flags, failed=False):
+    # Rebuild only what each edit invalidates (weave/watch.py); after a failed
+    # first build nothing was written, so everything is built again
+    from weave.watch import WatchBuild, allowed_langs, watch
+    state = WatchBuild(root, '--release' in flags, get_ir_format(flags), get_targets(flags),
+                       '--no-cache' not in flags, allowed_langs(flags))
+    watch(state, flags, console, rebuild=failed)
 
 if __name__ == '__main__':
     args = sys.argv[1:]
     if args[0] == 'build':
         flags = [a for a in args[1:] if a.startswith('--')]
-        project = args[1] if not flags else args[2] if len(args) > 2 else None
+        project = next((a for a in args[1:] if not a.startswith('--')), None)
         build(project, flags)
+    elif args[0] == 'bench':
+        from weave.bench import main as bench
+        sys.exit(bench(next((a for a in args[1:] if not a.startswith('--')), None),
+                       [a for a in args[1:] if a.startswith('--')]))
     else:
-        console.print("[danger]Invalid command. Use: weave build [project] [--flags][/danger]")
+        console.print("[danger]Invalid command. Use: weave build|bench [project] [--flags][/danger]")
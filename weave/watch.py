@@ -0,0 +1,258 @@
+import os
+import json
+import time
+import hashlib
+from typing import Dict, Iterable, List, Optional, Set
+from weave.graph import ModuleGraph, SKIP_DIRS
+
+# weave build --watch [--debounce=ms]: after the first full build, watch the
+# project's .vel files and redo only what an edit invalidates. Every output
+# records the inputs it was built from:
+#   target/ir/<m>.ir.*       source digest of m, plus whether m is an entry
+#                            module (no importers) when --release inlines
+#   target/inline/<m>.json   (lang, code) digest per inline block, results
+#                            kept; only with --allow-<lang>/--allow-all
+# A batch of saves inside the debounce window becomes one rebuild. Changed
+# modules reparse in this process on a parser kept per module, so only the
+# edited top-level statements are re-lexed and re-parsed; an unchanged
+# module's IR does not depend on what it imports, so dependents are not
+# rebuilt unless their entry status flips. The Rust check and Zig codegen
+# steps don't read module outputs and run only in the initial build.
+
+def digest(text: str) -> str:
+    return hashlib.blake2b(text.encode(), digest_size=16).hexdigest()
+
+def block_key(block: Dict) -> str:
+    return digest(f"{block['lang']}\0{block['code']}")
+
+class Unit:
+    __slots__ = ('source', 'entry', 'outputs', 'blocks')
+
+    def __init__(self, source: str, entry: bool, outputs: List[str], blocks: Dict[str, Dict]):
+        self.source = source  # Digest of the module text
+        self.entry = entry
+        self.outputs = outputs  # IR files written for it
+        self.blocks = blocks  # Inline block digest: result
+
+class WatchBuild:
+    def __init__(self, root: str, release: bool = False, ir_format: str = 'json', targets=None,
+                 use_cache: bool = True, allow: Iterable[str] = ()):
+        self.graph = ModuleGraph(root)
+        self.root = self.graph.root
+        self.out_dir = os.path.join(self.root, 'target', 'ir')
+        self.inline_dir = os.path.join(self.root, 'target', 'inline')
+        self.release = release
+        self.ir_format = ir_format
+        self.targets = targets
+        self.use_cache = use_cache
+        self.allow = set(allow)  # Inline languages to execute; empty = inline blocks aren't run
+        self.units: Dict[str, Unit] = {}
+        self.parsers = {}  # path: VelvetParser holding that module's span cache
+        self.executor = None
+        self.pending: Dict[str, Optional[str]] = {}  # Batch held back by an import cycle
+
+    def is_source(self, path: str) -> bool:
+        rel = os.path.relpath(path, self.root).split(os.sep)
+        return path.endswith('.vel') and not any(
+            d.startswith(('.', 'tmp_inline_')) or d in SKIP_DIRS for d in rel[:-1])
+
+    def entry_of(self, path: str, imported: Set[str]) -> bool:
+        # Only release builds read the flag (PassManager inlining)
+        return self.release and path not in imported
+
+    def imported(self) -> Set[str]:
+        return set().union(*self.graph.edges.values()) if self.graph.edges else set()
+
+    def start(self, rebuild: bool = False) -> Dict:
+        # Record every module as built by the full build that just ran (or rebuild all)
+        sources = {}
+        for path in self.graph.discover():
+            with open(path) as f:
+                sources[path] = f.read()
+        if rebuild:
+            return self.rebuild(sources)
+        imported = self.imported()
+        for path, code in sources.items():
+            self.units[path] = Unit(digest(code), self.entry_of(path, imported), self.outputs_for(path), {})
+        report = {'rebuilt': [], 'removed': [], 'errors': {}, 'inline_run': 0, 'inline_reused': 0, 'reparsed': 0, 'ms': 0.0}
+        if self.allow:
+            for path, code in sources.items():
+                self.run_inline(path, self.ir_for(path, code), report)
+        return report
+
+    def outputs_for(self, path: str) -> List[str]:
+        base = os.path.join(self.out_dir, os.path.relpath(path, self.root) + '.ir')
+        return [f"{base}.{ext}" for ext in (('json', 'bin') if self.ir_format == 'both' else (self.ir_format,))]
+
+    def changed(self, paths: Iterable[str]) -> Dict[str, Optional[str]]:
+        # {path: new source, or None if deleted}; touched-but-identical files drop out
+        out = {}
+        for path in {os.path.abspath(p) for p in paths}:
+            if not self.is_source(path):
+                continue
+            try:
+                with open(path) as f:
+                    code = f.read()
+            except OSError:
+                if path in self.units:
+                    out[path] = None
+                continue
+            unit = self.units.get(path)
+            if unit is None or unit.source != digest(code):
+                out[path] = code
+        return out
+
+    def rebuild(self, sources: Dict[str, Optional[str]]) -> Dict:
+        # -> {'rebuilt', 'removed', 'errors', 'inline_run', 'inline_reused', 'reparsed', 'ms'}
+        start = time.perf_counter()
+        report = {'rebuilt': [], 'removed': [], 'errors': {}, 'inline_run': 0, 'inline_reused': 0, 'reparsed': 0}
+        sources = self.pending = {**self.pending, **sources}
+        for path, code in sources.items():
+            if code is None:
+                self.remove(path)
+                report['removed'].append(path)
+            else:
+                self.graph.add(path, code)
+        self.graph.waves()  # ValueError on an import cycle, like a full build; the batch stays pending
+        self.pending = {}
+        imported = self.imported()
+        todo = {p: c for p, c in sources.items() if c is not None}
+        for path, unit in self.units.items():
+            if path not in todo and unit.entry != self.entry_of(path, imported):
+                with open(path) as f:
+                    todo[path] = f.read()  # Entry status flipped: release passes differ
+        for path in sorted(todo):
+            code = todo[path]
+            try:
+                ir, reparsed = self.compile(path, code, self.entry_of(path, imported))
+            except ValueError as e:  # Parse error: report it, build the rest, retry with the next batch
+                report['errors'][path] = str(e)
+                self.pending[path] = code
+                continue
+            report['reparsed'] += reparsed
+            old = self.units.get(path)
+            self.units[path] = Unit(digest(code), self.entry_of(path, imported), self.outputs_for(path),
+                                    old.blocks if old else {})
+            report['rebuilt'].append(path)
+            if self.allow:
+                self.run_inline(path, ir, report)
+        report['ms'] = (time.perf_counter() - start) * 1e3
+        return report
+
+    def compile(self, path: str, code: str, entry: bool):
+        # -> (IR as written, statement spans reparsed); same output as build_module
+        from velvet_parser import VelvetParser
+        from velvet_cache import VelvetCache
+        from velvet_ir_gen import VelvetIRGen, write_ir
+        cache = VelvetCache(enabled=self.use_cache)
+        key = cache.key(code, {}, self.targets)
+        cached = cache.get(key)
+        reparsed = 0
+        if cached is not None:
+            ir = cached[1]
+        else:
+            start = time.perf_counter()
+            parser = self.parsers.setdefault(path, VelvetParser())
+            parser.macros = {}  # Same table build_module starts from
+            ast = parser.parse_incremental(code)
+            reparsed = parser.reparsed
+            ir = VelvetIRGen(ast, self.targets).generate()
+            cache.put(key, ast, ir, time.perf_counter() - start)
+        cache.record()
+        if self.release:
+            from velvet_opt import PassManager
+            ir = PassManager(entry=entry).run(ir)
+        base = os.path.join(self.out_dir, os.path.relpath(path, self.root) + '.ir')
+        os.makedirs(os.path.dirname(base), exist_ok=True)
+        write_ir(ir, base, self.ir_format)
+        return ir, reparsed
+
+    def ir_for(self, path: str, code: str) -> Dict:
+        from velvet_parser import VelvetParser
+        from velvet_cache import VelvetCache
+        return VelvetCache(enabled=self.use_cache).compile(code, VelvetParser(), targets=self.targets)[1]
+
+    def run_inline(self, path: str, ir: Dict, report: Dict):
+        # Execute only blocks whose (lang, code) has no result yet; write target/inline/<m>.json
+        unit = self.units[path]
+        keys = [block_key(b) for b in ir.get('inline', [])]
+        todo = [(i, b) for i, (k, b) in enumerate(zip(keys, ir.get('inline', []))) if k not in unit.blocks]
+        if todo:
+            if self.executor is None:
+                from utils.inline_exec import InlineExecutor
+                self.executor = InlineExecutor()
+                self.executor.limits_file = os.path.join(self.root, '.velvet.toml')
+            self.executor.allow_langs |= self.allow
+            results = self.executor.execute([(b['lang'], b['code']) for _, b in todo], os.path.relpath(path, self.root))
+            for n, (i, _) in enumerate(todo):
+                unit.blocks[keys[i]] = results.get(n, {'skipped': True})
+        report['inline_run'] += len(todo)
+        report['inline_reused'] += len(keys) - len(todo)
+        unit.blocks = {k: unit.blocks[k] for k in keys}  # Drop results of deleted blocks
+        out = os.path.join(self.inline_dir, os.path.relpath(path, self.root) + '.json')
+        os.makedirs(os.path.dirname(out), exist_ok=True)
+        with open(out, 'w') as f:
+            json.dump([dict(unit.blocks[k], lang=b['lang']) for k, b in zip(keys, ir.get('inline', []))], f)
+
+    def remove(self, path: str):
+        unit = self.units.pop(path, None)
+        self.graph.edges.pop(path, None)
+        self.parsers.pop(path, None)
+        stale = list(unit.outputs) if unit else []
+        stale.append(os.path.join(self.inline_dir, os.path.relpath(path, self.root) + '.json'))
+        for out in stale:
+            try:
+                os.remove(out)
+            except OSError:
+                pass
+
+    def close(self):
+        if self.executor is not None:
+            self.executor.close()
+
+def allowed_langs(flags: List[str]) -> Set[str]:
+    allow = {f[len('--allow-'):] for f in flags if f.startswith('--allow-')}
+    if 'all' in allow:
+        from utils.inline_exec import InlineExecutor
+        return InlineExecutor().supported_langs
+    return allow
+
+def watch(state: WatchBuild, flags: List[str], console, stop_event=None, rebuild: bool = False):
+    # Blocks until stop_event is set (or Ctrl-C); one rebuild per debounced batch.
+    # rebuild=True when the first build failed: build everything now, and
+    # keep what couldn't be built pending until a later batch succeeds
+    import watchfiles
+    from rich.panel import Panel
+    debounce = next((int(f.split('=', 1)[1]) for f in flags if f.startswith('--debounce=')), 300)
+    try:
+        show_errors(state, state.start(rebuild=rebuild), console)
+    except ValueError as e:  # Still an import cycle
+        console.print(Panel(str(e), style="danger"))
+    console.print(Panel(f"Watching {state.root} for .vel changes (debounce {debounce} ms, Ctrl-C to stop)", style="info"))
+    try:
+        for changes in watchfiles.watch(state.root, watch_filter=lambda _, p: state.is_source(p),
+                                        debounce=debounce, stop_event=stop_event, raise_interrupt=False):
+            sources = state.changed(p for _, p in changes)
+            if not sources:
+                continue
+            edited = [os.stat(p).st_mtime for p, code in sources.items() if code is not None]
+            try:
+                report = state.rebuild(sources)
+            except ValueError as e:  # Import cycle; keep watching for the fix
+                console.print(Panel(str(e), style="danger"))
+                continue
+            show_errors(state, report, console)
+            latency = f", edit to artifact {(time.time() - min(edited)) * 1e3:.0f} ms" if edited else ""
+            names = ', '.join(os.path.relpath(p, state.root) for p in report['rebuilt'] + report['removed'])
+            inline = f", inline {report['inline_run']} run / {report['inline_reused']} reused" if state.allow else ""
+            console.print(Panel(f"Rebuilt {len(report['rebuilt'])} of {len(state.units)} modules ({names}): "
+                                f"{report['reparsed']} statements reparsed{inline}, "
+                                f"rebuild {report['ms']:.0f} ms{latency}", style="success"))
+    finally:
+        state.close()
+
+def show_errors(state: WatchBuild, report: Dict, console):
+    from rich.panel import Panel
+    from rich.text import Text
+    for path, error in sorted(report['errors'].items()):
+        console.print(Panel(Text(f"{os.path.relpath(path, state.root)}: {error}"), style="danger"))